@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 记录的字段: 名称 -> SQLite类型; 频率单位Hz, 波长单位nm, 功率单位dBm
+CATALOG_FIELDS = {
+    "file_path": "TEXT NOT NULL UNIQUE",
+    "file_format": "TEXT",
+    "file_size": "INTEGER",
+    "created": "TEXT",  # ISO格式时间
+    "duration": "REAL",  # 扫描耗时(s)
+    "analyzer_model": "TEXT",
+    "start_wavelength": "REAL",
+    "stop_wavelength": "REAL",
+    "wavelength_step": "REAL",
+    "wavelength_points": "INTEGER",
+    "start_frequency": "REAL",
+    "stop_frequency": "REAL",
+    "span": "REAL",
+    "rbw": "REAL",
+    "sweep_points": "INTEGER",  # 频谱仪采样点数
+    "stored_points": "INTEGER",  # 缩减后存储的频率点数
+    "laser_power": "REAL",
+    "dtype": "TEXT",
+    "reduction": "TEXT",
+    "complete": "INTEGER",  # 是否扫描了全部波长点
+    "peak_power": "REAL",
+    "peak_wavelength": "REAL",
+    "peak_frequency": "REAL",
+    "mean_noise_floor": "REAL",
+    "max_snr": "REAL",
+    "mean_width_3db": "REAL",
+}
+CATALOG_INDEXES = {
+    "idx_scans_model_rbw": ("analyzer_model", "rbw"),
+    "idx_scans_wavelength": ("start_wavelength", "stop_wavelength"),
+    "idx_scans_created": ("created",),
+}
+
+
+def statistics_summary(snapshot: Optional[dict],
+                       wavelengths: Optional[Sequence[float]] = None) -> Dict[str, Optional[float]]:
+    """由ScanStatistics.snapshot()计算整次扫描的统计摘要"""
+    summary = dict.fromkeys(("peak_power", "peak_wavelength", "peak_frequency",
+                             "mean_noise_floor", "max_snr", "mean_width_3db"))
+    column = (snapshot or {}).get("column", {})
+    peaks = np.asarray(column.get("peak_power", ()), dtype=np.float64)
+    if len(peaks) == 0 or np.isnan(peaks).all():
+        return summary
+    best = int(np.nanargmax(peaks))
+    summary["peak_power"] = float(peaks[best])
+    summary["peak_frequency"] = float(column["peak_frequency"][best])
+    if wavelengths is not None and best < len(wavelengths):
+        summary["peak_wavelength"] = float(wavelengths[best])
+    # 不可用的统计量(全部为NaN)记为空
+    for name, field, reduce in (("mean_noise_floor", "noise_floor", np.nanmean),
+                                ("max_snr", "snr", np.nanmax),
+                                ("mean_width_3db", "width_3db", np.nanmean)):
+        values = np.asarray(column[field], dtype=np.float64)
+        if not np.isnan(values).all():
+            summary[name] = float(reduce(values))
+    return summary
+
+
+class ScanCatalog:
+    """已保存扫描文件的SQLite目录
+
+    每个保存的文件一条记录, 包括扫描参数、文件信息和统计摘要,
+    可按频谱仪型号、波长范围、RBW、跨度、格式和时间查询(相关字段建有索引)。
+    同一文件再次保存时替换原记录。可在扫描线程和界面线程中使用。
+    """
+
+    def __init__(self, path: str = "scan_catalog.db"):
+        """
+        :param path: 数据库文件路径, ":memory:"为内存数据库
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        columns = ", ".join(f"{name} {kind}" for name, kind in CATALOG_FIELDS.items())
+        with self._lock, self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS scans (id INTEGER PRIMARY KEY, {columns})")
+            for index, fields in CATALOG_INDEXES.items():
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON scans ({', '.join(fields)})")
+
+    def register(self, entry: Dict[str, Any]) -> int:
+        """
+        添加或替换一条记录, 未给出的文件格式、大小和时间按文件补全
+        :return: 记录id
+        :raises ValueError: 缺少file_path
+        """
+        if not entry.get("file_path"):
+            raise ValueError("记录缺少文件路径")
+        entry = {name: entry.get(name) for name in CATALOG_FIELDS}
+        path = entry["file_path"] = os.path.abspath(entry["file_path"])
+        if entry["file_format"] is None:
+            entry["file_format"] = os.path.splitext(path)[1].lstrip(".").lower()
+        if entry["file_size"] is None and os.path.exists(path):
+            entry["file_size"] = os.path.getsize(path)
+        if entry["created"] is None:
+            entry["created"] = datetime.now().isoformat(timespec="seconds")
+        names = ", ".join(entry)
+        marks = ", ".join("?" * len(entry))
+        with self._lock, self._conn:
+            cursor = self._conn.execute(f"INSERT OR REPLACE INTO scans ({names}) VALUES ({marks})",
+                                        list(entry.values()))
+            return cursor.lastrowid
+
+    def query(self, model: Optional[str] = None,
+              wavelength_range: Optional[Tuple[float, float]] = None,
+              rbw: Optional[float] = None,
+              span_range: Optional[Tuple[float, float]] = None,
+              file_format: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              text: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        查询记录, 按时间从新到旧排列; 未给出的条件不限制
+        :param model: 频谱仪型号
+        :param wavelength_range: (nm, nm), 扫描范围与之有重叠的记录
+        :param rbw: 分辨率带宽(Hz), 相对误差1e-6以内视为相同
+        :param span_range: 频率跨度范围(Hz)
+        :param file_format: 文件格式(扩展名, 如"h5")
+        :param since: 起始时间(ISO格式, 含)
+        :param until: 终止时间(ISO格式, 含)
+        :param text: 文件路径包含的文字
+        """
+        conditions, values = [], []
+        if model:
+            conditions.append("analyzer_model = ?")
+            values.append(model)
+        if wavelength_range is not None:
+            low, high = sorted(wavelength_range)
+            conditions.append("start_wavelength <= ? AND stop_wavelength >= ?")
+            values += [high, low]
+        if rbw:
+            conditions.append("rbw BETWEEN ? AND ?")
+            values += [rbw * (1 - 1e-6), rbw * (1 + 1e-6)]
+        if span_range is not None:
+            low, high = sorted(span_range)
+            conditions.append("span BETWEEN ? AND ?")
+            values += [low, high]
+        if file_format:
+            conditions.append("file_format = ?")
+            values.append(file_format.lstrip(".").lower())
+        if since:
+            conditions.append("created >= ?")
+            values.append(since)
+        if until:
+            conditions.append("created <= ?")
+            values.append(until)
+        if text:
+            conditions.append("file_path LIKE ?")
+            values.append(f"%{text}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT * FROM scans {where} ORDER BY created DESC, id DESC LIMIT ?",
+                                      values + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def models(self) -> List[str]:
+        """目录中出现过的频谱仪型号"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT analyzer_model FROM scans "
+                                      "WHERE analyzer_model IS NOT NULL ORDER BY analyzer_model").fetchall()
+        return [row[0] for row in rows]
+
+    def remove(self, path: str) -> bool:
+        """删除一个文件的记录"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM scans WHERE file_path = ?", (os.path.abspath(path),))
+        return cursor.rowcount > 0
+
+    def prune(self) -> int:
+        """删除文件已不存在的记录, 返回删除的条数"""
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute("SELECT file_path FROM scans")]
+        missing = [(path,) for path in paths if not os.path.exists(path)]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM scans WHERE file_path = ?", missing)
+        return len(missing)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+CHECKPOINT_VERSION = 1
+
+
+class ScanCheckpoint:
+    """扫描进度检查点
+
+    以JSON记录扫描参数、已完成的波长点数和已写入数据的文件位置,
+    扫描因通信超时、断电或程序崩溃中止后, 可从下一个波长点继续并追加到同一数据文件。
+    写入时先写临时文件再替换, 写入过程中断不会损坏已有的检查点。
+    """
+
+    def __init__(self, path: str, interval_columns: int = 10, interval: float = 5.0):
+        """
+        :param path: 检查点文件路径
+        :param interval_columns: 每完成多少个波长点保存一次
+        :param interval: 距上次保存超过多少秒时保存
+        """
+        self.path = path
+        self.interval_columns = interval_columns
+        self.interval = interval
+        self._saved_columns = 0
+        self._last_save = time.monotonic()
+
+    def due(self, columns: int) -> bool:
+        """是否需要保存检查点"""
+        return (columns - self._saved_columns >= self.interval_columns
+                or time.monotonic() - self._last_save >= self.interval)
+
+    def save(self, state: Dict[str, Any]):
+        """保存检查点, state中的数据应已同步到磁盘"""
+        state = dict(state, version=CHECKPOINT_VERSION, updated=str(datetime.now()))
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._saved_columns = state.get("completed_columns", 0)
+        self._last_save = time.monotonic()
+
+    def remove(self):
+        """扫描正常完成后删除检查点"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def load(path: str) -> Optional[Dict[str, Any]]:
+        """
+        读取检查点, 文件不存在时返回None
+        :raises ValueError: 文件内容无效或版本不符
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"检查点文件无效: {str(e)}")
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"检查点版本不符: {state.get('version')}")
+        return state
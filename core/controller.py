@@ -1,8 +1,20 @@
 from devices.laser_controller import TSLController
 from devices.spectrum_analyzer import BaseSpectrumAnalyzer, create_analyzer, find_any_analyzer
+from devices.io_trace import tracer
+from devices.discovery import discover_instruments
+from core.scan_store import ScanDataStore, MemmapScanStore, POWER_DTYPES, decode_power
+from core.spool import SpoolWriter, SpoolReader
+from core.h5_stream import H5StreamWriter
+from core.exporter import ExportJob, ExportThread
+from core.checkpoint import ScanCheckpoint
+from core.reduction import TraceReducer
+from core.statistics import ScanStatistics
+from core.catalog import ScanCatalog, statistics_summary
+from core.writer import ColumnWriter
 import time
 import os
 import io
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtCore import QObject, pyqtSignal, QThread
 from typing import Optional, Tuple, Any, Dict, List
 from datetime import datetime
@@ -19,9 +31,14 @@ class ScanThread(QThread):
     alarm_signal = pyqtSignal(str)  # 报警信息
     complete_signal = pyqtSignal()  # 扫描完成信号
     
-    def __init__(self, controller):
+    def __init__(self, controller, start_index: int = 0):
+        """
+        :param controller: 控制器
+        :param start_index: 起始波长点序号, 从检查点继续扫描时为检查点记录的下一个波长点
+        """
         super().__init__()
         self.controller = controller
+        self.start_index = start_index
         self.scanning = True
         self.paused = False
         
@@ -30,208 +47,168 @@ class ScanThread(QThread):
         # 初始化计数器
         self.current_point = 0
         self.total_points = 0
+        self.settle_times = []
+        self.settle_timeouts = 0
+        executor = None
         
         try:
             if not self.controller.laser or not self.controller.analyzer:
                 raise Exception("设备未连接")
                 
             # 激光器 start_scan 实际上并不执行扫描，我们需要手动控制波长
-            # 设置初始波长
-            current_wl = self.controller.laser.start_wl
-            self.controller.laser.set_wavelength(current_wl)
+            # 扫描波长点按索引生成, 避免浮点累加误差
+            wavelengths = self.controller.laser.get_scan_wavelengths()
+            start = min(self.start_index, len(wavelengths))
+            self.current_point = start
+            if start >= len(wavelengths):
+                raise Exception("没有剩余的波长点")
+            # 设置初始波长并等待稳定
+            settled_wl = self._step_laser(wavelengths[start])
+            # 扫频模式由激光器内部扫描输出触发; 否则逐点设置波长,
+            # 流水线模式下读取迹线的同时在后台步进激光器
+            swept = self.controller.swept_enabled
+            if swept and start > 0:
+                # 激光器内部扫描总是从起始波长开始, 继续扫描时改为逐点采集
+                self.alarm_signal.emit("继续扫描使用逐点采集模式")
+                swept = False
+            pipeline = self.controller.pipeline_enabled and not swept
+            executor = ThreadPoolExecutor(max_workers=1) if pipeline else None
+            
+            # 扫描期间频率范围不变, 只获取一次(由频谱仪设置缓存提供)
+            analyzer = self.controller.analyzer
+            try:
+                self._start_freq, self._stop_freq = analyzer.get_frequency_range()
+            except Exception as e:
+                self.alarm_signal.emit(f"获取频率范围失败: {str(e)}")
+                # 使用默认值
+                self._start_freq, self._stop_freq = 0, 1
+            self._freqs = []
+            # 采集期间保持单次扫描模式, 不再逐点切换连续/单次
+            analyzer.begin_acquisition()
             
             # 计算总点数
-            self.total_points = len(range(int((self.controller.laser.stop_wl - self.controller.laser.start_wl) / self.controller.laser.step) + 1))
+            self.total_points = len(wavelengths)
             
             # 输出扫描信息
             self.alarm_signal.emit(f"开始扫描: {self.controller.laser.start_wl}nm 到 {self.controller.laser.stop_wl}nm, 步长 {self.controller.laser.step}nm")
+            if start > 0:
+                self.alarm_signal.emit(f"从第{start + 1}个波长点继续: {wavelengths[start]:.4f}nm")
+            if swept:
+                self.alarm_signal.emit("扫频模式: 激光器内部步进扫描, 频谱仪外部触发")
+            elif pipeline:
+                self.alarm_signal.emit("流水线采集已启用: 迹线读取与激光器步进并行")
             
-            while self.scanning and current_wl <= self.controller.laser.stop_wl:
-                # 检查是否暂停
-                while self.controller.paused and self.scanning:
-                    time.sleep(0.2)  # 暂停时短暂休眠，减少CPU使用
-                    self.alarm_signal.emit("已暂停，等待继续...")
-                # 记录当前波长
-                displayed_wl = self.controller.laser.get_wavelength()
-                # 打印波长信息用于调试
-                self.alarm_signal.emit(f"波长: 设定={current_wl:.4f}nm, 读取={displayed_wl:.4f}nm")
-                
-                # 获取频谱数据并记录调试信息
-                try:
-                    spectrum_data = self.controller.analyzer.get_spectrum_data()
-                    if not spectrum_data:
-                        self.alarm_signal.emit("警告: 频谱仪返回空数据")
-                        spectrum_data = []
-                    
-                    self.alarm_signal.emit(f"获取到频谱数据点: {len(spectrum_data)}个")
-                    
-                    # 调试日志: 记录前5个数据点
-                    if len(spectrum_data) > 5:
-                        debug_points = spectrum_data[:5]
-                        self.alarm_signal.emit(f"前5个数据点: {debug_points}")
-                    elif spectrum_data:
-                        self.alarm_signal.emit(f"所有数据点: {spectrum_data}")
-                        
-                    # 检查数据有效性
-                    if len(spectrum_data) < 10:
-                        self.alarm_signal.emit("警告: 获取的数据点过少")
-                        
-                except Exception as e:
-                    self.alarm_signal.emit(f"获取频谱数据错误: {str(e)}")
-                    spectrum_data = []
-                
-                try:
-                    # 获取当前频率范围用于显示
-                    if self.controller.analyzer_model == "N9010B":
-                        # Keysight使用中心频率和带宽
-                        start_freq = float(self.controller.analyzer.query(":SENS:FREQ:STAR?"))
-                        stop_freq = float(self.controller.analyzer.query(":SENS:FREQ:STOP?"))
-                    else:
-                        # 中科思仪直接使用起始和终止频率
-                        start_freq = float(self.controller.analyzer.query(":SENSe:FREQuency:STARt?"))
-                        stop_freq = float(self.controller.analyzer.query(":SENSe:FREQuency:STOP?"))
-                except Exception as e:
-                    self.alarm_signal.emit(f"获取频率范围失败: {str(e)}")
-                    # 使用默认值或之前的值
-                    start_freq = 0
-                    stop_freq = 1
+            if swept:
+                self._run_swept(wavelengths)
+            else:
+                for index, current_wl in enumerate(wavelengths[start:], start):
+                    if not self.scanning:
+                        break
+                    point_start = time.perf_counter()
+                    next_wl = wavelengths[index + 1] if index + 1 < len(wavelengths) else None
+                    # 检查是否暂停
+                    while self.controller.paused and self.scanning:
+                        time.sleep(0.2)  # 暂停时短暂休眠，减少CPU使用
+                        self.alarm_signal.emit("已暂停，等待继续...")
+                    # 记录当前波长(步进时稳定检测的最后读数)
+                    displayed_wl = settled_wl
+                    # 打印波长信息用于调试
+                    self.alarm_signal.emit(f"波长: 设定={current_wl:.4f}nm, 读取={displayed_wl:.4f}nm")
                 
-                try:
-                    # 避免除以零的错误
-                    if len(spectrum_data) > 1:
-                        freq_step = (stop_freq - start_freq) / (len(spectrum_data) - 1)
-                    else:
-                        freq_step = 0
+                    # 获取频谱数据并记录调试信息
+                    step_future = None
+                    try:
+                        # 扫描测量的是当前波长, 必须在触发之后才能步进
+                        analyzer.trigger_sweep()
+                        if executor is not None and next_wl is not None:
+                            step_future = executor.submit(self._step_laser, next_wl)
+                        spectrum_data = analyzer.fetch_trace()
+                        if len(spectrum_data) == 0:
+                            self.alarm_signal.emit("警告: 频谱仪返回空数据")
+                            spectrum_data = np.empty(0)
                     
-                    # 生成频率列表用于显示
-                    freqs = [start_freq + i * freq_step for i in range(len(spectrum_data))]
-                    powers = spectrum_data
-                except Exception as e:
-                    self.alarm_signal.emit(f"生成频率列表失败: {str(e)}")
-                    # 使用空列表或默认值
-                    freqs = []
-                    powers = []
+                        self.alarm_signal.emit(f"获取到频谱数据点: {len(spectrum_data)}个")
                     
-                # 确保有数据
-                if not powers and spectrum_data:
-                    powers = spectrum_data
-                    freqs = list(range(len(powers)))
-                
-                # 记录调试信息
-                self.alarm_signal.emit(f"采集到数据: {len(powers)}个点, 波长: {current_wl:.4f}nm")
-                
-                # 初始化数据矩阵(按列存储)
-                if not hasattr(self.controller, 'power_matrix'):
-                    self.controller.frequency_points = len(powers) if powers else 0
-                    self.controller.power_matrix = np.zeros((len(powers), 0)) if powers else np.zeros((0, 0))
-                    self.alarm_signal.emit(f"初始化数据矩阵 ({len(powers)}个频率点)")
-                
-                # 检查并存储数据(每个波长点的数据作为矩阵的一列)
-                if powers and len(powers) > 0:
-                    try:
-                        # 确保频率点数一致
-                        if len(powers) != self.controller.frequency_points:
-                            self.alarm_signal.emit(f"警告: 频率点数不一致 ({len(powers)} != {self.controller.frequency_points})")
-                            return
-                        
-                        # 将数据作为新列添加到矩阵([频率点×波长点])
-                        if self.controller.power_matrix.size == 0:
-                            self.controller.power_matrix = np.array([powers]).T  # 转置为列向量
-                        else:
-                            self.controller.power_matrix = np.column_stack((self.controller.power_matrix, powers))
+                        # 调试日志: 记录前5个数据点
+                        if len(spectrum_data) > 5:
+                            debug_points = spectrum_data[:5].tolist()
+                            self.alarm_signal.emit(f"前5个数据点: {debug_points}")
+                        elif len(spectrum_data) > 0:
+                            self.alarm_signal.emit(f"所有数据点: {spectrum_data.tolist()}")
                         
-                        # 更新统计信息
-                        wavelength_points = self.controller.power_matrix.shape[1]
-                        frequency_points = self.controller.power_matrix.shape[0]
-                        self.alarm_signal.emit(f"数据已存储: {wavelength_points}波长点 × {frequency_points}频率点")
+                        # 检查数据有效性
+                        if len(spectrum_data) < 10:
+                            self.alarm_signal.emit("警告: 获取的数据点过少")
                         
-                        # 监控内存使用
-                        mem_usage = self.controller.power_matrix.nbytes / (1024 * 1024)
-                        if mem_usage > 500:  # 500MB警告阈值
-                            self.alarm_signal.emit(f"内存使用警告: {mem_usage:.1f}MB")
-
-                        # 调试信息
-                        self.alarm_signal.emit(f"数据范围: {np.min(powers):.2f} 到 {np.max(powers):.2f} dBm")
                     except Exception as e:
-                        self.alarm_signal.emit(f"数据存储错误: {str(e)}")
-                else:
-                    self.alarm_signal.emit("警告: 无有效数据可存储")
-                
-                # 获取当前频谱的峰值功率用于报警判断
-                peak_power = max(powers) if powers else -100
-                
-                # 发射信号更新界面频谱图
-                self.data_signal.emit(freqs, powers)
+                        self.alarm_signal.emit(f"获取频谱数据错误: {str(e)}")
+                        spectrum_data = np.empty(0)
                 
-                # 更新进度
-                self.current_point += 1
-                progress = int(100 * self.current_point / self.total_points)
-                # 发送实际读取到的波长值，而不是设定值
-                self.progress_signal.emit(progress, displayed_wl)
-                
-                # 检查报警条件
-                self._check_alarm_conditions(current_wl, peak_power)
-                
-                # 发送数据收集完成状态
-                self.alarm_signal.emit(f"波长 {displayed_wl:.4f}nm 的数据收集完成，准备步进...")
-                
-                # 等待指定的停留时间 - 确保有足够时间处理数据
-                if self.controller.laser.dwell > 0:
-                    time.sleep(self.controller.laser.dwell)
-                else:
-                    time.sleep(0.2)  # 默认至少等待0.2秒确保数据处理完成
+                    if not self._record_trace(current_wl, displayed_wl, spectrum_data):
+                        return
                 
-                # 步进到下一个波长
-                current_wl += self.controller.laser.step
+                    if step_future is not None:
+                        # 等待后台步进完成, 步进异常在此处抛出
+                        settled_wl = step_future.result()
+                        self.alarm_signal.emit(f"已步进到新波长: {next_wl:.4f}nm")
+                    elif next_wl is not None and self.scanning:
+                        # 设置新波长并等待稳定
+                        self.alarm_signal.emit(f"步进到新波长: {next_wl:.4f}nm")
+                        settled_wl = self._step_laser(next_wl)
                 
-                # 设置新波长
-                if current_wl <= self.controller.laser.stop_wl:
-                    self.alarm_signal.emit(f"步进到新波长: {current_wl:.4f}nm")
-                    # 设置新波长前先等待短暂时间确保上一步操作完成
-                    time.sleep(0.2)
-                    self.controller.laser.set_wavelength(current_wl)
-                    # 设置后再等待短暂时间确保波长稳定
-                    time.sleep(0.2)
+                    self.alarm_signal.emit(f"单点耗时: {time.perf_counter() - point_start:.3f}s")
                 
         except Exception as e:
             self.alarm_signal.emit(f"扫描错误: {str(e)}")
+            # 保存最近的I/O事务便于排查
+            trace_file = self.controller.dump_io_trace()
+            if trace_file:
+                self.alarm_signal.emit(f"最近的I/O事务已保存到: {trace_file}")
         finally:
             self.scanning = False
+            if executor is not None:
+                executor.shutdown(wait=True)
+            self._report_settle_times()
             self.alarm_signal.emit(f"扫描结束，正在同步最终数据...")
+            # 等待写入队列中的数据全部写入, 写入失败时扫描不算完成
+            stored = self.controller.close_writer()
             
             if self.controller.analyzer:
+                self.controller.analyzer.end_acquisition()
                 self.controller.analyzer.auto_scale()
                 self.alarm_signal.emit(f"频谱仪已自动调整刻度")
                 
-            # 调试: 检查最终数据状态
-            if hasattr(self.controller, 'power_buffer'):
-                self.alarm_signal.emit(f"最终缓冲区数据: {len(self.controller.power_buffer)}个波长点")
-            if hasattr(self.controller, 'total_columns'):
-                self.alarm_signal.emit(f"流式写入总列数: {self.controller.total_columns}")
-                
             # 确保数据统计正确
-            if hasattr(self, 'total_points') and self.controller.temp_file_handle:
-                # 流式写入模式 - 确保 total_columns 更新正确
-                if self.controller.total_columns == 0 and self.current_point > 0:
-                    self.controller.total_columns = self.current_point
-                    self.alarm_signal.emit(f"已同步总波长点数: {self.current_point}")
-                else:
-                    self.alarm_signal.emit(f"扫描完成: 共{self.controller.total_columns}个波长点")
-            elif not self.controller.temp_file_handle and hasattr(self, 'current_point'):
-                # 内存缓冲模式 - 确保 power_buffer 包含所有数据
-                if len(self.controller.power_buffer) == 0 and self.current_point > 0:
-                    self.alarm_signal.emit(f"警告: 没有捕获到任何数据点")
-                else:
-                    count = len(self.controller.power_buffer)
-                    self.alarm_signal.emit(f"扫描完成: 内存中有{count}个波长点的数据")
+            streaming = isinstance(self.controller.store, (SpoolWriter, SpoolReader, MemmapScanStore))
+            count = len(self.controller.store) if self.controller.store is not None else 0
+            if count == 0 and self.current_point > 0:
+                self.alarm_signal.emit(f"警告: 没有捕获到任何数据点")
+            elif streaming:
+                self.alarm_signal.emit(f"扫描完成: 流式写入共{count}个波长点")
+            else:
+                self.alarm_signal.emit(f"扫描完成: 内存中有{count}个波长点的数据")
                 
-            # 关闭文件
-            if self.controller.temp_file_handle:
-                try:
-                    self.controller.temp_file_handle.close()
-                    self.controller.temp_file_handle = None
-                except:
-                    pass
+            # 已扫描的波长点中没有数据的点(迹线为空或写入失败)
+            self.controller.scan_next_point = max(self.controller.scan_next_point, self.current_point)
+            missing = self.controller.missing_points(self.current_point)
+            if missing:
+                wavelengths = self.controller.laser.get_scan_wavelengths() if self.controller.laser else []
+                names = ", ".join(f"{wavelengths[i]:.4f}nm" if i < len(wavelengths) else f"第{i + 1}点"
+                                  for i in missing[:10])
+                more = f" 等{len(missing)}个" if len(missing) > 10 else ""
+                self.alarm_signal.emit(f"警告: {len(missing)}个波长点没有数据: {names}{more}")
+                
+            # 扫到最后一个波长点时删除检查点(缺少的点无法续扫补齐), 否则保存最终进度以便继续
+            if self.total_points and self.current_point >= self.total_points:
+                self.controller.clear_checkpoint()
+                if missing or not stored:
+                    self.alarm_signal.emit(f"扫描未完整: {self.total_points}个波长点中只有{count}个有数据")
+            elif self.controller.update_checkpoint(force=True):
+                self.alarm_signal.emit(f"已保存检查点, 可从第{self.current_point + 1}个波长点继续扫描")
+                
+            # 关闭流式写入文件, 之后通过只读映射访问
+            self.controller.scan_finished_at = time.time()
+            self.controller.finish_store()
                     
             # 发送完成信号
             self.complete_signal.emit()
@@ -240,6 +217,162 @@ class ScanThread(QThread):
         """停止扫描"""
         self.scanning = False
     
+    def _record_trace(self, current_wl: float, displayed_wl: float, spectrum_data: np.ndarray) -> bool:
+        """存储一条迹线并更新界面/进度/报警, 数据无法存储需中止扫描时返回False"""
+        reducer = self.controller.reducer
+        try:
+            # 按设置缩减迹线, 存储和显示使用缩减后的数据
+            powers = reducer.reduce(spectrum_data)
+            # 频率列表只在点数变化时重新生成
+            if len(self._freqs) != len(powers):
+                self._freqs = reducer.frequency_axis((self._start_freq, self._stop_freq),
+                                                     len(spectrum_data)).tolist()
+        except Exception as e:
+            self.alarm_signal.emit(f"生成频率列表失败: {str(e)}")
+            # 使用空列表或默认值
+            self._freqs = []
+            powers = np.empty(0)
+            
+        # 确保有数据
+        if len(powers) == 0 and len(spectrum_data) > 0:
+            powers = spectrum_data
+            self._freqs = list(range(len(powers)))
+        
+        # 记录调试信息
+        self.alarm_signal.emit(f"采集到数据: {len(powers)}个点, 波长: {current_wl:.4f}nm")
+        
+        # 检查并存储数据(每个波长点的数据作为矩阵的一列)
+        store = self.controller.store
+        if len(powers) > 0:
+            try:
+                if self.controller.submitted_columns == 0:
+                    self.alarm_signal.emit(f"初始化数据矩阵 ({len(powers)}个频率点)")
+                    
+                # 将数据作为新列添加到矩阵([频率点×波长点]), 频率点数不一致时抛出ValueError
+                full_trace = spectrum_data if reducer.keep_full(self.controller.submitted_columns) else None
+                try:
+                    self.controller.record_column(powers, current_wl, displayed_wl, full_trace,
+                                                  self.current_point)
+                except ValueError as e:
+                    self.alarm_signal.emit(f"警告: {str(e)}")
+                    return False
+                
+                # 更新统计信息
+                self.alarm_signal.emit(f"数据已存储: {self.controller.recorded_columns}波长点 × {len(powers)}频率点")
+                
+                # 监控内存使用
+                mem_usage = store.nbytes / (1024 * 1024)
+                if mem_usage > 500:  # 500MB警告阈值
+                    self.alarm_signal.emit(f"内存使用警告: {mem_usage:.1f}MB")
+
+                # 调试信息
+                self.alarm_signal.emit(f"数据范围: {np.min(powers):.2f} 到 {np.max(powers):.2f} dBm")
+            except Exception as e:
+                self.alarm_signal.emit(f"数据存储错误: {str(e)}")
+        else:
+            self.alarm_signal.emit("警告: 无有效数据可存储")
+        
+        # 获取当前频谱的峰值功率用于报警判断
+        peak_power = float(np.max(powers)) if len(powers) > 0 else -100
+        
+        # 发射信号更新界面频谱图
+        self.data_signal.emit(self._freqs, powers.tolist())
+        
+        # 更新进度
+        self.current_point += 1
+        progress = int(100 * self.current_point / self.total_points)
+        # 发送实际读取到的波长值，而不是设定值
+        self.progress_signal.emit(progress, displayed_wl)
+        
+        # 检查报警条件
+        self._check_alarm_conditions(current_wl, peak_power)
+        
+        # 发送数据收集完成状态
+        self.alarm_signal.emit(f"波长 {displayed_wl:.4f}nm 的数据收集完成，准备步进...")
+        return True
+        
+    def _run_swept(self, wavelengths: List[float]):
+        """
+        扫频模式: 激光器内部步进扫描并在每点输出触发, 频谱仪外部触发采集
+        第i条迹线对应第i个触发, 波长为 start_wl + i*step
+        """
+        laser = self.controller.laser
+        analyzer = self.controller.analyzer
+        
+        # 每点停留时间需覆盖一次扫描、迹线读取和重新准备触发
+        sweep_time = analyzer.get_sweep_time()
+        fetch_time = analyzer.estimate_fetch_time()
+        dwell = max(laser.dwell, (sweep_time + fetch_time) * self.controller.swept_margin)
+        if dwell > laser.dwell:
+            self.alarm_signal.emit(f"停留时间已延长到 {dwell:.3f}s (扫描 {sweep_time:.3f}s + 读取 {fetch_time:.3f}s)")
+        
+        analyzer.set_trigger_source("EXT")
+        try:
+            # 激光器开始扫描前准备好第一次触发
+            analyzer.arm_sweep()
+            if not laser.start_scan(dwell):
+                raise Exception("激光器扫描启动失败")
+            timeout = 2 * dwell + sweep_time + 5.0
+            first_done = None
+            pause_warned = False
+            late_warned = False
+            t0 = time.perf_counter()
+            
+            for index, current_wl in enumerate(wavelengths):
+                if not self.scanning:
+                    break
+                if self.controller.paused and not pause_warned:
+                    self.alarm_signal.emit("扫频模式下无法暂停, 硬件扫描继续进行")
+                    pause_warned = True
+                    
+                if not analyzer.wait_sweep(timeout):
+                    self.alarm_signal.emit(f"等待第{index + 1}个触发超时, 可能丢失了触发")
+                    break
+                done = time.perf_counter()
+                
+                # 迹线完成时刻晚于预期半个停留时间以上, 说明重新准备触发时错过了触发
+                if first_done is None:
+                    first_done = done
+                elif done > first_done + (index + 0.5) * dwell and not late_warned:
+                    self.alarm_signal.emit(f"警告: 第{index + 1}点晚于预期, 可能丢失触发, 后续波长分配可能偏移")
+                    late_warned = True
+                    
+                spectrum_data = analyzer.fetch_trace()
+                if index + 1 < len(wavelengths):
+                    analyzer.arm_sweep()
+                if not self._record_trace(current_wl, current_wl, spectrum_data):
+                    return
+                    
+            elapsed = time.perf_counter() - t0
+            self.alarm_signal.emit(f"扫频采集完成: {self.current_point}/{len(wavelengths)}个点, 耗时 {elapsed:.2f}s")
+        finally:
+            laser.stop_scan()
+            analyzer.set_trigger_source("IMM")
+        
+    def _step_laser(self, wavelength: float) -> float:
+        """步进激光器到指定波长, 等待稳定后再停留dwell时间, 返回稳定后的读数"""
+        laser = self.controller.laser
+        laser.set_wavelength(wavelength)
+        settled_wl, elapsed, settled = laser.wait_settled(wavelength)
+        self.settle_times.append(elapsed)
+        if settled:
+            self.alarm_signal.emit(f"波长稳定耗时: {elapsed * 1000:.0f}ms")
+        else:
+            self.settle_timeouts += 1
+            self.alarm_signal.emit(f"警告: 波长未在{elapsed:.1f}s内稳定 (目标={wavelength:.4f}nm, 读取={settled_wl:.4f}nm)")
+        if laser.dwell > 0:
+            time.sleep(laser.dwell)
+        return settled_wl
+        
+    def _report_settle_times(self):
+        """汇总本次扫描的波长稳定耗时"""
+        if not self.settle_times:
+            return
+        times = np.array(self.settle_times) * 1000
+        self.alarm_signal.emit(
+            f"波长稳定统计: {len(times)}次, 平均 {times.mean():.0f}ms, "
+            f"最短 {times.min():.0f}ms, 最长 {times.max():.0f}ms, 超时 {self.settle_timeouts}次")
+            
     def _check_alarm_conditions(self, wavelength: float, power: float):
         """检查报警条件"""
         if power < -50:  # dBm
@@ -260,6 +393,8 @@ class LaserSystemController(QObject):
     points_calculated = pyqtSignal(int, str)  # 采样点数, 说明信息
     memory_warning = pyqtSignal(float, str)  # 内存使用警告 (MB, 消息)
     sweep_time_updated = pyqtSignal(float)  # 单次扫描时间 (ms)
+    export_progress = pyqtSignal(int, str)  # 后台保存进度 (百分比, 文件名)
+    export_finished = pyqtSignal(bool, str)  # 后台保存结束 (是否成功, 文件名)
 
     def __init__(self):
         super().__init__()
@@ -268,15 +403,68 @@ class LaserSystemController(QObject):
         self.analyzer_model = None
         self.paused = False
         self.scanning = False
-        # 使用列表存储最近的几个波长点数据，避免全部存在内存中
-        self.power_buffer = []
-        # 如果启用了流式写入，存储临时文件句柄
-        self.temp_file_handle = None
-        self.buffer_max_size = 10  # 最多缓存10个波长点数据
-        self.total_columns = 0  # 记录总列数
+        # 预计内存超过阈值时启用流式写入, 数据按列追加到文件
+        self.streaming_enabled = False
+        self.streaming_backend = "memmap"  # "memmap": 预分配映射文件原位写入, "spool": 追加写入
+        self.spool_path = "temp_scan_data.dat"
+        self.memmap_path = "temp_scan_data.npy"
+        # 存储写入线程: 采集线程通过有界队列提交数据, 队列满时等待("block")或暂存到本地文件("spill")
+        self.writer_enabled = True
+        self.writer_queue_columns = 64
+        self.writer_policy = "block"
+        self.writer_spill_path = "temp_scan_spill.bin"
+        self.writer: Optional[ColumnWriter] = None
+        self.submitted_columns = 0  # 本次扫描已提交的波长点数
+        self.recorded_columns = 0  # 本次扫描已写入存储的波长点数
+        # 扫描开始时从仪器读取一次, 写入线程保存检查点时不再访问仪器
+        self.scan_total_points = 0
+        self.scan_sweep_points = 0
+        self.save_block_rows = 4096  # 保存时每次转置写出的频率行数
+        self.save_precision = 6  # CSV/TXT保存的小数位数
+        self.save_workers = 0  # CSV/TXT格式化进程数, 0为不使用多进程
+        # 扫描期间实时写入HDF5
+        self.h5_stream_enabled = False
+        self.h5_stream_path: Optional[str] = None  # None时按时间戳生成
+        self.h5_compression: Optional[str] = "gzip"  # "gzip" / "lzf" / None
+        self.h5_writer: Optional[H5StreamWriter] = None
+        # 当前扫描的坐标轴: 各列的设定波长(nm)和频率范围(Hz), 保存时写入表头
+        self.column_wavelengths: List[float] = []
+        # 各列对应的波长点序号; 迹线为空而跳过的波长点没有列, 续扫从scan_next_point开始
+        self.column_points: List[int] = []
+        self.scan_next_point = 0
+        self.frequency_range: Optional[Tuple[float, float]] = None
+        self.frequency_axis: Optional[np.ndarray] = None  # 数据经过缩减时各频率点的频率
+        # 每个波长点迹线的缩减, 及保留的完整分辨率迹线(列序号见full_columns)
+        self.reducer = TraceReducer()
+        self.full_store: Optional[ScanDataStore] = None
+        self.full_columns: List[int] = []
+        # 扫描过程中逐列累计的统计(峰值、噪底、SNR、-3dB宽度, 及各频率点的均值/最大/最小保持)
+        self.statistics = ScanStatistics()
+        self._statistics_freqs: Optional[np.ndarray] = None
+        # 后台保存线程, 及等待保存完成后删除临时文件的旧数据存储
+        self.export_threads: List[ExportThread] = []
+        self._retired_stores = []
         self.alarm_status = "Normal"
         self.memory_usage_threshold_mb = 500  # 500MB内存使用警告阈值
         self.laser_power = 0.0  # 当前设置的激光器功率
+        self.store: Optional[ScanDataStore] = None  # 当前扫描的数据存储
+        self.data_dtype = np.float64  # 扫描数据存储类型, 见set_data_precision
+        self.pipeline_enabled = True  # 迹线读取与激光器步进并行
+        self.swept_enabled = False  # 扫频模式: 激光器内部扫描触发频谱仪
+        self.swept_margin = 1.2  # 扫频模式停留时间相对扫描+读取时间的余量
+        # 断点续扫: 数据写入磁盘文件并定期保存检查点, 中止后可从下一个波长点继续
+        self.checkpoint_enabled = False
+        self.checkpoint_path = "scan_checkpoint.json"
+        self.checkpoint_columns = 10  # 每完成多少个波长点保存一次检查点
+        self.checkpoint: Optional[ScanCheckpoint] = None
+        self.scan_parameters: Dict[str, Any] = {}  # 最近一次设置的扫描参数, 记录在检查点中
+        # 已保存扫描文件的目录(SQLite), 保存完成后登记扫描参数、文件信息和统计摘要
+        self.catalog_enabled = True
+        self.catalog_path = "scan_catalog.db"
+        self.catalog: Optional[ScanCatalog] = None
+        self._catalog_entries: Dict[str, Dict[str, Any]] = {}  # 后台保存中的文件 -> 开始保存时的记录
+        self.scan_started_at = 0.0
+        self.scan_finished_at = 0.0
         
     def auto_connect_devices(self) -> bool:
         """自动连接设备"""
@@ -288,11 +476,17 @@ class LaserSystemController(QObject):
         analyzer_found = False
         
         try:
-            # 尝试获取可用设备列表
+            # 单次并发探测所有地址, 同时识别激光器和频谱仪
+            try:
+                found = discover_instruments()
+            except Exception as e:
+                self.alarm_triggered.emit(f"搜索设备时出错: {str(e)}")
+                found = {}
+                
             try:
                 # 自动寻找激光器
-                self.alarm_triggered.emit("正在搜索激光器...")
-                laser_addr = TSLController.find_laser()
+                self.alarm_triggered.emit("正在连接激光器...")
+                laser_addr = found["Laser"][1] if "Laser" in found else None
                 if laser_addr:
                     self.device_found.emit("Laser", laser_addr)
                     self.laser = TSLController(laser_addr)
@@ -308,8 +502,8 @@ class LaserSystemController(QObject):
                 
             # 自动寻找频谱仪
             try:
-                self.alarm_triggered.emit("正在搜索频谱仪...")
-                model, analyzer_addr = find_any_analyzer()
+                self.alarm_triggered.emit("正在连接频谱仪...")
+                model, analyzer_addr = found.get("Analyzer", (None, None, None))[:2]
                 if model and analyzer_addr:
                     self.device_found.emit("Analyzer", analyzer_addr)
                     self.analyzer_model = model
@@ -466,6 +660,9 @@ class LaserSystemController(QObject):
     def _init_analyzer_settings(self):
         """初始化频谱仪设置"""
         if self.analyzer:
+            # 协商迹线传输格式并报告结果
+            trace_format = self.analyzer.negotiate_trace_format()
+            self.alarm_triggered.emit(f"频谱仪迹线传输格式: {trace_format}")
             self.analyzer.set_reference_level(0)  # 0 dBm
             self.analyzer.set_sweep_mode(True)
             self.analyzer.set_trigger_source("IMM")
@@ -478,9 +675,8 @@ class LaserSystemController(QObject):
         return 1001, "未连接频谱仪，使用默认点数：1001"
         
     def estimate_memory_usage(self, wl_points: int, freq_points: int) -> float:
-        """估计内存使用量 (MB)"""
-        # 假设每个浮点数8字节
-        bytes_per_point = 8
+        """估计内存使用量 (MB), 按当前存储精度计算"""
+        bytes_per_point = np.dtype(self.data_dtype).itemsize
         total_bytes = wl_points * freq_points * bytes_per_point
         return total_bytes / (1024 * 1024)  # 转换为MB
     def set_scan_parameters(self, start_wl, stop_wl, step, dwell, start_freq, stop_freq, rbw, manual_points: int = -1):
@@ -496,6 +692,11 @@ class LaserSystemController(QObject):
             rbw: 分辨率带宽
             manual_points: 手动设置的采样点数，-1表示自动计算
         """
+        self.scan_parameters = {
+            "start_wl": start_wl, "stop_wl": stop_wl, "step": step, "dwell": dwell,
+            "start_freq": start_freq, "stop_freq": stop_freq, "rbw": rbw,
+            "manual_points": manual_points,
+        }
         if self.laser:
             self.laser.set_scan_parameters(start_wl, stop_wl, step, dwell)
             
@@ -519,7 +720,7 @@ class LaserSystemController(QObject):
             
             # 估计内存使用量
             wl_points = int((stop_wl - start_wl) / step) + 1
-            mem_usage = self.estimate_memory_usage(wl_points, points)
+            mem_usage = self.estimate_memory_usage(wl_points, self.reducer.output_points(points))
             
             # 计算单次扫描时间（ms）
             # 先计算频谱仪单次扫描时间
@@ -534,28 +735,306 @@ class LaserSystemController(QObject):
             
             # 优化内存使用提示和流式写入逻辑
             if mem_usage > 100:  # 降低警告阈值为100MB
-                warning_msg = (f"预计内存使用: {mem_usage:.1f}MB，"
+                warning_msg = (f"预计内存使用: {mem_usage:.1f}MB ({np.dtype(self.data_dtype).name})，"
                               f"已自动启用流式写入模式优化内存使用。")
                 self.memory_warning.emit(mem_usage, warning_msg)
                 
-                # 确保启用流式写入
-                if not self.temp_file_handle:
-                    try:
-                        self.temp_file_handle = open("temp_scan_data.dat", "w")
-                        self.total_columns = 0
-                    except Exception as e:
-                        self.alarm_triggered.emit(f"创建临时文件失败: {str(e)}")
+                # 启用流式写入, 扫描开始时创建文件
+                self.streaming_enabled = True
+            else:
+                self.streaming_enabled = False
 
+    def _open_h5_writer(self):
+        """创建扫描期间实时写入的HDF5文件"""
+        if not self.h5_stream_enabled:
+            return
+        path = self.h5_stream_path or f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.h5"
+        try:
+            self.h5_writer = H5StreamWriter(path, self.frequency_range, dtype=self.data_dtype,
+                                            compression=self.h5_compression,
+                                            frequencies=self.frequency_axis,
+                                            reduction=self._reduction_settings())
+            self.alarm_triggered.emit(f"实时写入HDF5: {path}")
+        except ImportError:
+            self.alarm_triggered.emit("实时写入HDF5失败: 未安装h5py库，请安装后重试")
+        except Exception as e:
+            self.alarm_triggered.emit(f"创建HDF5文件失败: {str(e)}")
+            
+    def record_column(self, powers: np.ndarray, setpoint: float, readback: float,
+                      full_trace: Optional[np.ndarray] = None, point: Optional[int] = None) -> int:
+        """
+        记录一个波长点的频谱数据到数据存储及实时写入的文件
+        启用存储写入线程时提交到写入队列, 写入中的错误在之后的调用中抛出;
+        recorded_columns只在写入存储成功后增加
+        :param full_trace: 数据经过缩减时, 需要保留的完整分辨率迹线
+        :param point: 波长点序号, None表示上一列的下一个波长点
+        :return: 该列的提交序号
+        :raises ValueError: 频率点数与已有数据不一致
+        """
+        index = self.submitted_columns
+        if self.writer is not None:
+            self.writer.submit(powers, setpoint, readback, full_trace, point)
+        else:
+            self._write_column(powers, setpoint, readback, full_trace, point)
+        self.submitted_columns += 1
+        return index
+        
+    def _write_column(self, powers: np.ndarray, setpoint: float, readback: float,
+                      full_trace: Optional[np.ndarray] = None, point: Optional[int] = None):
+        """写入一列到数据存储、完整迹线存储和实时写入的HDF5文件, 更新统计并按间隔保存检查点"""
+        index = self.store.append(powers)
+        self.column_wavelengths.append(setpoint)
+        if point is None:
+            point = self.column_points[-1] + 1 if self.column_points else 0
+        self.column_points.append(point)
+        self.recorded_columns += 1
+        stats = self._add_statistics(powers)
+        if full_trace is not None and self.full_store is not None:
+            try:
+                self.full_store.append(full_trace)
+                self.full_columns.append(index)
+            except ValueError as e:
+                self.alarm_triggered.emit(f"完整迹线未保存: {str(e)}")
+                full_trace = None
+        if self.h5_writer is not None:
+            try:
+                self.h5_writer.append(powers, setpoint, readback, stats=stats)
+                if full_trace is not None:
+                    self.h5_writer.append_full(index, full_trace)
+            except Exception as e:
+                # 实时写入失败不影响扫描, 停止写入HDF5
+                self.alarm_triggered.emit(f"HDF5写入失败, 已停止实时写入: {str(e)}")
+                self._close_h5_writer()
+        if stats is not None:
+            # 峰值保持等缩减方式下没有噪底和SNR
+            noise = ("" if np.isnan(stats['noise_floor']) else
+                     f"噪底 {stats['noise_floor']:.2f}dBm, SNR {stats['snr']:.2f}dB, ")
+            self.alarm_triggered.emit(
+                f"{setpoint:.4f}nm: 峰值 {stats['peak_power']:.2f}dBm @ {stats['peak_frequency'] / 1e6:.3f}MHz, "
+                f"{noise}-3dB宽度 {stats['width_3db'] / 1e3:.3f}kHz")
+        self.update_checkpoint()
+        
+    def _open_writer(self):
+        """创建存储写入线程"""
+        self.writer = None
+        if not self.writer_enabled:
+            return
+        spill_path = None
+        if self.writer_policy == "spill":
+            spill_path = self._temp_path(self.writer_spill_path, datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+        try:
+            self.writer = ColumnWriter(self._write_column, self.writer_queue_columns,
+                                       self.writer_policy, spill_path)
+        except ValueError as e:
+            self.alarm_triggered.emit(f"存储写入线程设置无效, 在采集线程中写入: {str(e)}")
+            
+    def close_writer(self) -> bool:
+        """
+        写入队列中的全部数据并结束存储写入线程(扫描结束时由扫描线程调用)
+        :return: 已提交的数据是否全部写入
+        """
+        if self.writer is None:
+            return self.recorded_columns >= self.submitted_columns
+        writer, self.writer = self.writer, None
+        try:
+            writer.close()
+        except Exception as e:
+            self.alarm_triggered.emit(f"数据存储错误: {str(e)}")
+        m = writer.metrics()
+        self.alarm_triggered.emit(
+            f"存储队列: 最大深度{m['max_depth']}/{writer.max_queue}, "
+            f"平均写入{m['mean_write_time'] * 1000:.2f}ms, 最大延迟{m['max_latency'] * 1000:.1f}ms, "
+            f"采集等待{m['blocked_time']:.2f}s, 暂存{m['spilled']}列")
+        if self.recorded_columns < self.submitted_columns:
+            self.alarm_triggered.emit(
+                f"警告: {self.submitted_columns - self.recorded_columns}个波长点的数据未能写入存储")
+            return False
+        return True
+            
+    def writer_metrics(self) -> Dict[str, float]:
+        """存储写入线程的队列深度和写入耗时, 未启用时为空"""
+        return self.writer.metrics() if self.writer is not None else {}
+        
+    def _statistics_frequencies(self, points: int) -> np.ndarray:
+        """统计使用的频率轴(Hz), 没有频率范围时为频率点序号"""
+        freqs = self._statistics_freqs
+        if freqs is None or len(freqs) != points:
+            if self.frequency_axis is not None and len(self.frequency_axis) == points:
+                freqs = np.asarray(self.frequency_axis, dtype=np.float64)
+            elif self.frequency_range is not None:
+                freqs = np.linspace(self.frequency_range[0], self.frequency_range[1], points)
+            else:
+                freqs = np.arange(points, dtype=np.float64)
+            self._statistics_freqs = freqs
+        return freqs
+        
+    def _new_statistics(self) -> ScanStatistics:
+        """按当前RBW和缩减方式创建扫描统计"""
+        return ScanStatistics(self.statistics.noise_percentile, rbw=self.scan_parameters.get("rbw"),
+                              noise_valid=self.reducer.preserves_noise(self.scan_sweep_points))
+        
+    def _add_statistics(self, powers: np.ndarray) -> Optional[Dict[str, float]]:
+        """更新逐列统计, 统计失败不影响数据记录"""
+        try:
+            return self.statistics.add(powers, self._statistics_frequencies(len(powers)))
+        except Exception as e:
+            self.alarm_triggered.emit(f"统计计算失败: {str(e)}")
+            return None
+            
+    def _rebuild_statistics(self):
+        """继续扫描时按已写入的数据重新计算统计"""
+        self.statistics = self._new_statistics()
+        self._statistics_freqs = None
+        view = self.store.view()
+        for i in range(view.shape[1]):
+            self._add_statistics(decode_power(view[:, i]))
+            
+    def _write_frequency_statistics(self):
+        """将各频率点的累计统计写入实时写入的HDF5文件"""
+        if self.h5_writer is not None and len(self.statistics) > 0:
+            self.h5_writer.write_frequency_statistics(self.statistics.frequency_statistics())
+            
+    def _close_h5_writer(self):
+        """关闭实时写入的HDF5文件"""
+        if self.h5_writer is None:
+            return
+        writer, self.h5_writer = self.h5_writer, None
+        try:
+            if len(self.statistics) > 0:
+                writer.write_frequency_statistics(self.statistics.frequency_statistics())
+            writer.close()
+            self.alarm_triggered.emit(f"HDF5数据已写入: {writer.path} ({writer.columns}个波长点)")
+            if writer.columns > 0:
+                self.register_scan_file(writer.path)
+        except Exception as e:
+            self.alarm_triggered.emit(f"关闭HDF5文件失败: {str(e)}")
+            
+    def finish_store(self):
+        """结束写入: 流式写入文件同步到磁盘, 数据改由只读映射访问"""
+        try:
+            if isinstance(self.store, SpoolWriter):
+                self.store = self.store.close()
+            elif isinstance(self.store, MemmapScanStore):
+                self.store.flush()
+        except Exception as e:
+            self.alarm_triggered.emit(f"关闭流式写入文件失败: {str(e)}")
+        self._close_h5_writer()
+                
+    @staticmethod
+    def _temp_path(path: str, stamp: str) -> str:
+        """在临时文件名中加入时间戳"""
+        base, ext = os.path.splitext(path)
+        return f"{base}_{stamp}{ext}"
+        
+    def _remove_store_files(self, store):
+        """删除流式写入存储的临时文件(映射文件及列数文件, 或追加写入文件)"""
+        paths = []
+        if isinstance(store, MemmapScanStore):
+            store._data = None  # 释放映射
+            paths = [store.path, store.meta_path]
+        elif isinstance(store, (SpoolWriter, SpoolReader)):
+            paths = [store.path]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            
+    @property
+    def power_matrix(self) -> np.ndarray:
+        """
+        当前扫描数据: 频率点(行) × 波长点(列), 单位dBm
+        浮点存储时为只读视图; 量化存储时转换为float32副本
+        """
+        if self.store is None:
+            return np.empty((0, 0))
+        return decode_power(self.store.view())
+        
+    def set_data_precision(self, name: str):
+        """
+        设置扫描数据存储精度, 下次扫描开始时生效
+        :param name: "float64" / "float32" / "int16"(0.01 dB量化)
+        """
+        if name not in POWER_DTYPES:
+            raise ValueError(f"不支持的存储精度: {name}")
+        self.data_dtype = POWER_DTYPES[name]
+        
+    def set_reduction(self, mode: str, width: int = 0, keep_every: int = 0):
+        """
+        设置每个波长点迹线的缩减方式, 下次扫描开始时生效
+        :param mode: 见core.reduction.REDUCTION_MODES
+        :param width: 目标输出点数
+        :param keep_every: 每隔多少个波长点保留一次完整迹线, 0为不保留
+        """
+        self.reducer = TraceReducer(mode, width, keep_every)
+        
+    def _reduction_settings(self) -> Optional[dict]:
+        """缩减设置, 未缩减时为None"""
+        return self.reducer.settings() if self.reducer.enabled else None
+        
+    def _init_reduction(self):
+        """按当前采样点数生成缩减后的频率轴, 需要时创建完整迹线存储"""
+        self.frequency_axis = None
+        self.full_store = None
+        self.full_columns = []
+        if not self.reducer.enabled or not self.analyzer:
+            return
+        points = self.analyzer.get_sweep_points() or 0
+        if self.frequency_range is not None and points > 0:
+            self.frequency_axis = self.reducer.frequency_axis(self.frequency_range, points)
+        if self.reducer.keep_every or self.reducer.keep_columns:
+            self.full_store = ScanDataStore(dtype=self.data_dtype)
+        self.alarm_triggered.emit(
+            f"数据缩减: {self.reducer.mode}, {points}点 -> {self.reducer.output_points(points)}点")
+            
     def start_scan(self):
         """开始扫描"""
         if not self.scanning:
             self.scanning = True
-            # 重置数据缓冲区
-            self.power_buffer = []
-            # 重置数据矩阵，防止新数据与旧数据混合
-            if hasattr(self, 'power_matrix'):
-                self.power_matrix = np.zeros((0, 0))
-            self.alarm_triggered.emit("初始化内存数据缓冲区和数据矩阵")
+            # 每次扫描使用新的数据存储, 防止新数据与旧数据混合;
+            # 旧存储可能仍在后台保存, 保存结束后再删除其临时文件
+            self.finish_store()
+            if self.store is not None:
+                self._retired_stores.append(self.store)
+                self._release_stores()
+            # 按波长点数预分配, 临时文件名带时间戳以免覆盖正在保存的数据;
+            # 断点续扫需要数据在磁盘上, 总是使用流式写入
+            expected = self.laser.get_scan_points() if self.laser else 0
+            self.scan_total_points = expected
+            self.scan_sweep_points = (self.analyzer.get_sweep_points() or 0) if self.analyzer else 0
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            streaming = self.streaming_enabled or self.checkpoint_enabled
+            if streaming and self.streaming_backend == "spool":
+                path = self._temp_path(self.spool_path, stamp)
+                self.store = SpoolWriter(path, dtype=self.data_dtype)
+                self.alarm_triggered.emit(f"流式写入数据到: {path}")
+            elif streaming:
+                # 映射文件按 波长点数 × 扫描点数 一次分配
+                path = self._temp_path(self.memmap_path, stamp)
+                rows = self.reducer.output_points(self.scan_sweep_points)
+                self.store = MemmapScanStore(path, expected, rows, dtype=self.data_dtype)
+                self.alarm_triggered.emit(f"数据写入映射文件: {path} ({expected}×{rows})")
+            else:
+                self.store = ScanDataStore(expected, dtype=self.data_dtype)
+                self.alarm_triggered.emit("初始化内存数据缓冲区和数据矩阵")
+            self.column_wavelengths = []
+            self.column_points = []
+            self.scan_next_point = 0
+            self.submitted_columns = 0
+            self.recorded_columns = 0
+            self.scan_started_at = time.time()
+            self.scan_finished_at = 0.0
+            self.statistics = self._new_statistics()
+            self._statistics_freqs = None
+            try:
+                self.frequency_range = self.analyzer.get_frequency_range() if self.analyzer else None
+            except Exception as e:
+                self.frequency_range = None
+                self.alarm_triggered.emit(f"获取频率范围失败: {str(e)}")
+            self._init_reduction()
+            self._open_h5_writer()
+            self.checkpoint = (ScanCheckpoint(self.checkpoint_path, self.checkpoint_columns)
+                               if self.checkpoint_enabled else None)
             
             # 检查设备连接状态
             if not hasattr(self, 'laser') or not hasattr(self, 'analyzer'):
@@ -563,17 +1042,202 @@ class LaserSystemController(QObject):
                 self.scanning = False
                 return
             
-            # 创建并启动扫描线程
-            self.scan_thread = ScanThread(self)
+            self._start_scan_thread()
+            
+    def _start_scan_thread(self, start_index: int = 0):
+        """创建存储写入线程, 创建并启动扫描线程"""
+        self._open_writer()
+        self.scan_thread = ScanThread(self, start_index)
+        
+        # 连接线程信号
+        self.scan_thread.progress_signal.connect(self.scan_progress.emit)
+        self.scan_thread.data_signal.connect(self.data_updated.emit)
+        self.scan_thread.alarm_signal.connect(self.alarm_triggered.emit)
+        self.scan_thread.complete_signal.connect(self.scan_complete.emit)
+        self.scan_thread.finished.connect(self._on_scan_thread_finished)
+        
+        # 启动线程
+        self.scan_thread.start()
+        
+    def _on_scan_thread_finished(self):
+        """扫描线程结束(完成、中止或出错)后允许开始新的扫描"""
+        self.scanning = False
+        
+    def _sync_store(self):
+        """将已写入的数据同步到磁盘"""
+        if isinstance(self.store, SpoolWriter):
+            self.store.sync()
+        elif isinstance(self.store, MemmapScanStore):
+            self.store.flush()
+        if self.h5_writer is not None:
+            self._write_frequency_statistics()
+            self.h5_writer.flush()
             
-            # 连接线程信号
-            self.scan_thread.progress_signal.connect(self.scan_progress.emit)
-            self.scan_thread.data_signal.connect(self.data_updated.emit)
-            self.scan_thread.alarm_signal.connect(self.alarm_triggered.emit)
-            self.scan_thread.complete_signal.connect(self.scan_complete.emit)
+    def _checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        """当前扫描的检查点内容, 数据不在磁盘上时返回None(可在写入线程中调用, 不访问仪器)"""
+        store = self.store
+        if isinstance(store, SpoolWriter):
+            backend = "spool"
+        elif isinstance(store, MemmapScanStore):
+            backend = "memmap"
+        else:
+            return None
+        columns = len(store)
+        points = list(self.column_points[:columns])
+        h5_stream = None
+        if self.h5_writer is not None and len(self.h5_writer) == columns:
+            h5_stream = os.path.abspath(self.h5_writer.path)
+        return {
+            "scan_parameters": self.scan_parameters,
+            "sweep_points": self.scan_sweep_points or store.rows,
+            "reduction": self.reducer.settings(),
+            "total_points": self.scan_total_points,
+            "completed_columns": columns,
+            # 续扫的起始波长点序号; 有跳过的波长点时大于已写入的列数
+            "next_point": max(self.scan_next_point, points[-1] + 1 if points else 0),
+            "last_wavelength": self.column_wavelengths[-1] if self.column_wavelengths else None,
+            "column_wavelengths": list(self.column_wavelengths[:columns]),
+            "column_points": points,
+            "frequency_range": list(self.frequency_range) if self.frequency_range else None,
+            "laser_power": self.laser_power,
+            "store": {"backend": backend, "path": os.path.abspath(store.path),
+                      "dtype": store.dtype.str},
+            "h5_stream": h5_stream,
+        }
+        
+    def missing_points(self, upto: int) -> List[int]:
+        """序号小于upto的波长点中没有写入数据的点"""
+        return sorted(set(range(upto)) - set(self.column_points))
+        
+    def update_checkpoint(self, force: bool = False) -> bool:
+        """
+        同步数据并保存检查点(由扫描线程在每个波长点后调用, 按间隔保存)
+        :param force: 不论间隔立即保存
+        :return: 是否已保存
+        """
+        if self.checkpoint is None or self.store is None:
+            return False
+        if not force and not self.checkpoint.due(len(self.store)):
+            return False
+        state = self._checkpoint_state()
+        if state is None:
+            return False
+        try:
+            self._sync_store()
+            self.checkpoint.save(state)
+            return True
+        except Exception as e:
+            self.alarm_triggered.emit(f"保存检查点失败: {str(e)}")
+            return False
+            
+    def clear_checkpoint(self):
+        """扫描全部完成后删除检查点"""
+        if self.checkpoint is not None:
+            self.checkpoint.remove()
+            self.checkpoint = None
+            
+    def has_checkpoint(self) -> bool:
+        """是否有可以继续的扫描"""
+        return os.path.exists(self.checkpoint_path)
+        
+    def resume_from_checkpoint(self, path: Optional[str] = None) -> bool:
+        """
+        从检查点继续中止的扫描: 重新设置激光器和频谱仪, 打开已写入的数据文件,
+        从下一个波长点继续追加
+        :param path: 检查点文件, 默认为checkpoint_path
+        :return: 是否已开始扫描
+        """
+        if self.scanning:
+            self.alarm_triggered.emit("扫描进行中, 无法继续上次扫描")
+            return False
+        if not self.laser or not self.analyzer:
+            self.alarm_triggered.emit("继续扫描失败: 设备未连接")
+            return False
+        path = path or self.checkpoint_path
+        try:
+            state = ScanCheckpoint.load(path)
+        except ValueError as e:
+            self.alarm_triggered.emit(f"继续扫描失败: {str(e)}")
+            return False
+        if state is None:
+            self.alarm_triggered.emit("没有可以继续的扫描")
+            return False
             
-            # 启动线程
-            self.scan_thread.start()
+        # 按检查点重新设置缩减方式和设备, 采样点数固定为已写入数据的点数
+        reduction = state.get("reduction") or {}
+        self.reducer = TraceReducer(reduction.get("mode", "none"), reduction.get("width", 0),
+                                    reduction.get("keep_every", 0), reduction.get("keep_columns"))
+        params = dict(state["scan_parameters"])
+        params["manual_points"] = state["sweep_points"] or params.get("manual_points", -1)
+        self.set_scan_parameters(**params)
+        if state.get("laser_power"):
+            self.set_laser_power(state["laser_power"])
+        total = self.laser.get_scan_points()
+        if total != state["total_points"]:
+            self.alarm_triggered.emit(f"继续扫描失败: 波长点数不一致 ({total} != {state['total_points']})")
+            return False
+        sweep_points = self.analyzer.get_sweep_points()
+        if state["sweep_points"] and sweep_points != state["sweep_points"]:
+            self.alarm_triggered.emit(f"继续扫描失败: 频谱仪采样点数不一致 ({sweep_points} != {state['sweep_points']})")
+            return False
+            
+        # 打开已写入的数据文件, 检查点之后写入的数据将被覆盖;
+        # 同一次运行中继续时, 先关闭仍指向该文件的存储
+        self.finish_store()
+        columns = state["completed_columns"]
+        info = state["store"]
+        try:
+            if info["backend"] == "spool":
+                store = SpoolWriter.reopen(info["path"], columns)
+            else:
+                store = MemmapScanStore.reopen(info["path"], columns)
+        except (OSError, ValueError) as e:
+            self.alarm_triggered.emit(f"继续扫描失败: 无法打开已写入的数据: {str(e)}")
+            return False
+        if len(store) < columns:
+            self.alarm_triggered.emit(f"数据文件只有{len(store)}个波长点, 从该处继续")
+            columns = len(store)
+            
+        old_store = self.store
+        self.store = store
+        old_path = getattr(old_store, "path", None)
+        if old_store is not None and (old_path is None
+                                      or os.path.abspath(old_path) != os.path.abspath(store.path)):
+            self._retired_stores.append(old_store)
+            self._release_stores()
+        self.data_dtype = store.dtype
+        self.column_wavelengths = list(state["column_wavelengths"][:columns])
+        # 旧版检查点没有记录波长点序号, 各列依次对应波长点
+        self.column_points = list(state.get("column_points", range(columns))[:columns])
+        next_point = state.get("next_point", columns)
+        if columns < state["completed_columns"]:
+            next_point = self.column_points[-1] + 1 if self.column_points else 0
+        self.scan_next_point = next_point
+        if next_point >= total:
+            self.alarm_triggered.emit(f"检查点中的{total}个波长点已全部扫描, 没有可以继续的波长点")
+            return False
+        self.submitted_columns = self.recorded_columns = columns
+        self.scan_total_points = total
+        self.scan_sweep_points = sweep_points or 0
+        freq_range = state.get("frequency_range")
+        self.frequency_range = tuple(freq_range) if freq_range else None
+        self._init_reduction()
+        self._rebuild_statistics()
+        if state.get("h5_stream"):
+            try:
+                self.h5_writer = H5StreamWriter(state["h5_stream"], self.frequency_range,
+                                                resume_columns=columns)
+                self.alarm_triggered.emit(f"继续写入HDF5: {state['h5_stream']}")
+            except Exception as e:
+                self.alarm_triggered.emit(f"无法继续写入HDF5文件: {str(e)}")
+                
+        self.checkpoint = ScanCheckpoint(path, self.checkpoint_columns)
+        self.scan_started_at = time.time()
+        self.scan_finished_at = 0.0
+        self.scanning = True
+        self.alarm_triggered.emit(f"继续扫描: 已完成{next_point}/{total}个波长点, 已写入{columns}列")
+        self._start_scan_thread(next_point)
+        return True
 
     def stop_scan(self):
         """停止扫描"""
@@ -586,12 +1250,7 @@ class LaserSystemController(QObject):
             self.laser.stop_scan()
             
         # 关闭流式写入的文件
-        if self.temp_file_handle:
-            try:
-                self.temp_file_handle.close()
-                self.temp_file_handle = None
-            except:
-                pass
+        self.finish_store()
                 
     def pause_scan(self):
         """暂停扫描"""
@@ -609,215 +1268,179 @@ class LaserSystemController(QObject):
             return True
         return False
 
+    def _check_exportable(self) -> bool:
+        """检查当前是否有可保存的数据, 无数据时发出报警"""
+        if self.store is None:
+            self.alarm_triggered.emit("保存失败: 数据矩阵未初始化")
+            return False
+            
+        rows, columns = self.store.shape
+        if rows == 0 or columns == 0:
+            self.alarm_triggered.emit("保存失败: 数据矩阵为空")
+            return False
+        return True
+        
+    def _export_job(self, filename: str) -> ExportJob:
+        """按当前保存设置创建导出任务"""
+        return ExportJob(self.store, filename, self.save_block_rows,
+                         precision=self.save_precision, workers=self.save_workers,
+                         wavelengths=list(self.column_wavelengths),
+                         freq_range=self.frequency_range,
+                         frequencies=self.frequency_axis,
+                         reduction=self._reduction_settings(),
+                         full_store=self.full_store, full_columns=list(self.full_columns),
+                         statistics=self.statistics.snapshot())
+        
     def simple_save_data(self, filename: str):
-        """统一的数据保存方法(支持CSV/XLSX/TXT/H5DF)"""
+        """统一的数据保存方法(支持CSV/XLSX/TXT/H5DF), 在调用线程中同步执行"""
         try:
-            # 详细检查数据状态
-            if not hasattr(self, 'power_matrix'):
-                self.alarm_triggered.emit("保存失败: 数据矩阵未初始化")
-                return False
-                
-            if self.power_matrix.size == 0:
-                self.alarm_triggered.emit("保存失败: 数据矩阵为空")
-                return False
-                
-            if self.power_matrix.shape[0] == 0 or self.power_matrix.shape[1] == 0:
-                self.alarm_triggered.emit(f"保存失败: 矩阵维度异常 {self.power_matrix.shape}")
-                return False
-                
-            # 确保目录存在
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            
-            # 保存前再次检查数据有效性
-            if not isinstance(self.power_matrix, np.ndarray):
-                self.alarm_triggered.emit("保存失败: 数据格式错误")
-                return False
-                
-            # 确保矩阵非空
-            if self.power_matrix.size == 0:
-                self.alarm_triggered.emit("保存失败: 无数据可保存")
+            if not self._check_exportable():
                 return False
                 
             # 保存矩阵(每行一个频率点，每列一个波长点)
+            rows, columns = self.store.shape
             try:
-                if filename.endswith('.h5') or filename.endswith('.hdf5'):
-                    # 导入h5py模块
-                    try:
-                        import h5py
-                    except ImportError:
-                        self.alarm_triggered.emit("保存H5DF失败: 未安装h5py库，请安装后重试")
-                        return False
-                    
-                    # 保存为H5DF格式
-                    with h5py.File(filename, 'w') as f:
-                        # 创建主数据集
-                        dset = f.create_dataset("power_data", data=self.power_matrix)
-                        
-                        # 添加元数据
-                        dset.attrs['description'] = '激光扫描数据: 频率(行) x 波长(列)'
-                        dset.attrs['frequency_count'] = self.power_matrix.shape[0]
-                        dset.attrs['wavelength_count'] = self.power_matrix.shape[1]
-                        dset.attrs['timestamp'] = str(datetime.now())
-                        
-                        # 创建波长和频率索引数据集
-                        f.create_dataset("wavelength_index", data=np.arange(1, self.power_matrix.shape[1]+1))
-                        f.create_dataset("frequency_index", data=np.arange(1, self.power_matrix.shape[0]+1))
-                    
-                    self.alarm_triggered.emit(f"成功保存H5DF文件: {os.path.basename(filename)}")
-                    
-                elif filename.endswith('.xlsx'):
-                    df = pd.DataFrame(self.power_matrix)
-                    df.columns = [f"WL_{i+1}" for i in range(df.shape[1])]  # 添加波长点列名
-                    df.index = [f"Freq_{i+1}" for i in range(df.shape[0])]   # 添加频率点行名
-                    df.to_excel(filename)
-                    
-                elif filename.endswith('.csv'):
-                    np.savetxt(filename, self.power_matrix, delimiter=',', fmt='%.6f',
-                              header=",".join([f"WL_{i+1}" for i in range(self.power_matrix.shape[1])]))
-                
-                else:  # .txt或其他格式
-                    np.savetxt(filename, self.power_matrix, delimiter='\t', fmt='%.6f',
-                              header="\t".join([f"WL_{i+1}" for i in range(self.power_matrix.shape[1])]))
-                    
-                self.alarm_triggered.emit(f"成功保存数据: {self.power_matrix.shape[1]}个波长点, {self.power_matrix.shape[0]}个频率点")
-                return True
-                
+                self._export_job(filename).run()
+            except ImportError:
+                self.alarm_triggered.emit("保存H5DF失败: 未安装h5py库，请安装后重试")
+                return False
             except Exception as e:
                 self.alarm_triggered.emit(f"保存过程出错: {str(e)}")
                 print(f"保存错误详情: {str(e)}")
                 return False
                 
+            self.register_scan_file(filename)
+            if filename.endswith('.h5') or filename.endswith('.hdf5'):
+                self.alarm_triggered.emit(f"成功保存H5DF文件: {os.path.basename(filename)}")
+            self.alarm_triggered.emit(f"成功保存数据: {columns}个波长点, {rows}个频率点")
+            return True
+                
         except Exception as e:
             self.alarm_triggered.emit(f"保存失败: {str(e)}")
             print(f"保存错误详情: {str(e)}")
             return False
-
-    def _write_column_to_file(self, powers):
-        """将一列数据写入文件"""
-        if not self.temp_file_handle:
-            return
             
-        try:
-            # 如果是第一列，直接写入
-            if self.total_columns == 0:
-                for p in powers:
-                    self.temp_file_handle.write(f"{p}\n")
-            else:
-                # 如果不是第一列，需要修改文件
-                # 这种方法对大文件很低效，但简单起见先这样实现
-                # 实际产品应该使用更高效的方法如追加列等
-                self.temp_file_handle.seek(0)  # 回到文件开头
-                lines = self.temp_file_handle.readlines()
-                self.temp_file_handle.seek(0)  # 准备重写
-                self.temp_file_handle.truncate()  # 清空文件
-                
-                # 写入每行，添加新的列
-                for i, line in enumerate(lines):
-                    if i < len(powers):
-                        # 移除末尾的换行符，添加分隔符和新的值
-                        new_line = line.rstrip('\n') + ',' + str(powers[i]) + '\n'
-                        self.temp_file_handle.write(new_line)
-                    else:
-                        # 如果新数据列比旧数据短，保持旧数据不变
-                        self.temp_file_handle.write(line)
-                        
-                # 如果新数据比旧数据长，添加额外的行
-                if len(powers) > len(lines):
-                    for i in range(len(lines), len(powers)):
-                        # 为前面的列添加空值
-                        prefix = ',' * self.total_columns
-                        self.temp_file_handle.write(f"{prefix}{powers[i]}\n")
-                        
-            # 刷新文件，确保写入磁盘
-            self.temp_file_handle.flush()
+    def export_data(self, filename: str) -> bool:
+        """
+        在后台线程保存当前扫描数据, 进度由export_progress报告, 完成后发出export_finished
+        导出持有本次扫描的数据存储, 期间可以开始下一次扫描
+        :return: 是否已开始导出
+        """
+        if not self._check_exportable():
+            return False
             
-        except Exception as e:
-            self.alarm_triggered.emit(f"写入文件错误: {str(e)}")
-
-    def _scan_thread(self):
-        """扫描线程"""
+        # 开始保存时记录扫描信息, 保存期间可能已开始下一次扫描
+        self._catalog_entries[filename] = self._catalog_entry(filename)
+        thread = ExportThread(self._export_job(filename))
+        thread.progress_signal.connect(self.export_progress.emit)
+        thread.done_signal.connect(self._on_export_done)
+        thread.finished.connect(self._release_stores)
+        self.export_threads.append(thread)
+        thread.start()
+        self.alarm_triggered.emit(f"后台保存: {os.path.basename(filename)}")
+        return True
+        
+    def cancel_exports(self):
+        """取消所有正在进行的后台保存"""
+        for thread in self.export_threads:
+            thread.cancel()
+            
+    def is_exporting(self) -> bool:
+        """是否有后台保存正在进行"""
+        return any(thread.isRunning() for thread in self.export_threads)
+        
+    def wait_exports(self):
+        """等待所有后台保存完成(退出程序前调用)"""
+        for thread in list(self.export_threads):
+            thread.wait()
+        self._release_stores()
+            
+    def _on_export_done(self, success: bool, message: str, filename: str):
+        """后台保存完成"""
+        entry = self._catalog_entries.pop(filename, None)
+        if success:
+            self.register_scan_file(filename, entry)
+        self.alarm_triggered.emit(message)
+        self.export_finished.emit(success, filename)
+        
+    def _catalog_entry(self, path: str) -> Dict[str, Any]:
+        """按当前扫描生成目录记录"""
+        params = self.scan_parameters
+        start_freq, stop_freq = (self.frequency_range if self.frequency_range
+                                 else (params.get("start_freq"), params.get("stop_freq")))
+        rows, columns = self.store.shape if self.store is not None else (0, 0)
+        total = self.scan_total_points or columns
+        finished = self.scan_finished_at if self.scan_finished_at >= self.scan_started_at else time.time()
+        entry = {
+            "file_path": path,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "duration": finished - self.scan_started_at if self.scan_started_at else None,
+            "analyzer_model": self.analyzer_model,
+            "start_wavelength": params.get("start_wl"),
+            "stop_wavelength": params.get("stop_wl"),
+            "wavelength_step": params.get("step"),
+            "wavelength_points": columns,
+            "start_frequency": start_freq,
+            "stop_frequency": stop_freq,
+            "span": stop_freq - start_freq if start_freq is not None and stop_freq is not None else None,
+            "rbw": params.get("rbw"),
+            "sweep_points": self.scan_sweep_points or rows,
+            "stored_points": rows,
+            "laser_power": self.laser_power,
+            "dtype": np.dtype(self.data_dtype).name,
+            "reduction": (f"{self.reducer.mode}:{self.reducer.width}"
+                          if self.reducer.enabled else "none"),
+            "complete": int(bool(total) and columns >= total),
+        }
+        entry.update(statistics_summary(self.statistics.snapshot(), self.column_wavelengths))
+        return entry
+        
+    def open_catalog(self) -> Optional[ScanCatalog]:
+        """打开扫描文件目录, 未启用或无法打开时返回None"""
+        if self.catalog is None and self.catalog_enabled:
+            try:
+                self.catalog = ScanCatalog(self.catalog_path)
+            except Exception as e:
+                self.alarm_triggered.emit(f"无法打开扫描目录: {str(e)}")
+        return self.catalog
+        
+    def register_scan_file(self, path: str, entry: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        在目录中登记保存的扫描文件
+        :param entry: 记录内容, 默认按当前扫描生成
+        """
+        catalog = self.open_catalog()
+        if catalog is None:
+            return False
         try:
-            if not self.laser or not self.analyzer:
-                raise Exception("设备未连接")
-                
-            self.laser.start_scan()
-            total_points = len(range(int((self.laser.stop_wl - self.laser.start_wl) / self.laser.step)))
-            current_point = 0
+            catalog.register(entry or self._catalog_entry(path))
+            return True
+        except Exception as e:
+            self.alarm_triggered.emit(f"登记扫描目录失败: {str(e)}")
+            return False
             
-            while self.scanning:
-                current_wl = self.laser.get_wavelength()
-                
-                # 获取频谱数据
-                spectrum_data = self.analyzer.get_spectrum_data()
-                
-                # 获取当前频率范围用于显示
-                if self.analyzer_model == "N9010B":
-                    # Keysight使用中心频率和带宽
-                    start_freq = float(self.analyzer.query(":SENS:FREQ:STAR?"))
-                    stop_freq = float(self.analyzer.query(":SENS:FREQ:STOP?"))
-                else:
-                    # 中科思仪直接使用起始和终止频率
-                    start_freq = float(self.analyzer.query(":SENSe:FREQuency:STARt?"))
-                    stop_freq = float(self.analyzer.query(":SENSe:FREQuency:STOP?"))
-                
-                freq_step = (stop_freq - start_freq) / (len(spectrum_data) - 1)
-                
-                # 生成频率列表用于显示
-                freqs = [start_freq + i * freq_step for i in range(len(spectrum_data))]
-                powers = spectrum_data
-                
-                # 如果使用流式写入，直接写入文件
-                if self.temp_file_handle:
-                    self._write_column_to_file(powers)
-                    self.total_columns += 1
-                else:
-                    # 调试日志：记录接收到的数据
-                    print(f"[DEBUG] 接收到波长点数据，长度: {len(powers)}")
-                    
-                    # 检查数据有效性
-                    if len(powers) == 0:
-                        print("[WARNING] 接收到空数据点")
-                        return
-                        
-                    # 添加到内存缓冲区
-                    self.power_buffer.append(powers)
-                    print(f"[DEBUG] 当前缓冲区数据点数量: {len(self.power_buffer)}")
-
-                    # 如果缓冲区过大，清除最早的数据以节省内存
-                    if len(self.power_buffer) > self.buffer_max_size:
-                        self.power_buffer = self.power_buffer[-self.buffer_max_size:]
-                        print("[DEBUG] 清理缓冲区以节省内存")
-                
-                # 获取当前频谱的峰值功率用于报警判断
-                peak_power = max(powers) if powers else -100
-                
-                # 发射信号更新界面频谱图
-                self.data_updated.emit(freqs, powers)
-                
-                # 更新进度
-                current_point += 1
-                progress = int(100 * current_point / total_points)
-                self.scan_progress.emit(progress, current_wl)
-                
-                # 检查报警条件
-                self._check_alarm_conditions(current_wl, peak_power)
-                
-                time.sleep(0.1)  # 避免过快采样
-                
+    def search_catalog(self, **filters) -> List[Dict[str, Any]]:
+        """查询已保存的扫描, 条件见ScanCatalog.query"""
+        catalog = self.open_catalog()
+        if catalog is None:
+            return []
+        try:
+            return catalog.query(**filters)
         except Exception as e:
-            self.alarm_triggered.emit(f"扫描错误: {str(e)}")
-        finally:
-            self.scanning = False
-            if self.analyzer:
-                self.analyzer.auto_scale()
-            # 关闭文件
-            if self.temp_file_handle:
-                try:
-                    self.temp_file_handle.close()
-                    self.temp_file_handle = None
-                except:
-                    pass
-            self.scan_complete.emit()
+            self.alarm_triggered.emit(f"查询扫描目录失败: {str(e)}")
+            return []
+            
+    def _release_stores(self):
+        """清理已结束的导出线程, 删除不再使用的临时数据文件"""
+        self.export_threads = [t for t in self.export_threads if t.isRunning()]
+        in_use = [t.job.store for t in self.export_threads]
+        remaining = []
+        for store in self._retired_stores:
+            if any(store is used for used in in_use):
+                remaining.append(store)
+            else:
+                self._remove_store_files(store)
+        self._retired_stores = remaining
 
     def _check_alarm_conditions(self, wavelength: float, power: float):
         """检查报警条件"""
@@ -830,6 +1453,16 @@ class LaserSystemController(QObject):
         else:
             self.alarm_status = "Normal"
             
+    def dump_io_trace(self, n: int = 100, directory: Optional[str] = None) -> Optional[str]:
+        """将最近n条I/O事务写入日志文件, 返回文件路径"""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = os.path.join(directory or os.getcwd(), f"io_trace_{timestamp}.log")
+            return tracer.dump_to_file(filename, n)
+        except Exception as e:
+            self.alarm_triggered.emit(f"保存I/O追踪失败: {str(e)}")
+            return None
+            
     def get_analyzer_info(self) -> dict:
         """获取频谱仪信息"""
         if not self.analyzer:
@@ -845,15 +1478,14 @@ class LaserSystemController(QObject):
         
     def get_data_info(self) -> dict:
         """获取数据信息"""
-        columns = len(self.power_buffer)
-        rows = len(self.power_buffer[0]) if columns > 0 else 0
+        rows, columns = self.store.shape if self.store is not None else (0, 0)
         
-        if self.temp_file_handle:
+        if isinstance(self.store, (SpoolWriter, SpoolReader, MemmapScanStore)):
             # 如果使用流式写入，返回文件信息
             return {
-                "wave_length_points": self.total_columns,
+                "wave_length_points": columns,
                 "frequency_points": rows,
-                "total_points": self.total_columns * rows,
+                "total_points": columns * rows,
                 "streaming_mode": True,
                 "buffer_points": 0
             }
@@ -0,0 +1,382 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.h5_stream import write_power_attrs, write_reduction_attrs, write_statistics
+from core.scan_store import decode_power, power_scale
+from core.statistics import COLUMN_FIELDS, FREQUENCY_FIELDS
+
+
+# 文本导出每块最多格式化的数值个数, 以及写文件缓冲区大小
+TEXT_BLOCK_CELLS = 1 << 20
+WRITE_BUFFER = 8 << 20
+# Excel单个工作表的行数和列数上限
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_COLUMNS = 16384
+
+
+def format_rows(block: np.ndarray, delimiter: str = ',', precision: int = 6) -> bytes:
+    """
+    将 频率行块×波长点 格式化为定点小数文本, 每行一个频率点, 结果与'%.{precision}f'一致
+    各位数字用numpy整数运算一次生成(每个数位一次数组运算), 不逐个数值调用Python代码;
+    舍入按 数值×10^precision 取整, 恰好处于舍入中点附近时最后一位可能与printf相差1
+    """
+    rows, columns = block.shape
+    if rows == 0 or columns == 0:
+        return b""
+    values = np.asarray(block, dtype=np.float64)
+    scaled = np.rint(np.abs(values) * 10.0 ** precision)
+    if len(delimiter) != 1 or not np.isfinite(scaled).all() or scaled.max() >= 2.0 ** 62:
+        # 含nan/inf或超出整数范围时逐行格式化
+        row_format = delimiter.join([f"%.{precision}f"] * columns) + "\n"
+        return ((row_format * rows) % tuple(values.ravel().tolist())).encode("ascii")
+
+    scaled = scaled.astype(np.int64).ravel()
+    integer, fraction = np.divmod(scaled, 10 ** precision)
+    int_width = len(str(int(integer.max())))
+    # 位数较少时用int32运算, 速度约为int64的两倍
+    if int_width < 10:
+        integer = integer.astype(np.int32)
+    if precision < 10:
+        fraction = fraction.astype(np.int32)
+
+    # 每个数值占固定宽度: 符号+整数部分(右对齐) [+小数点+小数部分] +分隔符, 空位为0字节
+    point = 1 + int_width
+    width = point + (1 + precision if precision > 0 else 0) + 1
+    chars = np.zeros((width, integer.size), dtype=np.uint8)  # 按字符位置存放, 每次写入连续
+    digits = np.ones(integer.shape, dtype=np.intp)  # 整数部分位数
+    remaining = integer
+    for k in range(int_width):
+        quotient = remaining // 10
+        digit = (remaining - 10 * quotient + 48).astype(np.uint8)
+        if k > 0:
+            # 整数部分高位的0不输出
+            digit[remaining == 0] = 0
+            digits += remaining > 0
+        chars[point - 1 - k] = digit
+        remaining = quotient
+    sign = np.signbit(values.ravel())
+    cells = np.flatnonzero(sign)
+    chars[point - 1 - digits[cells], cells] = ord('-')
+    if precision > 0:
+        chars[point] = ord('.')
+        for k in range(precision):
+            quotient = fraction // 10
+            chars[point + precision - k] = fraction - 10 * quotient + 48
+            fraction = quotient
+    chars[-1] = ord(delimiter)
+    chars[-1].reshape(rows, columns)[:, -1] = ord('\n')
+    chars = np.ascontiguousarray(chars.T)
+    return chars[chars != 0].tobytes()
+
+
+class ExportCancelled(Exception):
+    """导出已被取消"""
+
+
+class ExportJob:
+    """一次数据导出: 从扫描数据存储按频率行块写出到文件, 可报告进度并取消
+
+    支持CSV/XLSX/TXT/H5DF, 格式由文件扩展名决定。
+    """
+
+    def __init__(self, store, filename: str, block_rows: int = 4096,
+                 precision: int = 6, workers: int = 0,
+                 wavelengths: Optional[Sequence[float]] = None,
+                 freq_range: Optional[Tuple[float, float]] = None,
+                 frequencies: Optional[np.ndarray] = None,
+                 reduction: Optional[dict] = None,
+                 full_store=None, full_columns: Optional[Sequence[int]] = None,
+                 statistics: Optional[dict] = None):
+        """
+        :param store: 扫描数据存储(ScanDataStore/MemmapScanStore/SpoolReader等)
+        :param filename: 输出文件名
+        :param block_rows: 每次写出的频率行数
+        :param precision: CSV/TXT的小数位数
+        :param workers: CSV/TXT格式化使用的进程数, 小于2时在当前线程格式化
+        :param wavelengths: 各波长点的波长(nm), 用于XLSX表头
+        :param freq_range: (起始频率, 终止频率) Hz, 用于XLSX的频率列
+        :param frequencies: 各频率点的频率(Hz), 数据经过缩减时给出, 优先于freq_range
+        :param reduction: 数据缩减设置, 记录在H5DF文件中
+        :param full_store: 保留完整分辨率迹线的存储, 保存到H5DF文件的full_resolution组
+        :param full_columns: full_store各列对应的波长点序号
+        :param statistics: 扫描统计(ScanStatistics.snapshot()), H5DF写入statistics组,
+            XLSX写入单独的工作表, CSV/TXT写入同名的_column_stats/_frequency_stats文件
+        """
+        self.store = store
+        self.filename = filename
+        self.block_rows = block_rows
+        self.precision = precision
+        self.workers = workers
+        self.wavelengths = None if wavelengths is None else np.asarray(wavelengths, dtype=np.float64)
+        self.freq_range = freq_range
+        self.frequencies = frequencies
+        self.reduction = reduction
+        self.full_store = full_store
+        self.full_columns = list(full_columns or [])
+        self.statistics = statistics
+        self.cancelled = False
+        self.progress_callback: Optional[Callable[[int], None]] = None  # 参数为百分比
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(频率点数, 波长点数)"""
+        return self.store.shape
+
+    def cancel(self):
+        """请求取消, 在下一个行块前生效"""
+        self.cancelled = True
+
+    def run(self):
+        """
+        执行导出, 取消时删除未完成的文件
+        :raises ExportCancelled: 导出被取消
+        :raises ImportError: 保存H5DF时未安装h5py
+        """
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            if self.filename.endswith('.h5') or self.filename.endswith('.hdf5'):
+                self._save_h5()
+            elif self.filename.endswith('.xlsx'):
+                self._save_xlsx()
+            elif self.filename.endswith('.csv'):
+                self._save_text(',')
+            else:  # .txt或其他格式
+                self._save_text('\t')
+        except ExportCancelled:
+            self._remove_partial()
+            raise
+        self._report(100)
+
+    def _report(self, percent: int):
+        if self.progress_callback is not None:
+            self.progress_callback(percent)
+
+    def _remove_partial(self):
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+    def _frequency_axis(self) -> Optional[np.ndarray]:
+        """各频率点的频率(Hz), 未知时为None"""
+        rows = self.shape[0]
+        if self.frequencies is not None and len(self.frequencies) == rows:
+            return np.asarray(self.frequencies, dtype=np.float64)
+        if self.freq_range is not None:
+            return np.linspace(self.freq_range[0], self.freq_range[1], rows)
+        return None
+
+    def _statistics_tables(self) -> List[Tuple[str, str, List[str], np.ndarray]]:
+        """统计结果表格: (文件名后缀, 工作表名, 表头, 数据), 每行为一个波长点或频率点"""
+        if not self.statistics:
+            return []
+        tables = []
+        column = self.statistics.get("column", {})
+        count = len(column.get("peak_power", ()))
+        if count:
+            wavelengths = self.wavelengths
+            if wavelengths is None or len(wavelengths) < count:
+                wavelengths = np.full(count, np.nan)
+            data = np.column_stack([np.arange(1, count + 1), wavelengths[:count]]
+                                   + [column[name] for name in COLUMN_FIELDS])
+            header = ["WL", "wavelength(nm)"] + [f"{name}({unit})" for name, unit in COLUMN_FIELDS.items()]
+            tables.append(("_column_stats", "波长点统计", header, data))
+        frequency = self.statistics.get("frequency", {})
+        points = len(frequency.get("mean", ()))
+        if points:
+            axis = self._frequency_axis()
+            if axis is None or len(axis) != points:
+                axis = np.full(points, np.nan)
+            data = np.column_stack([np.arange(1, points + 1), axis]
+                                   + [frequency[name] for name in FREQUENCY_FIELDS])
+            header = ["Freq", "frequency(Hz)"] + [f"{name}({unit})" for name, unit in FREQUENCY_FIELDS.items()]
+            tables.append(("_frequency_stats", "频率点统计", header, data))
+        return tables
+
+    @property
+    def decimals(self) -> Optional[int]:
+        """量化存储时数据的有效小数位数, 浮点存储时为None"""
+        scale = power_scale(self.store.dtype)
+        return None if scale == 1.0 else max(0, int(round(-np.log10(scale))))
+
+    def _blocks(self, block_rows: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """按行块读取数据, 每块之前检查取消并报告进度"""
+        rows = self.shape[0]
+        for start, block in self.store.iter_row_blocks(block_rows or self.block_rows):
+            if self.cancelled:
+                raise ExportCancelled()
+            yield start, block
+            self._report(min(99, int(100 * (start + len(block)) / rows)))
+
+    def _save_h5(self):
+        """保存为H5DF格式"""
+        import h5py
+
+        rows, columns = self.shape
+        with h5py.File(self.filename, 'w') as f:
+            # 创建主数据集, 按频率行块写入(流式写入时为分块转置)
+            dset = f.create_dataset("power_data", shape=(rows, columns), dtype=self.store.dtype)
+            for start, block in self._blocks():
+                dset[start:start + len(block)] = block
+
+            # 添加元数据
+            dset.attrs['description'] = '激光扫描数据: 频率(行) x 波长(列)'
+            write_power_attrs(dset)
+            dset.attrs['frequency_count'] = rows
+            dset.attrs['wavelength_count'] = columns
+            dset.attrs['timestamp'] = str(datetime.now())
+
+            # 创建波长和频率索引数据集
+            f.create_dataset("wavelength_index", data=np.arange(1, columns + 1))
+            f.create_dataset("frequency_index", data=np.arange(1, rows + 1))
+            if self.wavelengths is not None and len(self.wavelengths) >= columns:
+                f.create_dataset("wavelength", data=self.wavelengths[:columns])
+                f["wavelength"].attrs['unit'] = 'nm'
+            frequency = self._frequency_axis()
+            if frequency is not None:
+                f.create_dataset("frequency", data=frequency)
+                f["frequency"].attrs['unit'] = 'Hz'
+
+            # 数据缩减设置及保留的完整分辨率迹线
+            if self.reduction:
+                write_reduction_attrs(dset, self.reduction)
+            if self.full_store is not None and len(self.full_store) > 0:
+                group = f.create_group("full_resolution")
+                full = group.create_dataset("power_data", data=self.full_store.view())
+                write_power_attrs(full)
+                group.create_dataset("column_index", data=np.asarray(self.full_columns[:len(self.full_store)]))
+            if self.statistics:
+                write_statistics(f, self.statistics)
+
+    def _save_xlsx(self):
+        """
+        以只写模式流式保存Excel文件, 内存占用与数据量无关
+        超出单个工作表的行数/列数上限时按 频率段×波长段 拆分为多个工作表,
+        每个工作表都带表头行(波长点名称、波长)和表头列(频率点名称、频率)
+        """
+        from openpyxl import Workbook
+
+        rows, columns = self.shape
+        wavelengths = self.wavelengths
+        if wavelengths is not None and len(wavelengths) < columns:
+            wavelengths = None
+        frequency = self._frequency_axis()
+
+        header_rows = 1 if wavelengths is None else 2
+        index_columns = 1 if frequency is None else 2
+        sheet_rows = XLSX_MAX_ROWS - header_rows
+        sheet_columns = XLSX_MAX_COLUMNS - index_columns
+        row_parts = range(0, rows, sheet_rows)
+        column_parts = range(0, columns, sheet_columns)
+
+        wb = Workbook(write_only=True)
+        sheets = {}
+        for i, row_start in enumerate(row_parts):
+            for j, col_start in enumerate(column_parts):
+                title = "Sheet1" if len(row_parts) * len(column_parts) == 1 else f"F{i + 1}_W{j + 1}"
+                ws = wb.create_sheet(title)
+                col_stop = min(col_start + sheet_columns, columns)
+                frequency_header = [] if frequency is None else ["频率(Hz)"]
+                ws.append(["频率点"] + frequency_header + [f"WL_{c + 1}" for c in range(col_start, col_stop)])
+                if wavelengths is not None:
+                    ws.append(["波长(nm)"] + [""] * len(frequency_header)
+                              + wavelengths[col_start:col_stop].tolist())
+                sheets[i, j] = (ws, col_start, col_stop)
+
+        decimals = self.decimals
+        for start, block in self._blocks():
+            block = decode_power(block)
+            if decimals is not None:
+                block = np.round(block.astype(np.float64), decimals)
+            values = block.tolist()
+            for r, row in enumerate(values):
+                index = start + r
+                label = [f"Freq_{index + 1}"]
+                if frequency is not None:
+                    label.append(float(frequency[index]))
+                part = index // sheet_rows
+                for j in range(len(column_parts)):
+                    ws, col_start, col_stop = sheets[part, j]
+                    ws.append(label + row[col_start:col_stop])
+
+        # 统计结果, 每个波长点/频率点一行
+        for _, title, header, data in self._statistics_tables():
+            ws = wb.create_sheet(title)
+            ws.append(header)
+            for row in data[:XLSX_MAX_ROWS - 1].tolist():
+                ws.append(row)
+        wb.save(self.filename)
+
+    def _save_text(self, delimiter: str):
+        """按频率行块格式化并写出文本矩阵, 不需要一次载入全部数据"""
+        columns = self.shape[1]
+        with open(self.filename, 'wb', buffering=WRITE_BUFFER) as f:
+            header = "# " + delimiter.join([f"WL_{i+1}" for i in range(columns)]) + "\n"
+            f.write(header.encode("ascii"))
+            for text in self._formatted_blocks(delimiter):
+                f.write(text)
+
+        # 统计结果写入同目录下的附加文件
+        base, ext = os.path.splitext(self.filename)
+        for suffix, _, header, data in self._statistics_tables():
+            with open(base + suffix + ext, 'wb') as f:
+                f.write(("# " + delimiter.join(header) + "\n").encode("utf-8"))
+                f.write(format_rows(data, delimiter, self.precision))
+
+    def _formatted_blocks(self, delimiter: str) -> Iterator[bytes]:
+        """按顺序返回各行块的文本; 多进程时最多提前格式化2×进程数个块"""
+        block_rows = max(1, min(self.block_rows, TEXT_BLOCK_CELLS // max(self.shape[1], 1)))
+        blocks = ((start, decode_power(block)) for start, block in self._blocks(block_rows))
+        # 量化存储时不输出超出量化精度的小数位
+        precision = self.precision if self.decimals is None else min(self.precision, self.decimals)
+        if self.workers < 2:
+            for _, block in blocks:
+                yield format_rows(block, delimiter, precision)
+            return
+
+        with ProcessPoolExecutor(self.workers) as pool:
+            pending = deque()
+            for _, block in blocks:
+                pending.append(pool.submit(format_rows, np.ascontiguousarray(block),
+                                           delimiter, precision))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+class ExportThread(QThread):
+    """后台导出线程"""
+    progress_signal = pyqtSignal(int, str)  # 百分比, 文件名
+    done_signal = pyqtSignal(bool, str, str)  # 是否成功, 信息, 文件名
+
+    def __init__(self, job: ExportJob):
+        super().__init__()
+        self.job = job
+        job.progress_callback = lambda percent: self.progress_signal.emit(percent, job.filename)
+
+    def cancel(self):
+        """取消导出"""
+        self.job.cancel()
+
+    def run(self):
+        """线程运行函数"""
+        rows, columns = self.job.shape
+        try:
+            self.job.run()
+            self.done_signal.emit(True, f"成功保存数据: {columns}个波长点, {rows}个频率点", self.job.filename)
+        except ExportCancelled:
+            self.done_signal.emit(False, f"已取消保存: {os.path.basename(self.job.filename)}", self.job.filename)
+        except ImportError:
+            self.done_signal.emit(False, "保存H5DF失败: 未安装h5py库，请安装后重试", self.job.filename)
+        except Exception as e:
+            print(f"保存错误详情: {str(e)}")
+            self.done_signal.emit(False, f"保存过程出错: {str(e)}", self.job.filename)
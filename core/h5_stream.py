@@ -0,0 +1,265 @@
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+from core.scan_store import encode_power, power_fill_value, power_scale
+from core.statistics import COLUMN_FIELDS, FREQUENCY_FIELDS
+
+
+def write_power_attrs(dset):
+    """记录功率数据集的单位和比例: 功率(dBm) = 存储值 × scale, 整数类型另记无效值"""
+    dset.attrs['units'] = 'dBm'
+    dset.attrs['scale'] = power_scale(dset.dtype)
+    fill_value = power_fill_value(dset.dtype)
+    if fill_value is not None:
+        dset.attrs['fill_value'] = fill_value
+
+
+def write_reduction_attrs(dset, reduction: dict):
+    """记录数据缩减设置"""
+    dset.attrs['reduction_mode'] = reduction.get("mode", "none")
+    dset.attrs['reduction_width'] = reduction.get("width", 0)
+
+
+def write_statistics(parent, snapshot: dict):
+    """将ScanStatistics.snapshot()写入statistics组(column: 每个波长点, frequency: 每个频率点)"""
+    group = parent.require_group("statistics")
+    for kind, units in (("column", COLUMN_FIELDS), ("frequency", FREQUENCY_FIELDS)):
+        sub = group.require_group(kind)
+        for name, values in snapshot.get(kind, {}).items():
+            if name in sub:
+                del sub[name]
+            sub.create_dataset(name, data=values)
+            sub[name].attrs['unit'] = units[name]
+
+
+class H5StreamWriter:
+    """扫描期间实时写入HDF5文件
+
+    power_data为 频率点 × 波长点 的可扩展分块数据集, 每个波长点追加一列;
+    同时记录每列的设定波长、读取波长和时间戳, 以及频率轴;
+    每列的统计量随列写入statistics/column, 各频率点的累计统计量由write_frequency_statistics更新;
+    数据经过缩减时, 保留的完整分辨率迹线写入full_resolution组。
+    列先在内存中凑满一个分块再写入, 并定期flush, 扫描中止后文件仍可读取。
+    """
+
+    def __init__(self, path: str, freq_range: Optional[Tuple[float, float]] = None,
+                 dtype=np.float64, compression: Optional[str] = "gzip",
+                 compression_level: int = 4, shuffle: bool = True,
+                 chunk_columns: int = 16, flush_interval: float = 5.0,
+                 resume_columns: Optional[int] = None,
+                 frequencies: Optional[np.ndarray] = None, reduction: Optional[dict] = None):
+        """
+        :param path: 文件路径
+        :param freq_range: (起始频率, 终止频率) Hz, 用于生成频率轴
+        :param dtype: 功率数据类型
+        :param compression: "gzip" / "lzf" / None
+        :param compression_level: gzip压缩级别(0-9)
+        :param shuffle: 是否启用shuffle过滤器(提高浮点数据压缩率)
+        :param chunk_columns: 每个分块包含的波长点数
+        :param flush_interval: 定期flush的间隔(秒)
+        :param resume_columns: 续写已有文件(断点续扫)时保留的列数, 数据集和压缩设置沿用文件中的
+        :param frequencies: 各频率点的频率(Hz), 数据经过缩减时给出, 优先于freq_range
+        :param reduction: 数据缩减设置
+        :raises ImportError: 未安装h5py
+        """
+        import h5py
+
+        if compression not in ("gzip", "lzf", None):
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        self.path = path
+        self.freq_range = freq_range
+        self.frequencies = frequencies
+        self.reduction = reduction
+        self.dtype = np.dtype(dtype)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.shuffle = shuffle
+        self.chunk_columns = max(1, chunk_columns)
+        self.flush_interval = flush_interval
+        self.rows = 0
+        self.columns = 0  # 已写入文件的列数
+        self._power = None
+        self._pending = []  # 待写入的(功率列, 设定波长, 读取波长, 时间戳)
+        self._last_flush = time.monotonic()
+        if resume_columns is not None:
+            self._file = h5py.File(path, "a")
+            self._resume(resume_columns)
+            return
+        self._file = h5py.File(path, "w")
+        self._file.attrs['description'] = '激光扫描数据: 频率(行) x 波长(列)'
+        self._file.attrs['created'] = str(datetime.now())
+        self._file.attrs['complete'] = False
+
+    def __len__(self) -> int:
+        return self.columns + len(self._pending)
+
+    def _create_datasets(self, rows: int):
+        """按第一列的点数创建数据集"""
+        self.rows = rows
+        # 分块约1MB, 每块包含chunk_columns个波长点
+        chunk_rows = max(1, min(rows, (1 << 20) // (self.chunk_columns * self.dtype.itemsize)))
+        filters = {}
+        if self.compression == "gzip":
+            filters = {"compression": "gzip", "compression_opts": self.compression_level}
+        elif self.compression == "lzf":
+            filters = {"compression": "lzf"}
+        self._power = self._file.create_dataset(
+            "power_data", shape=(rows, 0), maxshape=(rows, None), dtype=self.dtype,
+            chunks=(chunk_rows, self.chunk_columns), shuffle=self.shuffle, **filters)
+        self._power.attrs['frequency_count'] = rows
+        self._power.attrs['wavelength_count'] = 0
+        write_power_attrs(self._power)
+        if self.reduction:
+            write_reduction_attrs(self._power, self.reduction)
+
+        for name, dtype in (("wavelength_setpoint", np.float64),
+                            ("wavelength_readback", np.float64),
+                            ("timestamp", np.float64)):
+            self._file.create_dataset(name, shape=(0,), maxshape=(None,), dtype=dtype,
+                                      chunks=(max(self.chunk_columns, 256),))
+        self._file["timestamp"].attrs['unit'] = 's (Unix时间)'
+
+        if self.frequencies is not None and len(self.frequencies) == rows:
+            frequency = np.asarray(self.frequencies, dtype=np.float64)
+        elif self.freq_range is not None:
+            frequency = np.linspace(self.freq_range[0], self.freq_range[1], rows)
+        else:
+            frequency = None
+        self._file.create_dataset("frequency", data=frequency if frequency is not None
+                                  else np.arange(rows, dtype=np.float64))
+        self._file["frequency"].attrs['unit'] = 'Hz' if frequency is not None else 'index'
+
+    def _resume(self, columns: int):
+        """打开已有数据集, 截去columns之后写入的列"""
+        self._file.attrs['complete'] = False
+        if "power_data" not in self._file:
+            return
+        self._power = self._file["power_data"]
+        self.rows = self._power.shape[0]
+        self.dtype = self._power.dtype
+        self.columns = min(max(0, columns), self._power.shape[1])
+        self._power.resize(self.columns, axis=1)
+        self._power.attrs['wavelength_count'] = self.columns
+        for name in ("wavelength_setpoint", "wavelength_readback", "timestamp"):
+            self._file[name].resize(self.columns, axis=0)
+        if "statistics/column" in self._file:
+            for dset in self._file["statistics/column"].values():
+                dset.resize(self.columns, axis=0)
+        if "full_resolution" in self._file:
+            group = self._file["full_resolution"]
+            kept = int(np.count_nonzero(group["column_index"][:] < self.columns))
+            group["power_data"].resize(kept, axis=1)
+            group["column_index"].resize(kept, axis=0)
+
+    def append(self, column: np.ndarray, setpoint: float, readback: float,
+               timestamp: Optional[float] = None, stats: Optional[dict] = None) -> int:
+        """
+        追加一个波长点的数据
+        :param stats: 该列的统计量(见core.statistics.COLUMN_FIELDS)
+        :return: 该列的序号
+        :raises ValueError: 频率点数与已有数据不一致
+        """
+        column = encode_power(column, self.dtype)
+        if self._power is None:
+            self._create_datasets(len(column))
+        elif len(column) != self.rows:
+            raise ValueError(f"频率点数不一致 ({len(column)} != {self.rows})")
+
+        self._pending.append((column, setpoint, readback,
+                              time.time() if timestamp is None else timestamp, stats))
+        index = len(self) - 1
+        if len(self._pending) >= self.chunk_columns:
+            self._write_pending()
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return index
+
+    def append_full(self, index: int, trace: np.ndarray):
+        """写入第index个波长点的完整分辨率迹线(数据经过缩减时)"""
+        trace = encode_power(trace, self.dtype)
+        if "full_resolution" not in self._file:
+            group = self._file.create_group("full_resolution")
+            power = group.create_dataset("power_data", shape=(len(trace), 0),
+                                         maxshape=(len(trace), None), dtype=self.dtype,
+                                         chunks=(len(trace), 1))
+            write_power_attrs(power)
+            group.create_dataset("column_index", shape=(0,), maxshape=(None,), dtype=np.int64,
+                                 chunks=(256,))
+        group = self._file["full_resolution"]
+        power, column_index = group["power_data"], group["column_index"]
+        if len(trace) != power.shape[0]:
+            raise ValueError(f"频率点数不一致 ({len(trace)} != {power.shape[0]})")
+        count = power.shape[1]
+        power.resize(count + 1, axis=1)
+        power[:, count] = trace
+        column_index.resize(count + 1, axis=0)
+        column_index[count] = index
+
+    def _write_pending(self):
+        """将待写入的列一次写入文件(按分块对齐)"""
+        if not self._pending:
+            return
+        start, count = self.columns, len(self._pending)
+        block = np.empty((self.rows, count), dtype=self.dtype)
+        for i, item in enumerate(self._pending):
+            block[:, i] = item[0]
+        self._power.resize(start + count, axis=1)
+        self._power[:, start:start + count] = block
+        for name, field in (("wavelength_setpoint", 1), ("wavelength_readback", 2), ("timestamp", 3)):
+            dset = self._file[name]
+            dset.resize(start + count, axis=0)
+            dset[start:start + count] = [item[field] for item in self._pending]
+        if any(item[4] is not None for item in self._pending):
+            self._write_column_statistics(start, count)
+        self.columns += count
+        self._power.attrs['wavelength_count'] = self.columns
+        self._pending = []
+
+    def _write_column_statistics(self, start: int, count: int):
+        """写入待写入各列的统计量, 没有统计量的列为nan"""
+        group = self._file.require_group("statistics/column")
+        for name, unit in COLUMN_FIELDS.items():
+            if name not in group:
+                group.create_dataset(name, shape=(start,), maxshape=(None,), dtype=np.float64,
+                                     chunks=(max(self.chunk_columns, 256),), fillvalue=np.nan)
+                group[name].attrs['unit'] = unit
+            dset = group[name]
+            dset.resize(start + count, axis=0)
+            dset[start:start + count] = [np.nan if item[4] is None else item[4][name]
+                                         for item in self._pending]
+
+    def write_frequency_statistics(self, stats: dict):
+        """更新各频率点的累计统计量(见ScanStatistics.frequency_statistics)"""
+        if self._file is None:
+            return
+        group = self._file.require_group("statistics/frequency")
+        for name, values in stats.items():
+            if name in group and group[name].shape == values.shape:
+                group[name][...] = values
+            else:
+                if name in group:
+                    del group[name]
+                group.create_dataset(name, data=values)
+                group[name].attrs['unit'] = FREQUENCY_FIELDS[name]
+
+    def flush(self):
+        """写入待写入的列并刷新文件到磁盘"""
+        if self._file is None:
+            return
+        self._write_pending()
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """写入剩余数据, 标记完成并关闭文件"""
+        if self._file is None:
+            return
+        try:
+            self._write_pending()
+            self._file.attrs['complete'] = True
+        finally:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,328 @@
+import io
+import json
+import os
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.scan_store import decode_power
+from core.spool import SPOOL_MAGIC, SpoolReader
+
+# CSV/TXT每次解析的最大字节数
+TEXT_READ_BYTES = 64 << 20
+# CSV/TXT行偏移索引文件的后缀, 索引前两个值为建立索引时的文件大小和修改时间(ns)
+INDEX_SUFFIX = ".idx.npy"
+
+
+def open_scan(path: str, wavelengths: Optional[Sequence[float]] = None,
+              frequencies: Optional[Sequence[float]] = None,
+              freq_range: Optional[Tuple[float, float]] = None) -> "ScanFile":
+    """
+    打开保存的扫描数据, 格式由扩展名和文件头决定:
+    .h5/.hdf5(保存或实时写入的HDF5), .npy(映射文件), .csv/.txt(文本矩阵), 其他为追加写入文件
+    :param wavelengths: 各波长点的波长(nm), 文件中没有记录时用于按波长选择
+    :param frequencies: 各频率点的频率(Hz), 文件中没有记录时用于按频率选择
+    :param freq_range: (起始频率, 终止频率) Hz, 没有frequencies时按点数均分
+    :raises ValueError: 无法识别的文件
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".h5", ".hdf5"):
+        scan = H5ScanFile(path)
+    elif ext == ".npy":
+        scan = NpyScanFile(path)
+    elif ext in (".csv", ".txt"):
+        scan = TextScanFile(path, ',' if ext == ".csv" else '\t')
+    else:
+        with open(path, "rb") as f:
+            magic = f.read(len(SPOOL_MAGIC))
+        if magic != SPOOL_MAGIC:
+            raise ValueError(f"无法识别的扫描数据文件: {path}")
+        scan = SpoolScanFile(path)
+    if wavelengths is not None:
+        scan.wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    if frequencies is not None:
+        scan.frequencies = np.asarray(frequencies, dtype=np.float64)
+    elif freq_range is not None and scan.frequencies is None:
+        scan.frequencies = np.linspace(freq_range[0], freq_range[1], scan.shape[0])
+    return scan
+
+
+def _axis_slice(axis: Optional[np.ndarray], value_range: Tuple[float, float], name: str) -> slice:
+    """按数值范围(含端点)在单调坐标轴上选取的序号范围"""
+    if axis is None:
+        raise ValueError(f"文件中没有{name}信息, 请在open_scan中指定")
+    low, high = sorted(value_range)
+    if len(axis) > 1 and axis[-1] < axis[0]:
+        # 递减的坐标轴
+        n = len(axis)
+        return slice(n - int(np.searchsorted(axis[::-1], high, side="right")),
+                     n - int(np.searchsorted(axis[::-1], low, side="left")))
+    return slice(int(np.searchsorted(axis, low, side="left")),
+                 int(np.searchsorted(axis, high, side="right")))
+
+
+class ScanFile:
+    """保存的扫描数据的惰性只读访问
+
+    形状为(频率点数, 波长点数), 按[频率, 波长]取切片时只读取所需部分并换算为功率(dBm);
+    也可按波长范围(nm)和频率范围(Hz)选择。
+    接口与数据存储一致(shape/dtype/iter_row_blocks), 可直接交给ExportJob转换格式。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.columns = 0
+        self.dtype = np.dtype(np.float64)  # 存储数据类型
+        self.wavelengths: Optional[np.ndarray] = None  # 各波长点的波长(nm)
+        self.frequencies: Optional[np.ndarray] = None  # 各频率点的频率(Hz)
+        self.nbytes = 0
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(频率点数, 波长点数)"""
+        return self.rows, self.columns
+
+    def __len__(self) -> int:
+        return self.columns
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """释放文件"""
+        pass
+
+    def _read(self, rows: slice, columns: slice) -> np.ndarray:
+        """读取存储值, rows/columns为已规范化的切片"""
+        pass  # 由子类实现具体读取
+
+    def __getitem__(self, key) -> np.ndarray:
+        """按[频率, 波长]读取功率(dBm), 支持整数和切片"""
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if len(key) != 2:
+            raise IndexError("扫描数据为二维: [频率, 波长]")
+        slices = []
+        flip = []
+        for axis, (k, n) in enumerate(zip(key, self.shape)):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                if step < 0:
+                    # 按正序读取后再反转
+                    count = len(range(start, stop, step))
+                    start, stop, step = start + (count - 1) * step, start + 1, -step
+                    flip.append(axis)
+                slices.append(slice(start, max(start, stop), step))
+            else:
+                index = int(k) + n if int(k) < 0 else int(k)
+                if not 0 <= index < n:
+                    raise IndexError(f"序号超出范围: {k} (共{n}个)")
+                slices.append(slice(index, index + 1, 1))
+        data = decode_power(self._read(slices[0], slices[1]))
+        if flip:
+            data = np.flip(data, axis=tuple(flip))
+        squeeze = tuple(axis for axis, k in enumerate(key) if not isinstance(k, slice))
+        return data.squeeze(axis=squeeze) if squeeze else data
+
+    def __array__(self, dtype=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype)
+
+    def column(self, index: int) -> np.ndarray:
+        """一个波长点的迹线(dBm)"""
+        return self[:, index]
+
+    def select(self, wavelength_range: Optional[Tuple[float, float]] = None,
+               frequency_range: Optional[Tuple[float, float]] = None) -> np.ndarray:
+        """
+        按波长范围(nm)和频率范围(Hz)读取数据, 包含端点
+        :raises ValueError: 文件中没有对应的坐标信息
+        """
+        rows = (slice(None) if frequency_range is None
+                else _axis_slice(self.frequencies, frequency_range, "频率"))
+        columns = (slice(None) if wavelength_range is None
+                   else _axis_slice(self.wavelengths, wavelength_range, "波长"))
+        return self[rows, columns]
+
+    def iter_row_blocks(self, block_rows: int = 4096) -> Iterator[Tuple[int, np.ndarray]]:
+        """依次返回(起始频率行, 频率行块×波长点)的存储值"""
+        for start in range(0, self.rows, block_rows):
+            yield start, self._read(slice(start, min(start + block_rows, self.rows)),
+                                    slice(0, self.columns, 1))
+
+    def view(self) -> np.ndarray:
+        """全部存储值"""
+        return self._read(slice(0, self.rows, 1), slice(0, self.columns, 1))
+
+
+class H5ScanFile(ScanFile):
+    """HDF5文件(ExportJob保存或H5StreamWriter实时写入), 按需读取数据集的切片"""
+
+    def __init__(self, path: str):
+        import h5py
+
+        super().__init__(path)
+        self._file = h5py.File(path, "r")
+        if "power_data" not in self._file:
+            self._file.close()
+            raise ValueError(f"文件中没有power_data数据集: {path}")
+        self._power = self._file["power_data"]
+        self.rows, self.columns = self._power.shape
+        self.dtype = self._power.dtype
+        for name in ("wavelength", "wavelength_setpoint"):
+            if name in self._file:
+                self.wavelengths = self._file[name][:self.columns]
+                break
+        if "frequency" in self._file and self._file["frequency"].attrs.get('unit') == 'Hz':
+            self.frequencies = self._file["frequency"][:]
+
+    def _read(self, rows: slice, columns: slice) -> np.ndarray:
+        if rows.start >= rows.stop or columns.start >= columns.stop:
+            return np.empty((len(range(rows.start, rows.stop, rows.step)),
+                             len(range(columns.start, columns.stop, columns.step))), dtype=self.dtype)
+        return self._power[rows, columns]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _MappedScanFile(ScanFile):
+    """以内存映射访问的文件, 切片只读取所需的页"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._view: Optional[np.ndarray] = None
+
+    def _read(self, rows: slice, columns: slice) -> np.ndarray:
+        if self._view is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return np.array(self._view[rows, columns])
+
+    def close(self):
+        self._view = None
+
+
+class SpoolScanFile(_MappedScanFile):
+    """追加写入文件(SpoolWriter), 列数以文件大小为准"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        reader = SpoolReader(path)
+        self.rows, self.columns = reader.shape
+        self.dtype = reader.dtype
+        if self.rows and self.columns:
+            self._view = reader.view()
+
+
+class NpyScanFile(_MappedScanFile):
+    """映射文件(MemmapScanStore), 已写入的列数来自同名.json文件, 没有时为全部列"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        data = np.load(path, mmap_mode="r")
+        if data.ndim != 2:
+            raise ValueError(f"不是扫描数据文件: {path}")
+        columns = data.shape[0]
+        meta_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                columns = min(columns, int(json.load(f).get("columns", columns)))
+        self.rows = data.shape[1]
+        self.columns = columns
+        self.dtype = data.dtype
+        self._view = data[:columns].T
+
+
+class TextScanFile(ScanFile):
+    """CSV/TXT文本矩阵(ExportJob保存), 通过行偏移索引只解析所需的频率行
+
+    首次打开时扫描换行符建立每行起始位置的索引, 保存为同名.idx.npy文件,
+    文件大小或修改时间变化时重新建立。
+    """
+
+    def __init__(self, path: str, delimiter: str = ','):
+        super().__init__(path)
+        self.delimiter = delimiter.encode("ascii")
+        self.index_path = path + INDEX_SUFFIX
+        self.offsets = self._load_index()
+        if self.offsets is None:
+            self.offsets = self._build_index()
+            try:
+                stat = os.stat(path)
+                np.save(self.index_path, np.concatenate(
+                    [[stat.st_size, stat.st_mtime_ns], self.offsets]).astype(np.int64))
+            except OSError:
+                pass  # 目录只读时不缓存索引
+        self.rows = len(self.offsets) - 1
+        with open(path, "rb") as f:
+            header = f.readline()
+            first = f.readline() if self.rows else b""
+        if header.startswith(b"#"):
+            self.columns = header.count(self.delimiter) + 1
+        else:
+            self.columns = first.count(self.delimiter) + 1 if first.strip() else 0
+
+    def _load_index(self) -> Optional[np.ndarray]:
+        """读取与当前文件一致的行偏移索引, 不存在或已过期时返回None"""
+        try:
+            index = np.load(self.index_path)
+            stat = os.stat(self.path)
+        except (OSError, ValueError):
+            return None
+        if len(index) < 3 or index[0] != stat.st_size or index[1] != stat.st_mtime_ns:
+            return None
+        return index[2:]
+
+    def _build_index(self) -> np.ndarray:
+        """扫描换行符, 返回各数据行的起始位置及文件末尾位置"""
+        starts = []
+        position = 0
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(TEXT_READ_BYTES)
+                if not chunk:
+                    break
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord("\n"))
+                starts.append(newlines + position + 1)
+                position += len(chunk)
+        starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        # 第一行为表头; 文件末尾没有换行时补上最后一行的结束位置
+        if len(starts) == 0 or starts[-1] != position:
+            starts = np.append(starts, position)
+        with open(self.path, "rb") as f:
+            has_header = f.read(1) == b"#"
+        offsets = starts if has_header else np.concatenate([[0], starts])
+        return offsets.astype(np.int64)
+
+    def _read(self, rows: slice, columns: slice) -> np.ndarray:
+        selected = range(rows.start, rows.stop, rows.step)
+        width = len(range(columns.start, columns.stop, columns.step))
+        result = np.empty((len(selected), width), dtype=np.float64)
+        if len(selected) == 0 or width == 0:
+            return result
+        wanted = list(range(columns.start, columns.stop, columns.step))
+        # 按字节数分段读取连续的行, 每段一次解析
+        first, last = selected[0], selected[-1]
+        with open(self.path, "rb") as f:
+            start = first
+            while start <= last:
+                stop = int(np.searchsorted(self.offsets, self.offsets[start] + TEXT_READ_BYTES, side="right")) - 1
+                stop = min(max(stop, start + 1), last + 1)
+                f.seek(self.offsets[start])
+                text = f.read(int(self.offsets[stop] - self.offsets[start]))
+                # 只解析所选的列
+                block = pd.read_csv(io.BytesIO(text), sep=self.delimiter.decode("ascii"), header=None,
+                                    usecols=wanted, dtype=np.float64, engine="c").to_numpy()
+                # 本段中被选中的行
+                first_selected = start + (-(start - rows.start) % rows.step)
+                local = np.arange(first_selected, stop, rows.step)
+                result[(local - rows.start) // rows.step] = block[local - start]
+                start = stop
+        return result
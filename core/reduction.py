@@ -0,0 +1,117 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# 缩减方式: 名称 -> 说明
+REDUCTION_MODES = {
+    "none": "不缩减",
+    "peak": "峰值保持",
+    "minmax": "最小/最大值",
+    "mean": "功率平均",
+    "decimate": "抽取",
+}
+
+
+class TraceReducer:
+    """每个波长点迹线的降采样, 在存储和显示之前执行
+
+    将扫描点分为宽度相同的若干段(最后一段可能较短), 每段输出:
+    peak为段内最大值; minmax为段内最小值和最大值(每段两个点);
+    mean为段内功率(mW)平均后换算回dBm; decimate为每段的第一个点。
+    可指定部分波长点额外保留完整分辨率的迹线。
+    """
+
+    def __init__(self, mode: str = "none", width: int = 0, keep_every: int = 0,
+                 keep_columns: Optional[Iterable[int]] = None):
+        """
+        :param mode: 缩减方式, 见REDUCTION_MODES
+        :param width: 目标输出点数, 扫描点数不超过该值时不缩减
+        :param keep_every: 每隔多少个波长点保留一次完整迹线, 0为不保留
+        :param keep_columns: 保留完整迹线的波长点序号
+        """
+        if mode not in REDUCTION_MODES:
+            raise ValueError(f"不支持的缩减方式: {mode}")
+        self.mode = mode
+        self.width = max(0, int(width))
+        self.keep_every = max(0, int(keep_every))
+        self.keep_columns = set(keep_columns or ())
+        self._starts_cache: Dict[int, np.ndarray] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "none" and self.width > 0
+
+    def settings(self) -> Dict[str, Any]:
+        """缩减设置(用于检查点和文件元数据)"""
+        return {"mode": self.mode, "width": self.width, "keep_every": self.keep_every,
+                "keep_columns": sorted(self.keep_columns)}
+
+    def factor(self, points: int) -> int:
+        """每段包含的扫描点数"""
+        if not self.enabled:
+            return 1
+        bins = self.width // 2 if self.mode == "minmax" else self.width
+        return max(1, -(-points // max(bins, 1)))
+
+    def _starts(self, points: int) -> np.ndarray:
+        """各段的起始扫描点"""
+        starts = self._starts_cache.get(points)
+        if starts is None:
+            starts = np.arange(0, points, self.factor(points))
+            self._starts_cache = {points: starts}
+        return starts
+
+    def preserves_noise(self, points: int) -> bool:
+        """缩减后的迹线能否计算噪底和积分功率: peak/minmax保留各段的最大值, 两者都会偏高"""
+        return self.factor(points) == 1 or self.mode not in ("peak", "minmax")
+
+    def output_points(self, points: int) -> int:
+        """缩减后的点数"""
+        if self.factor(points) == 1:
+            return points
+        bins = len(self._starts(points))
+        return 2 * bins if self.mode == "minmax" else bins
+
+    def reduce(self, trace: np.ndarray) -> np.ndarray:
+        """缩减一条迹线(dBm)"""
+        trace = np.asarray(trace)
+        points = len(trace)
+        if self.factor(points) == 1:
+            return trace
+        starts = self._starts(points)
+        if self.mode == "decimate":
+            return trace[starts]
+        if self.mode == "peak":
+            return np.maximum.reduceat(trace, starts)
+        if self.mode == "minmax":
+            reduced = np.empty(2 * len(starts), dtype=trace.dtype)
+            reduced[0::2] = np.minimum.reduceat(trace, starts)
+            reduced[1::2] = np.maximum.reduceat(trace, starts)
+            return reduced
+        # 功率平均: 换算为线性功率平均后再换算回dBm
+        counts = np.diff(np.append(starts, points))
+        linear = np.add.reduceat(np.power(10.0, trace / 10.0), starts) / counts
+        return (10.0 * np.log10(linear)).astype(trace.dtype, copy=False)
+
+    def reduce_axis(self, frequencies: np.ndarray) -> np.ndarray:
+        """与reduce输出对应的频率轴: 抽取为所取的点, 其余为各段的中心频率"""
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        points = len(frequencies)
+        if self.factor(points) == 1:
+            return frequencies
+        starts = self._starts(points)
+        if self.mode == "decimate":
+            return frequencies[starts]
+        stops = np.append(starts[1:], points) - 1
+        centers = (frequencies[starts] + frequencies[stops]) / 2
+        return np.repeat(centers, 2) if self.mode == "minmax" else centers
+
+    def frequency_axis(self, freq_range: Tuple[float, float], points: int) -> np.ndarray:
+        """按频率范围和扫描点数生成缩减后的频率轴"""
+        return self.reduce_axis(np.linspace(freq_range[0], freq_range[1], points))
+
+    def keep_full(self, index: int) -> bool:
+        """第index个波长点是否保留完整迹线"""
+        if not self.enabled:
+            return False
+        return index in self.keep_columns or (self.keep_every > 0 and index % self.keep_every == 0)
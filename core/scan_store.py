@@ -0,0 +1,255 @@
+import io
+import json
+import os
+import threading
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+# 存储精度: 名称 -> 数据类型; 整数类型按POWER_QUANTUM量化存储, 功率(dBm) = 存储值 × 比例
+POWER_DTYPES = {
+    "float64": np.float64,
+    "float32": np.float32,
+    "int16": np.int16,  # 0.01 dB
+}
+POWER_QUANTUM = 0.01
+
+
+def power_scale(dtype) -> float:
+    """存储值到功率(dBm)的比例: 整数类型为POWER_QUANTUM, 浮点类型为1"""
+    return POWER_QUANTUM if np.dtype(dtype).kind in "iu" else 1.0
+
+
+def power_fill_value(dtype):
+    """整数存储中表示无效数据(nan)的值, 浮点类型为None"""
+    dtype = np.dtype(dtype)
+    return int(np.iinfo(dtype).min) if dtype.kind in "iu" else None
+
+
+def encode_power(column, dtype) -> np.ndarray:
+    """将功率(dBm)转换为存储类型, 整数类型四舍五入量化并限制在可表示范围内"""
+    dtype = np.dtype(dtype)
+    if dtype.kind not in "iu":
+        return np.asarray(column, dtype=dtype)
+    info = np.iinfo(dtype)
+    scaled = np.rint(np.asarray(column, dtype=np.float64) / power_scale(dtype))
+    invalid = np.isnan(scaled)
+    encoded = np.clip(scaled, info.min + 1, info.max)
+    encoded[invalid] = info.min
+    return encoded.astype(dtype)
+
+
+def decode_power(data: np.ndarray) -> np.ndarray:
+    """将存储值转换为功率(dBm), 整数类型返回float32并将无效值还原为nan"""
+    if data.dtype.kind not in "iu":
+        return data
+    decoded = data.astype(np.float32) * np.float32(power_scale(data.dtype))
+    decoded[data == power_fill_value(data.dtype)] = np.nan
+    return decoded
+
+
+class ScanDataStore:
+    """扫描数据存储: 频率点 × 波长点矩阵, 按波长列追加
+
+    内部按列连续存放(每个波长点一行), 追加一列只写入该列的数据;
+    容量按预计波长点数预分配, 不足时按倍数增长, 追加的均摊开销为O(1)。
+    """
+
+    def __init__(self, expected_columns: int = 0, dtype=np.float64, growth: float = 1.5):
+        """
+        :param expected_columns: 预计波长点数, 用于预分配
+        :param dtype: 存储数据类型
+        :param growth: 容量不足时的增长倍数
+        """
+        self.dtype = np.dtype(dtype)
+        self.scale = power_scale(self.dtype)  # 功率(dBm) = 存储值 × scale
+        self.expected_columns = max(0, int(expected_columns))
+        self.growth = max(growth, 1.1)
+        self.rows = 0  # 频率点数, 由第一列确定
+        self.columns = 0  # 已写入的波长点数
+        self._data: Optional[np.ndarray] = None  # 形状(容量, 频率点数)
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(频率点数, 波长点数)"""
+        return self.rows, self.columns
+
+    @property
+    def capacity(self) -> int:
+        """已分配的波长点容量"""
+        return 0 if self._data is None else self._data.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """已分配的内存字节数"""
+        return 0 if self._data is None else self._data.nbytes
+
+    def __len__(self) -> int:
+        return self.columns
+
+    def append(self, column: np.ndarray) -> int:
+        """
+        追加一个波长点的频谱数据(dBm), 按存储类型转换
+        :return: 该列的序号
+        :raises ValueError: 频率点数与已有数据不一致
+        """
+        column = encode_power(column, self.dtype)
+        with self._lock:
+            if self._data is None:
+                self.rows = len(column)
+                self._data = self._allocate(max(self.expected_columns, 1), self.rows)
+            elif len(column) != self.rows:
+                raise ValueError(f"频率点数不一致 ({len(column)} != {self.rows})")
+
+            if self.columns >= self._data.shape[0]:
+                self._grow()
+            self._data[self.columns] = column
+            self.columns += 1
+            return self.columns - 1
+
+    def _allocate(self, capacity: int, rows: int) -> np.ndarray:
+        """分配(容量, 频率点数)的存储"""
+        return np.empty((capacity, rows), dtype=self.dtype)
+
+    def _grow(self):
+        """按增长倍数扩大容量, 复制已写入的列"""
+        capacity = max(self.columns + 1, int(self._data.shape[0] * self.growth))
+        data = self._allocate(capacity, self.rows)
+        data[:self.columns] = self._data[:self.columns]
+        self._data = data
+
+    def view(self) -> np.ndarray:
+        """返回已写入数据的只读视图, 形状(频率点数, 波长点数), 不复制数据"""
+        with self._lock:
+            if self._data is None:
+                view = np.empty((0, 0), dtype=self.dtype)
+            else:
+                view = self._data[:self.columns].T
+        view.flags.writeable = False
+        return view
+
+    def column(self, index: int) -> np.ndarray:
+        """返回第index个波长点数据的只读视图"""
+        if not -self.columns <= index < self.columns:
+            raise IndexError(f"波长点序号超出范围: {index}")
+        view = self._data[index % self.columns]
+        view.flags.writeable = False
+        return view
+
+    def iter_row_blocks(self, block_rows: int = 4096) -> Iterator[Tuple[int, np.ndarray]]:
+        """依次返回(起始频率行, 频率行块×波长点)的只读视图"""
+        data = self.view()
+        for start in range(0, self.rows, block_rows):
+            yield start, data[start:start + block_rows]
+
+    def trim(self):
+        """释放未使用的预分配容量"""
+        with self._lock:
+            if self._data is not None and self.capacity > self.columns:
+                self._data = self._data[:max(self.columns, 1)].copy()
+
+
+class MemmapScanStore(ScanDataStore):
+    """内存映射的扫描数据存储, 用于超出内存的扫描
+
+    数据文件为.npy格式, 扫描开始时按 波长点数 × 扫描点数 一次分配,
+    各列在文件中原位写入; 已写入的列数保存在同名.json文件中。
+    读取视图为只读映射, 界面和保存时不需要将数据全部载入内存。
+    """
+
+    def __init__(self, path: str, expected_columns: int, rows: int = 0, dtype=np.float64,
+                 flush_columns: int = 16):
+        """
+        :param path: 数据文件路径(.npy)
+        :param expected_columns: 波长点数
+        :param rows: 扫描点数, 大于0时立即分配文件, 否则在写入第一列时分配
+        :param dtype: 存储数据类型
+        :param flush_columns: 每写入多少列刷新一次映射和列数文件
+        """
+        super().__init__(expected_columns, dtype)
+        self.path = path
+        self.meta_path = os.path.splitext(path)[0] + ".json"
+        self.flush_columns = flush_columns
+        if rows > 0:
+            self.rows = rows
+            self._data = self._allocate(max(self.expected_columns, 1), rows)
+
+    @classmethod
+    def reopen(cls, path: str, columns: int, flush_columns: int = 16) -> "MemmapScanStore":
+        """
+        打开已有的映射文件继续写入(断点续扫), 保留前columns列, 之后的列将被覆盖
+        :raises OSError: 文件不存在或无法读取
+        """
+        data = np.load(path, mmap_mode="r+")
+        store = cls(path, data.shape[0], dtype=data.dtype, flush_columns=flush_columns)
+        store.rows = data.shape[1]
+        store._data = data
+        store.columns = min(max(0, columns), data.shape[0])
+        return store
+
+    def _allocate(self, capacity: int, rows: int) -> np.ndarray:
+        """创建指定大小的.npy映射文件(稀疏文件, 不预先写入数据)"""
+        return np.lib.format.open_memmap(self.path, mode="w+", dtype=self.dtype,
+                                         shape=(capacity, rows))
+
+    def append(self, column: np.ndarray) -> int:
+        """追加一列并定期刷新, 首列点数与预分配不符且尚无数据时按实际点数重新分配"""
+        if self.columns == 0 and self._data is not None and len(column) != self.rows:
+            self._data = None
+        index = super().append(column)
+        if self.columns % self.flush_columns == 0:
+            self.flush()
+        return index
+
+    def _grow(self):
+        """
+        扩大映射文件: 关闭原映射后原位改写.npy文件头中的形状并延长文件, 再按新大小重新映射
+        数据按(波长点, 扫描点)存储, 新增的列位于文件末尾, 已写入的数据不需要移动
+        """
+        capacity = max(self.columns + 1, int(self._data.shape[0] * self.growth))
+        self._data.flush()
+        offset = self._data.offset
+        # 释放映射后才能改变文件大小(Windows不允许截断仍被映射的文件)
+        self._data = None
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (capacity, self.rows),
+        })
+        header = header.getvalue()
+        if len(header) == offset:
+            with open(self.path, "r+b") as f:
+                f.write(header)
+                f.truncate(offset + capacity * self.rows * self.dtype.itemsize)
+        else:
+            # 文件头长度改变(文件由未预留形状空间的numpy版本创建)时复制到新文件
+            old = np.load(self.path, mmap_mode="r")
+            tmp_path = self.path + ".tmp"
+            data = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype,
+                                             shape=(capacity, self.rows))
+            data[:self.columns] = old[:self.columns]
+            data.flush()
+            del data, old
+            os.replace(tmp_path, self.path)
+        self._data = np.load(self.path, mmap_mode="r+")
+
+    def flush(self):
+        """将映射写回磁盘并记录已写入的列数"""
+        if self._data is None:
+            return
+        self._data.flush()
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"columns": self.columns, "rows": self.rows, "dtype": self.dtype.str,
+                       "scale": self.scale}, f)
+
+    @property
+    def nbytes(self) -> int:
+        """数据在磁盘上, 不占用内存"""
+        return 0
+
+    @property
+    def nbytes_on_disk(self) -> int:
+        """映射文件的数据大小(字节)"""
+        return 0 if self._data is None else self._data.nbytes
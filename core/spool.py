@@ -0,0 +1,177 @@
+import os
+import struct
+import time
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from core.scan_store import encode_power, power_scale
+
+# 文件头: 标识(8字节), dtype字符串(8字节), 频率点数(uint64), 波长点数(uint64)
+SPOOL_MAGIC = b"LSPOOL01"
+HEADER_FORMAT = "<8s8sQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+COLUMN_COUNT_OFFSET = HEADER_SIZE - 8
+
+
+class SpoolWriter:
+    """扫描数据追加写入文件
+
+    每个波长点的频谱数据作为一列原样追加到文件末尾, 不改写已有数据;
+    文件头中的列数在定期fsync时更新, 异常中止时读取端按文件大小恢复列数。
+    整数类型的数据按power_scale量化, 比例由文件头中的数据类型确定。
+    接口与ScanDataStore一致(append/shape/view), 可直接作为控制器的数据存储。
+    """
+
+    def __init__(self, path: str, dtype=np.float64, fsync_columns: int = 16,
+                 fsync_interval: float = 2.0):
+        """
+        :param path: 文件路径
+        :param dtype: 存储数据类型
+        :param fsync_columns: 每写入多少列同步一次磁盘
+        :param fsync_interval: 距上次同步超过多少秒时同步磁盘
+        """
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.scale = power_scale(self.dtype)
+        self.fsync_columns = fsync_columns
+        self.fsync_interval = fsync_interval
+        self.rows = 0
+        self.columns = 0
+        self.nbytes = 0  # 数据在磁盘上, 不占用内存
+        self._file = None
+        self._synced_columns = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(频率点数, 波长点数)"""
+        return self.rows, self.columns
+
+    def __len__(self) -> int:
+        return self.columns
+
+    def append(self, column: np.ndarray) -> int:
+        """
+        追加一个波长点的频谱数据
+        :return: 该列的序号
+        :raises ValueError: 频率点数与已有数据不一致
+        """
+        column = np.ascontiguousarray(encode_power(column, self.dtype))
+        if self._file is None:
+            self._open(len(column))
+        elif len(column) != self.rows:
+            raise ValueError(f"频率点数不一致 ({len(column)} != {self.rows})")
+
+        self._file.write(column.tobytes())
+        self.columns += 1
+        if (self.columns - self._synced_columns >= self.fsync_columns
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+        return self.columns - 1
+
+    @classmethod
+    def reopen(cls, path: str, columns: int, **kwargs) -> "SpoolWriter":
+        """
+        打开已有文件继续追加(断点续扫), 保留前columns列并截去之后写入的数据
+        :raises ValueError: 不是扫描数据文件
+        """
+        reader = SpoolReader(path)
+        writer = cls(path, dtype=reader.dtype, **kwargs)
+        writer.rows = reader.rows
+        writer.columns = min(max(0, columns), reader.columns)
+        writer._file = open(path, "r+b")
+        writer._file.truncate(HEADER_SIZE + writer.columns * reader.rows * reader.dtype.itemsize)
+        writer.sync()
+        return writer
+
+    def _open(self, rows: int):
+        """创建文件并写入文件头"""
+        self.rows = rows
+        self._file = open(self.path, "w+b")
+        self._file.write(struct.pack(HEADER_FORMAT, SPOOL_MAGIC,
+                                     self.dtype.str.encode("ascii"), rows, 0))
+
+    def sync(self):
+        """更新文件头中的列数并同步到磁盘"""
+        if self._file is None:
+            return
+        self._file.seek(COLUMN_COUNT_OFFSET)
+        self._file.write(struct.pack("<Q", self.columns))
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced_columns = self.columns
+        self._last_sync = time.monotonic()
+
+    def view(self) -> np.ndarray:
+        """已写入数据的只读视图(内存映射), 形状(频率点数, 波长点数)"""
+        if self._file is None or self.columns == 0:
+            return np.empty((0, 0), dtype=self.dtype)
+        self._file.flush()
+        return SpoolReader(self.path).view(self.columns)
+
+    def iter_row_blocks(self, block_rows: int = 4096) -> Iterator[Tuple[int, np.ndarray]]:
+        """分块转置读取已写入的数据, 见SpoolReader.iter_row_blocks"""
+        if self._file is None or self.columns == 0:
+            return iter(())
+        self._file.flush()
+        return SpoolReader(self.path).iter_row_blocks(block_rows)
+
+    def close(self) -> Optional["SpoolReader"]:
+        """完成写入并关闭文件, 返回该文件的读取器"""
+        if self._file is None:
+            return None
+        self.sync()
+        self._file.close()
+        self._file = None
+        return SpoolReader(self.path)
+
+
+class SpoolReader:
+    """扫描数据追加文件的只读访问"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"文件头不完整: {path}")
+        magic, dtype, rows, columns = struct.unpack(HEADER_FORMAT, header)
+        if magic != SPOOL_MAGIC:
+            raise ValueError(f"不是扫描数据文件: {path}")
+        self.dtype = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+        self.scale = power_scale(self.dtype)
+        self.rows = rows
+        self.nbytes = 0
+        # 以文件大小为准, 异常中止时文件头中的列数可能落后
+        column_bytes = rows * self.dtype.itemsize
+        written = (os.path.getsize(path) - HEADER_SIZE) // column_bytes if column_bytes else 0
+        self.columns = int(written)
+        self.header_columns = columns
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(频率点数, 波长点数)"""
+        return self.rows, self.columns
+
+    def __len__(self) -> int:
+        return self.columns
+
+    def view(self, columns: Optional[int] = None) -> np.ndarray:
+        """只读内存映射视图, 形状(频率点数, 波长点数), 不将数据载入内存"""
+        columns = self.columns if columns is None else columns
+        if columns == 0 or self.rows == 0:
+            return np.empty((0, 0), dtype=self.dtype)
+        data = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE,
+                         shape=(columns, self.rows))
+        return data.T
+
+    def iter_row_blocks(self, block_rows: int = 4096) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        分块转置: 依次返回(起始频率行, 频率行块×波长点)的内存数组
+        每块从每一列读取一段连续数据, 内存占用为 block_rows × 波长点数
+        """
+        data = self.view()
+        for start in range(0, self.rows, block_rows):
+            yield start, np.ascontiguousarray(data[start:start + block_rows])
@@ -0,0 +1,175 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+# 每个波长点的统计量: 名称 -> 单位
+COLUMN_FIELDS = {
+    "peak_power": "dBm",
+    "peak_frequency": "Hz",
+    "noise_floor": "dBm",
+    "integrated_power": "dBm",
+    "snr": "dB",
+    "width_3db": "Hz",
+}
+# 频谱仪RBW滤波器(高斯形状)的等效噪声带宽与RBW之比
+RBW_ENBW_FACTOR = 1.056
+# 各频率点跨波长点的累计统计量: 名称 -> 单位
+FREQUENCY_FIELDS = {
+    "mean": "dBm",
+    "std": "dB",
+    "max_hold": "dBm",
+    "min_hold": "dBm",
+}
+
+
+def column_statistics(block: np.ndarray, frequencies: np.ndarray,
+                      noise_percentile: float = 50.0,
+                      rbw: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    计算 频率点×波长点 数据块中每一列的统计量, 对所有列一次向量化计算
+    :param block: 功率(dBm), 形状(频率点数, 列数)或单条迹线
+    :param frequencies: 各频率点的频率(Hz), 应为等间隔
+    :param noise_percentile: 噪底取功率的百分位数(50为中位数)
+    :param rbw: 分辨率带宽(Hz), 没有时积分功率为NaN
+    :return: COLUMN_FIELDS中各统计量, 每项长度为列数
+    """
+    block = np.asarray(block, dtype=np.float64)
+    if block.ndim == 1:
+        block = block[:, None]
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    rows, columns = block.shape
+    cols = np.arange(columns)
+
+    peak_index = np.argmax(block, axis=0)
+    peak_power = block[peak_index, cols]
+    noise_floor = np.percentile(block, noise_percentile, axis=0)
+    # 积分功率: 每点读数为RBW滤波器内的功率, 除以等效噪声带宽得到功率谱密度, 再按点间隔积分
+    if rbw and rbw > 0 and rows > 1:
+        bin_width = abs(frequencies[-1] - frequencies[0]) / (rows - 1)
+        total = np.sum(np.power(10.0, block / 10.0), axis=0) * bin_width / (rbw * RBW_ENBW_FACTOR)
+        integrated = 10.0 * np.log10(total)
+    else:
+        integrated = np.full(columns, np.nan)
+
+    # -3dB宽度: 峰值两侧第一个低于(峰值-3dB)的点, 在相邻两点间线性插值交叉频率
+    threshold = peak_power - 3.0
+    below = block < threshold
+    index = np.arange(rows)[:, None]
+    left_below = np.where(below & (index < peak_index), index, -1).max(axis=0)
+    right_below = np.where(below & (index > peak_index), index, rows).min(axis=0)
+    left = _crossing(block, frequencies, threshold, left_below, left_below + 1, cols, frequencies[0])
+    right = _crossing(block, frequencies, threshold, right_below, right_below - 1, cols, frequencies[-1])
+
+    return {
+        "peak_power": peak_power,
+        "peak_frequency": frequencies[peak_index],
+        "noise_floor": noise_floor,
+        "integrated_power": integrated,
+        "snr": peak_power - noise_floor,
+        "width_3db": right - left,
+    }
+
+
+def _crossing(block, frequencies, threshold, outside, inside, cols, edge) -> np.ndarray:
+    """outside(低于阈值)与inside(不低于阈值)两点间阈值交叉处的频率, 无交叉时为数据边缘频率"""
+    rows = len(frequencies)
+    valid = (outside >= 0) & (outside < rows)
+    o = np.clip(outside, 0, rows - 1)
+    i = np.clip(inside, 0, rows - 1)
+    p_out, p_in = block[o, cols], block[i, cols]
+    span = np.where(p_in != p_out, p_in - p_out, 1.0)
+    t = np.clip((threshold - p_out) / span, 0.0, 1.0)
+    crossing = frequencies[o] + t * (frequencies[i] - frequencies[o])
+    return np.where(valid, crossing, edge)
+
+
+class ScanStatistics:
+    """扫描过程中逐列累计的统计
+
+    每个波长点记录峰值功率/频率、噪底、积分功率、SNR和-3dB宽度;
+    每个频率点跨波长点累计均值/方差(Welford算法)和最大/最小保持。
+    结果只有 波长点数 和 频率点数 大小, 扫描后分析不需要重新读取整个矩阵。
+    不可用的统计量为NaN。
+    """
+
+    def __init__(self, noise_percentile: float = 50.0, rbw: Optional[float] = None,
+                 noise_valid: bool = True):
+        """
+        :param noise_percentile: 噪底取功率的百分位数(50为中位数)
+        :param rbw: 分辨率带宽(Hz), 用于计算积分功率
+        :param noise_valid: 迹线能否计算噪底和积分功率(峰值保持等缩减后不能), 否则噪底、积分功率和SNR为NaN
+        """
+        self.noise_percentile = noise_percentile
+        self.rbw = rbw
+        self.noise_valid = noise_valid
+        self.reset()
+
+    def reset(self):
+        """清除所有统计"""
+        self._columns = {name: [] for name in COLUMN_FIELDS}
+        self.count = 0
+        self._mean: Optional[np.ndarray] = None
+        self._m2: Optional[np.ndarray] = None
+        self._max: Optional[np.ndarray] = None
+        self._min: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, trace: np.ndarray, frequencies: np.ndarray) -> Dict[str, float]:
+        """
+        加入一个波长点的迹线(dBm)
+        :return: 该波长点的统计量
+        :raises ValueError: 频率点数与已有数据不一致
+        """
+        trace = np.asarray(trace, dtype=np.float64)
+        if self._mean is not None and len(trace) != len(self._mean):
+            raise ValueError(f"频率点数不一致 ({len(trace)} != {len(self._mean)})")
+        stats = {name: float(value[0]) for name, value in
+                 column_statistics(trace, frequencies, self.noise_percentile, self.rbw).items()}
+        if not self.noise_valid:
+            for name in ("noise_floor", "integrated_power", "snr"):
+                stats[name] = float("nan")
+        for name, value in stats.items():
+            self._columns[name].append(value)
+
+        # Welford算法累计均值和方差
+        self.count += 1
+        if self._mean is None:
+            self._mean = trace.copy()
+            self._m2 = np.zeros_like(trace)
+            self._max = trace.copy()
+            self._min = trace.copy()
+        else:
+            delta = trace - self._mean
+            self._mean += delta / self.count
+            self._m2 += delta * (trace - self._mean)
+            np.maximum(self._max, trace, out=self._max)
+            np.minimum(self._min, trace, out=self._min)
+        return stats
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """最近加入的波长点的统计量"""
+        if self.count == 0:
+            return None
+        return {name: values[-1] for name, values in self._columns.items()}
+
+    def column_statistics(self) -> Dict[str, np.ndarray]:
+        """各波长点的统计量, 每项长度为波长点数"""
+        return {name: np.array(values) for name, values in self._columns.items()}
+
+    def frequency_statistics(self) -> Dict[str, np.ndarray]:
+        """各频率点跨波长点的累计统计量, 每项长度为频率点数"""
+        if self._mean is None:
+            return {name: np.empty(0) for name in FREQUENCY_FIELDS}
+        variance = self._m2 / (self.count - 1) if self.count > 1 else np.zeros_like(self._m2)
+        return {
+            "mean": self._mean.copy(),
+            "std": np.sqrt(variance),
+            "max_hold": self._max.copy(),
+            "min_hold": self._min.copy(),
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """当前统计结果的副本, 可在其他线程中保存"""
+        return {"column": self.column_statistics(), "frequency": self.frequency_statistics()}
@@ -0,0 +1,196 @@
+import os
+import pickle
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 队列已满时的处理方式: 名称 -> 说明
+BACKPRESSURE_POLICIES = {
+    "block": "等待写入线程",
+    "spill": "暂存到本地文件",
+}
+
+
+class ColumnWriter:
+    """存储写入线程
+
+    采集线程通过有界队列提交每个波长点的数据, 由单独的线程按提交顺序写入存储,
+    磁盘或网络共享较慢时不会直接拖慢每个波长点的采集。
+    队列已满时, block方式让采集线程等待; spill方式将数据暂存到本地文件,
+    写入线程处理完队列后按顺序取回, 采集线程不等待。
+    写入出错时, 异常在下一次submit时抛出。
+    """
+
+    def __init__(self, write: Callable[..., Any], max_queue: int = 64, policy: str = "block",
+                 spill_path: Optional[str] = None):
+        """
+        :param write: 写入函数, 参数为submit时给出的参数, 在写入线程中调用
+        :param max_queue: 队列中最多等待写入的列数
+        :param policy: 队列已满时的处理方式, 见BACKPRESSURE_POLICIES
+        :param spill_path: spill方式的暂存文件路径
+        """
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"不支持的队列处理方式: {policy}")
+        if policy == "spill" and not spill_path:
+            raise ValueError("spill方式需要指定暂存文件")
+        self._write = write
+        self.max_queue = max(1, int(max_queue))
+        self.policy = policy
+        self.spill_path = spill_path
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(self.max_queue)
+        self._lock = threading.Lock()
+        self._spill_file = None
+        self._spill_read = None
+        self._spilled = 0  # 暂存文件中尚未取回的列数
+        self._pending = 0  # 已提交尚未写入的列数
+        self._idle = threading.Condition(self._lock)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        # 统计
+        self.submitted = 0
+        self.written = 0
+        self.max_depth = 0
+        self.spilled_total = 0
+        self.blocked_time = 0.0  # 采集线程等待队列的总时间(s)
+        self.write_time = 0.0  # 写入总时间(s), 包括出错的列
+        self.last_latency = 0.0  # 最近一列从提交到写入完成的时间(s)
+        self.max_latency = 0.0
+        self._thread = threading.Thread(target=self._run, name="ColumnWriter", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        """队列中等待写入的列数(包括暂存的列)"""
+        return self._queue.qsize() + self._spilled
+
+    def submit(self, *args):
+        """
+        提交一列数据, block方式在队列已满时等待
+        :raises RuntimeError: 写入线程已关闭
+        :raises Exception: 之前的写入出错时抛出该异常
+        """
+        self._raise_error()
+        if self._closed:
+            raise RuntimeError("存储写入线程已关闭")
+        item = (time.perf_counter(), args)
+        with self._lock:
+            self._pending += 1
+            self.submitted += 1
+            # 已有暂存数据时继续暂存, 保证写入顺序
+            if self.policy == "spill" and (self._spilled > 0 or self._queue.full()):
+                self._spill(item)
+                self.max_depth = max(self.max_depth, self.depth)
+                return
+        start = time.perf_counter()
+        self._queue.put(item)
+        self.blocked_time += time.perf_counter() - start
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def _spill(self, item: Tuple):
+        """将一列写入暂存文件(持有锁时调用)"""
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, "w+b")
+            self._spill_read = open(self.spill_path, "rb")
+        pickle.dump(item, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spill_file.flush()
+        self._spilled += 1
+        self.spilled_total += 1
+
+    def _unspill(self) -> Optional[Tuple]:
+        """按顺序取回一列暂存的数据, 全部取回后清空暂存文件"""
+        with self._lock:
+            if self._spilled == 0:
+                return None
+            item = pickle.load(self._spill_read)
+            self._spilled -= 1
+            if self._spilled == 0:
+                self._spill_file.seek(0)
+                self._spill_file.truncate()
+                self._spill_read.seek(0)
+            return item
+
+    def _run(self):
+        """写入线程: 先写队列中的数据, 队列空时取回暂存的数据"""
+        while True:
+            try:
+                # 有暂存数据时不等待队列
+                item = self._queue.get_nowait() if self._spilled else self._queue.get(timeout=0.05)
+            except queue.Empty:
+                item = self._unspill()
+                if item is None:
+                    if self._closed:
+                        return
+                    continue
+            if item is None:
+                # close()的结束标记, 之前可能仍有暂存的数据
+                while True:
+                    spilled = self._unspill()
+                    if spilled is None:
+                        return
+                    self._process(spilled)
+            self._process(item)
+
+    def _process(self, item: Tuple):
+        """写入一列并更新统计"""
+        submitted, args = item
+        start = time.perf_counter()
+        try:
+            self._write(*args)
+            self.written += 1
+        except Exception as e:
+            # 保留第一个未报告的异常
+            if self._error is None:
+                self._error = e
+        done = time.perf_counter()
+        self.write_time += done - start
+        self.last_latency = done - submitted
+        self.max_latency = max(self.max_latency, self.last_latency)
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _raise_error(self):
+        """抛出写入线程中未报告的异常"""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的数据全部写入, 返回是否在超时前完成"""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        """
+        写入全部已提交的数据并结束写入线程
+        :raises Exception: 写入出错时抛出该异常
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            for f in (self._spill_file, self._spill_read):
+                if f is not None:
+                    f.close()
+            if self._spill_file is not None:
+                try:
+                    os.remove(self.spill_path)
+                except OSError:
+                    pass
+        self._raise_error()
+
+    def metrics(self) -> Dict[str, float]:
+        """队列深度和写入耗时统计"""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "written": self.written,
+            "spilled": self.spilled_total,
+            "blocked_time": self.blocked_time,
+            "mean_write_time": self.write_time / max(self.submitted - self._pending, 1),
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+        }
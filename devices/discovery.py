@@ -0,0 +1,134 @@
+from devices.gpib_device import GPIBDevice, session_pool, is_simulation
+from devices.laser_controller import TSLController
+from devices.spectrum_analyzer import N9010BAnalyzer, CEYEAR4037Analyzer
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+
+# 可识别的驱动: (设备类型, 型号, 驱动类), 同一类型按顺序优先
+DRIVERS = [
+    ("Laser", "TSL", TSLController),
+    ("Analyzer", "N9010B", N9010BAnalyzer),
+    ("Analyzer", "CEYEAR4037", CEYEAR4037Analyzer),
+]
+
+IDN_COMMANDS = ["*IDN?", "ID?", "IDEN?"]
+
+
+def cache_path() -> str:
+    """地址->IDN缓存文件路径, 仿真模式使用单独的缓存"""
+    name = "idn_cache_sim.json" if is_simulation() else "idn_cache.json"
+    return os.path.join(os.path.expanduser("~"), ".laser_controller", name)
+
+
+def load_cache() -> Dict[str, str]:
+    """读取地址->IDN缓存"""
+    try:
+        with open(cache_path(), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: Dict[str, str]):
+    """保存地址->IDN缓存"""
+    try:
+        path = cache_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"保存设备缓存失败: {str(e)}")
+
+
+def probe_address(address: str, timeout_ms: int = 500) -> Optional[str]:
+    """以短超时查询地址的IDN, 依次尝试多种标识命令"""
+    try:
+        session = session_pool.acquire(address)
+    except Exception as e:
+        print(f"打开 {address} 失败: {str(e)}")
+        return None
+    try:
+        old_timeout = session.timeout
+        session.timeout = timeout_ms
+        try:
+            for cmd in IDN_COMMANDS:
+                try:
+                    response = session.query(cmd).strip()
+                    if response:
+                        return response
+                except Exception:
+                    # 不支持该命令的设备可能留下错误状态, 清除后再试下一条
+                    try:
+                        session.clear()
+                    except Exception:
+                        pass
+            return None
+        finally:
+            session.timeout = old_timeout
+    finally:
+        session_pool.release(address)
+
+
+def classify(idn: str) -> List[Tuple[str, str]]:
+    """将IDN与所有驱动比对, 返回匹配的(设备类型, 型号)列表"""
+    return [(role, model) for role, model, driver in DRIVERS if driver.matches_idn(idn)]
+
+
+def probe_all(addresses: List[str], timeout_ms: int = 500,
+              max_workers: int = 8) -> Dict[str, Optional[str]]:
+    """并发探测多个地址, 返回地址->IDN"""
+    if not addresses:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(addresses))) as pool:
+        results = pool.map(lambda addr: probe_address(addr, timeout_ms), addresses)
+        return dict(zip(addresses, results))
+
+
+def _select(idns: Dict[str, Optional[str]]) -> Dict[str, Tuple[str, str, str]]:
+    """按驱动优先级为每种设备类型选出一个地址: 类型 -> (型号, 地址, IDN)"""
+    found = {}
+    for role, model, driver in DRIVERS:
+        if role in found:
+            continue
+        for addr, idn in idns.items():
+            if idn and driver.matches_idn(idn):
+                found[role] = (model, addr, idn)
+                break
+    return found
+
+
+def discover_instruments(use_cache: bool = True, timeout_ms: int = 500,
+                         max_workers: int = 8) -> Dict[str, Tuple[str, str, str]]:
+    """
+    单次发现所有仪器
+    先验证缓存中的地址, 若所有缓存设备IDN不变且每种设备类型都已找到则直接返回;
+    否则并发探测其余地址, 每个IDN同时与所有驱动比对, 并更新缓存。
+    :return: 设备类型("Laser"/"Analyzer") -> (型号, 地址, IDN)
+    """
+    roles = {role for role, model, driver in DRIVERS}
+    idns: Dict[str, Optional[str]] = {}
+    if use_cache:
+        cache = load_cache()
+        if cache:
+            current = probe_all(list(cache), timeout_ms, max_workers)
+            if all(current.get(addr) == idn for addr, idn in cache.items()):
+                found = _select(current)
+                if roles <= set(found):
+                    print(f"设备缓存验证通过: {list(found)}")
+                    return found
+                print(f"设备缓存缺少: {sorted(roles - set(found))}, 搜索其余地址")
+                # 已验证的地址不再重复探测
+                idns = current
+            else:
+                print("设备缓存已失效, 重新搜索")
+
+    addresses = [addr for addr in GPIBDevice.list_available_devices() if addr not in idns]
+    idns.update(probe_all(addresses, timeout_ms, max_workers))
+    found = _select(idns)
+
+    # 只缓存识别出的设备
+    save_cache({addr: idn for model, addr, idn in found.values()})
+    return found
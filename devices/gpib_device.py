@@ -1,20 +1,134 @@
 import pyvisa
 import time
-from typing import List, Optional
+import numpy as np
+from typing import Any, Dict, List, Optional
+from devices import io_trace
+from devices.io_trace import tracer
+import os
+import threading
+
+# 仿真模式: 设置环境变量LASER_SIMULATION=1或调用enable_simulation()
+_simulation = os.environ.get("LASER_SIMULATION", "") not in ("", "0")
+_simulation_time_scale = None
+
+def enable_simulation(enabled: bool = True, time_scale: Optional[float] = None):
+    """启用/禁用仿真仪器后端, time_scale为仿真延时比例(0表示不模拟延时)"""
+    global _simulation, _simulation_time_scale, _resource_manager
+    session_pool.close_all()
+    with _rm_lock:
+        _resource_manager = None
+    _simulation = enabled
+    _simulation_time_scale = time_scale
+
+def is_simulation() -> bool:
+    """是否使用仿真仪器后端"""
+    return _simulation
+
+def open_resource_manager():
+    """创建资源管理器, 仿真模式下返回仿真后端"""
+    if _simulation:
+        from devices.simulator import SimulatedResourceManager
+        return SimulatedResourceManager(_simulation_time_scale)
+    return pyvisa.ResourceManager()
+
+# 进程共享的资源管理器, 首次使用时创建
+_resource_manager = None
+_rm_lock = threading.Lock()
+
+def get_resource_manager():
+    """获取进程共享的资源管理器"""
+    global _resource_manager
+    with _rm_lock:
+        if _resource_manager is None:
+            _resource_manager = open_resource_manager()
+        return _resource_manager
+
+class SessionPool:
+    """按地址缓存已打开的VISA会话
+
+    设备断开时只释放引用, 会话保持打开以供发现、重连和驱动复用;
+    需要真正关闭时调用close()/close_idle()/close_all()。
+    """
+    def __init__(self):
+        self._sessions: Dict[str, Any] = {}
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        
+    def acquire(self, address: str):
+        """获取地址对应的会话, 不存在时打开新会话"""
+        with self._lock:
+            session = self._sessions.get(address)
+            if session is None:
+                session = get_resource_manager().open_resource(address)
+                self._sessions[address] = session
+                print(f"打开会话: {address}")
+            self._refs[address] = self._refs.get(address, 0) + 1
+            return session
+            
+    def release(self, address: str):
+        """释放会话引用, 会话保持打开"""
+        with self._lock:
+            if self._refs.get(address, 0) > 0:
+                self._refs[address] -= 1
+                
+    def close(self, address: str):
+        """关闭指定地址的会话(如设备重新上电后需要重建会话)"""
+        with self._lock:
+            session = self._sessions.pop(address, None)
+            self._refs.pop(address, None)
+        if session is not None:
+            try:
+                session.close()
+                print(f"关闭会话: {address}")
+            except Exception as e:
+                print(f"关闭会话错误: {str(e)}")
+                
+    def close_idle(self):
+        """关闭所有未被设备引用的会话"""
+        with self._lock:
+            idle = [addr for addr in self._sessions if self._refs.get(addr, 0) == 0]
+        for addr in idle:
+            self.close(addr)
+            
+    def close_all(self):
+        """关闭所有会话"""
+        with self._lock:
+            addresses = list(self._sessions)
+        for addr in addresses:
+            self.close(addr)
+            
+    def is_open(self, address: str) -> bool:
+        """会话是否已打开"""
+        return address in self._sessions
+
+session_pool = SessionPool()
 
 class GPIBDevice:
     def __init__(self, address: Optional[str] = None):
         self.address = address
-        self.rm = pyvisa.ResourceManager()
         self.resource = None  # 改名为resource以避免与内建device冲突
         self.timeout = 5000  # 默认超时5秒
         
+        # 命令同步策略: 命令头前缀(大写) -> 等待方式, 未列出的命令发送后不等待
+        #   "opc"  - 阻塞式 *OPC? 查询 (IEEE 488.2)
+        #   "busy" - 轮询 *OPC? 直到返回1 (非阻塞实现的设备)
+        #   "stb"  - *OPC + 状态字节ESB位轮询, 等待期间不占用总线
+        #   秒数   - 按实测时间固定等待
+        self.sync_policy: Dict[str, Any] = {}
+        self.sync_timeout = 60.0  # 同步等待上限(秒)
+        self.sync_poll_interval = 0.01  # 轮询间隔(秒)
+        self._sync_cache: Dict[str, Any] = {}
+        
+    @property
+    def rm(self):
+        """共享的资源管理器"""
+        return get_resource_manager()
+        
     @classmethod
     def list_available_devices(cls) -> List[str]:
         """列出所有可用的GPIB设备地址"""
-        rm = pyvisa.ResourceManager()
         try:
-            resources = rm.list_resources()
+            resources = get_resource_manager().list_resources()
             print(f"找到 {len(resources)} 个设备: {resources}")
             return resources
         except Exception as e:
@@ -31,7 +145,7 @@ class GPIBDevice:
             
         try:
             print(f"尝试连接: {self.address}")
-            self.resource = self.rm.open_resource(self.address)
+            self.resource = session_pool.acquire(self.address)
             self.resource.timeout = self.timeout  # 设置超时时间
             print(f"成功连接并设置超时为{self.timeout}ms")
             
@@ -67,74 +181,218 @@ class GPIBDevice:
             return None
             
     def disconnect(self):
-        """断开设备连接"""
+        """断开设备连接 - 会话归还会话池, 不关闭"""
         if self.resource:
-            try:
-                self.resource.close()
-                print(f"断开连接: {self.address}")
-            except Exception as e:
-                print(f"断开连接错误: {str(e)}")
+            session_pool.release(self.address)
+            print(f"断开连接: {self.address}")
             self.resource = None
             
+    def reconnect(self) -> bool:
+        """关闭现有会话并重新连接"""
+        self.disconnect()
+        session_pool.close(self.address)
+        return self.connect()
+            
     def is_connected(self) -> bool:
         """检查设备是否已连接"""
         return self.resource is not None
             
-    def write(self, command: str):
-        """发送命令"""
+    def write(self, command: str, sync: Any = None):
+        """
+        发送命令
+        :param command: 命令字符串
+        :param sync: 覆盖同步策略 ("opc"/"busy"/"stb"/秒数), None表示按sync_policy查找, False表示不等待
+        :raises TimeoutError: 同步等待超时或失败, 命令可能尚未完成
+        """
         if not self.resource:
             raise ConnectionError("设备未连接")
             
+        t0 = time.perf_counter()
         try:
-            # 命令发送前记录
-            print(f"发送命令: {command}")
             self.resource.write(command)
-            # 添加小延时，确保命令处理
-            time.sleep(0.05)
         except Exception as e:
+            tracer.record(self.address, "write", command, len(command),
+                          time.perf_counter() - t0, str(e))
             print(f"命令发送错误: {str(e)}")
             raise
+        if tracer.level >= io_trace.INFO:
+            tracer.record(self.address, "write", command, len(command), time.perf_counter() - t0)
+            
+        # 仅对策略中要求等待的命令进行同步
+        policy = sync if sync is not None else self.get_sync_policy(command)
+        if policy and not self.wait_for_command(policy):
+            raise TimeoutError(f"命令未完成({policy}): {command}")
+            
+    def get_sync_policy(self, command: str) -> Any:
+        """查找命令对应的同步策略(按命令头最长前缀匹配)"""
+        header = command.strip().split(None, 1)[0].upper() if command.strip() else ""
+        if header in self._sync_cache:
+            return self._sync_cache[header]
+            
+        policy = None
+        matched = 0
+        for prefix, mode in self.sync_policy.items():
+            if header.startswith(prefix) and len(prefix) > matched:
+                policy = mode
+                matched = len(prefix)
+        self._sync_cache[header] = policy
+        return policy
+        
+    def wait_for_command(self, policy: Any) -> bool:
+        """按同步策略等待命令完成, 超时或出错时返回False"""
+        t0 = time.perf_counter()
+        try:
+            if policy == "opc":
+                done = self.wait_opc()
+            elif policy == "busy":
+                done = self.wait_busy()
+            elif policy == "stb":
+                done = self.wait_stb()
+            else:
+                time.sleep(float(policy))
+                done = True
+        except Exception as e:
+            tracer.record(self.address, "sync", str(policy), 0, time.perf_counter() - t0, str(e))
+            print(f"同步等待失败({policy}): {str(e)}")
+            return False
+        if tracer.level >= io_trace.INFO or not done:
+            tracer.record(self.address, "sync", str(policy), 0, time.perf_counter() - t0,
+                          None if done else "超时")
+        return done
+            
+    def wait_opc(self) -> bool:
+        """阻塞式*OPC?查询, 设备在所有挂起操作完成后返回1"""
+        old_timeout = self.resource.timeout
+        self.resource.timeout = max(old_timeout or 0, int(self.sync_timeout * 1000))
+        try:
+            return self.resource.query("*OPC?").strip() == "1"
+        finally:
+            self.resource.timeout = old_timeout
+            
+    def wait_busy(self) -> bool:
+        """轮询*OPC?直到设备返回1 (用于*OPC?立即返回忙闲状态的设备)"""
+        deadline = time.perf_counter() + self.sync_timeout
+        while time.perf_counter() < deadline:
+            if self.resource.query("*OPC?").strip() == "1":
+                return True
+            time.sleep(self.sync_poll_interval)
+        print(f"等待设备空闲超时: {self.address}")
+        return False
+        
+    def wait_stb(self, mask: int = 0x20) -> bool:
+        """
+        通过*OPC置位ESR的OPC位, 再轮询状态字节的ESB位(0x20)
+        轮询串行查询不占用消息通道, 适合较长的扫描等待
+        """
+        self.arm_stb()
+        return self.poll_stb(mask)
+        
+    def arm_stb(self):
+        """清除状态并发送*OPC, 挂起操作全部完成后ESB位置位"""
+        self.resource.write("*CLS;*ESE 1;*OPC")
+        
+    def poll_stb(self, mask: int = 0x20, timeout: Optional[float] = None) -> bool:
+        """
+        轮询状态字节直到mask位置位
+        :param timeout: 超时(秒), None表示使用sync_timeout
+        """
+        deadline = time.perf_counter() + (self.sync_timeout if timeout is None else timeout)
+        while time.perf_counter() < deadline:
+            if self.resource.read_stb() & mask:
+                self.resource.query("*ESR?")  # 读取并清除事件状态寄存器
+                return True
+            time.sleep(self.sync_poll_interval)
+        print(f"等待操作完成超时: {self.address}")
+        return False
             
     def query(self, command: str) -> str:
         """查询设备"""
         if not self.resource:
             raise ConnectionError("设备未连接")
             
+        t0 = time.perf_counter()
         try:
-            # 查询前记录
-            print(f"查询命令: {command}")
             response = self.resource.query(command)
-            print(f"设备响应: {response}")
-            return response
         except pyvisa.errors.VisaIOError as e:
+            tracer.record(self.address, "query", command, len(command),
+                          time.perf_counter() - t0, str(e))
             if e.error_code == pyvisa.constants.StatusCode.error_timeout:
                 print(f"查询超时: {command}")
             else:
                 print(f"VISA IO错误: {str(e)}")
             raise
         except Exception as e:
+            tracer.record(self.address, "query", command, len(command),
+                          time.perf_counter() - t0, str(e))
             print(f"查询错误: {str(e)}")
             raise
-            
+        if tracer.level >= io_trace.INFO:
+            tracer.record(self.address, "query", command, len(command) + len(response),
+                          time.perf_counter() - t0, response=response)
+        return response
+
+    def query_binary_values(self, command: str, datatype: str = 'f',
+                            is_big_endian: bool = False) -> np.ndarray:
+        """以IEEE 488.2定长块格式查询二进制数据, 直接返回numpy数组"""
+        if not self.resource:
+            raise ConnectionError("设备未连接")
+
+        t0 = time.perf_counter()
+        try:
+            data = self.resource.query_binary_values(
+                command, datatype=datatype, is_big_endian=is_big_endian,
+                container=np.array)
+        except Exception as e:
+            tracer.record(self.address, "binary", command, len(command),
+                          time.perf_counter() - t0, str(e))
+            print(f"二进制查询错误: {str(e)}")
+            raise
+        if tracer.level >= io_trace.INFO:
+            tracer.record(self.address, "binary", command, len(command) + data.nbytes,
+                          time.perf_counter() - t0, response=f"{len(data)}点")
+        return data
+
+    def query_ascii_values(self, command: str) -> np.ndarray:
+        """查询逗号分隔的ASCII数值数据, 返回numpy数组"""
+        if not self.resource:
+            raise ConnectionError("设备未连接")
+
+        t0 = time.perf_counter()
+        try:
+            data = self.resource.query_ascii_values(command, container=np.array)
+        except Exception as e:
+            tracer.record(self.address, "ascii", command, len(command),
+                          time.perf_counter() - t0, str(e))
+            print(f"ASCII查询错误: {str(e)}")
+            raise
+        if tracer.level >= io_trace.INFO:
+            tracer.record(self.address, "ascii", command, len(command),
+                          time.perf_counter() - t0, response=f"{len(data)}点")
+        return data
+
     def read(self) -> str:
         """读取设备数据"""
         if not self.resource:
             raise ConnectionError("设备未连接")
             
+        t0 = time.perf_counter()
         try:
             response = self.resource.read()
-            print(f"读取数据: {response}")
-            return response
         except Exception as e:
+            tracer.record(self.address, "read", "", 0, time.perf_counter() - t0, str(e))
             print(f"读取错误: {str(e)}")
             raise
+        if tracer.level >= io_trace.INFO:
+            tracer.record(self.address, "read", "", len(response),
+                          time.perf_counter() - t0, response=response)
+        return response
             
     def set_timeout(self, timeout_ms: int):
         """设置通信超时时间(毫秒)"""
         self.timeout = timeout_ms
-        if self.resource:
+        # 会话已是该超时时不再重复设置
+        if self.resource and self.resource.timeout != timeout_ms:
             self.resource.timeout = timeout_ms
-            print(f"更新超时设置为 {timeout_ms}ms")
             
     def clear(self):
         """清除设备状态"""
@@ -148,4 +406,5 @@ class GPIBDevice:
             print("设备不支持清除命令")
             
     def __del__(self):
-        self.disconnect()
\ No newline at end of file
+        if getattr(self, "resource", None):
+            self.disconnect()
\ No newline at end of file
@@ -0,0 +1,137 @@
+import collections
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 追踪级别
+OFF = 0      # 不记录
+ERROR = 1    # 仅记录失败的事务
+INFO = 2     # 记录所有事务(命令、字节数、耗时)
+DEBUG = 3    # 额外保存响应摘要并输出到控制台
+
+LEVEL_NAMES = {OFF: "OFF", ERROR: "ERROR", INFO: "INFO", DEBUG: "DEBUG"}
+
+
+class IOTracer:
+    """VISA I/O事务追踪器
+
+    最近的事务保存在有界环形缓冲区中, 可选异步文件输出。
+    每条记录为元组: (时间戳, 地址, 操作, 命令, 字节数, 耗时秒, 错误, 响应摘要)
+    默认只记录失败的事务; 第一次失败后提升到error_level, 记录之后的全部事务便于排查。
+    """
+    FIELDS = ("timestamp", "address", "op", "command", "bytes", "latency", "error", "response")
+
+    def __init__(self, capacity: int = 256, level: int = ERROR, error_level: int = INFO):
+        """
+        :param capacity: 环形缓冲区容量
+        :param level: 追踪级别
+        :param error_level: 记录到失败的事务后提升到的级别, 不高于level时不提升
+        """
+        self.level = level
+        self.error_level = error_level
+        self._ring = collections.deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._sink_queue = None
+        self._sink_thread = None
+
+    def set_level(self, level: int):
+        """设置追踪级别"""
+        self.level = level
+
+    def set_capacity(self, capacity: int):
+        """设置环形缓冲区容量, 保留最近的记录"""
+        with self._lock:
+            self._ring = collections.deque(self._ring, maxlen=capacity)
+
+    def record(self, address: Optional[str], op: str, command: str, nbytes: int,
+               latency: float, error: Optional[str] = None, response: Any = None):
+        """记录一次事务 - 调用方应先检查level以避免无谓开销"""
+        if self.level < (ERROR if error else INFO):
+            return
+        if error and self.level < self.error_level:
+            self.level = self.error_level
+        preview = None
+        if response is not None and self.level >= DEBUG:
+            preview = str(response)[:80]
+        entry = (time.time(), address, op, command, nbytes, latency, error, preview)
+        self._ring.append(entry)
+        if self.level >= DEBUG:
+            print(f"[{op}] {address} {command} ({nbytes}B, {latency*1000:.1f}ms)"
+                  + (f" -> {preview}" if preview else "")
+                  + (f" 错误: {error}" if error else ""))
+        if self._sink_queue is not None:
+            self._sink_queue.put(entry)
+
+    def recent(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """返回最近n条事务(字典形式), n为None时返回全部"""
+        with self._lock:
+            entries = list(self._ring)
+        if n is not None:
+            entries = entries[-n:]
+        return [dict(zip(self.FIELDS, e)) for e in entries]
+
+    def format_recent(self, n: Optional[int] = None) -> str:
+        """将最近的事务格式化为可读文本"""
+        lines = []
+        for e in self.recent(n):
+            ts = datetime.fromtimestamp(e["timestamp"]).strftime("%H:%M:%S.%f")[:-3]
+            line = (f"{ts} {e['address']} {e['op']:<6} {e['command']} "
+                    f"{e['bytes']}B {e['latency']*1000:.1f}ms")
+            if e["error"]:
+                line += f" 错误: {e['error']}"
+            if e["response"]:
+                line += f" -> {e['response']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def dump_to_file(self, filename: str, n: Optional[int] = None) -> str:
+        """将最近的事务写入文件, 返回文件名"""
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(self.format_recent(n))
+            f.write("\n")
+        return filename
+
+    def clear(self):
+        """清空环形缓冲区"""
+        with self._lock:
+            self._ring.clear()
+
+    def open_file_sink(self, filename: str):
+        """启用异步文件输出(JSON Lines), 写盘在后台线程完成"""
+        self.close_file_sink()
+        self._sink_queue = queue.SimpleQueue()
+        self._sink_thread = threading.Thread(
+            target=self._sink_worker, args=(filename, self._sink_queue), daemon=True)
+        self._sink_thread.start()
+
+    def close_file_sink(self):
+        """关闭文件输出并等待剩余记录写完"""
+        if self._sink_queue is None:
+            return
+        self._sink_queue.put(None)
+        self._sink_thread.join(timeout=5.0)
+        self._sink_queue = None
+        self._sink_thread = None
+
+    def _sink_worker(self, filename: str, q: "queue.SimpleQueue"):
+        """后台写盘线程"""
+        try:
+            with open(filename, "a", encoding="utf-8") as f:
+                while True:
+                    entry = q.get()
+                    if entry is None:
+                        break
+                    f.write(json.dumps(dict(zip(self.FIELDS, entry)), ensure_ascii=False))
+                    f.write("\n")
+                    # 队列暂时为空时再刷新, 减少系统调用
+                    if q.empty():
+                        f.flush()
+        except Exception as e:
+            print(f"I/O追踪文件写入失败: {str(e)}")
+
+
+# 进程内共享的追踪器
+tracer = IOTracer()
@@ -1,5 +1,6 @@
 from devices.gpib_device import GPIBDevice
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+import math
 import time
 
 class TSLController(GPIBDevice):
@@ -14,10 +15,29 @@ class TSLController(GPIBDevice):
         self.stop_wl = None
         self.step = None
         self.dwell = None
+        self.sweep_started = False  # 已启动内部扫描, stop_scan时需要停止
         
         # 增加通信超时时间
         self.timeout = 10000  # 10秒
         
+        # 波长稳定判定: 连续settle_count次读数与目标偏差不超过容差
+        self.settle_tolerance = 0.001  # nm
+        self.settle_power_tolerance = None  # dBm, None表示不检查功率
+        self.settle_count = 2
+        self.settle_timeout = 5.0  # 秒
+        self.settle_poll_interval = 0.01  # 秒
+        
+        # 同步策略: SCPI功率命令的*OPC?立即返回忙闲状态, 需轮询;
+        # 传统命令(LO/LF/APC/ACC)不支持*OPC?, 使用实测延时
+        self.sync_policy = {
+            ":POW": "busy",
+            "LO": 0.2,
+            "LF": 0.2,
+            "APC": 0.1,
+            "ACC": 0.1,
+            "*RST": 1.0,
+        }
+        
     def connect(self) -> bool:
         """连接设备并设置超时时间"""
         result = super().connect()
@@ -27,45 +47,29 @@ class TSLController(GPIBDevice):
             print(f"已设置通信超时为 {self.timeout}ms")
         return result
         
+    @classmethod
+    def matches_idn(cls, idn: str) -> bool:
+        """判断设备标识是否为TSL激光器"""
+        return "TSL" in idn  # 根据实际设备ID调整
+        
     @classmethod
     def find_laser(cls) -> Optional[str]:
         """自动寻找激光器设备"""
-        devices = cls.list_available_devices()
-        for addr in devices:
-            dev = cls(addr)
-            if dev.connect():
-                idn = dev.identify_device()
-                dev.disconnect()
-                if idn and "TSL" in idn:  # 根据实际设备ID调整
-                    return addr
-        return None
+        from devices.discovery import discover_instruments
+        found = discover_instruments().get("Laser")
+        return found[1] if found else None
         
     def set_wavelength(self, wavelength: float) -> float:
         """
-        设置激光器波长
+        设置激光器波长, 不回读(稳定判定见wait_settled)
         :param wavelength: 波长值(nm)
-        :return: 返回设置后的实际波长
+        :return: 设定值
         """
         try:
-            # 发送简单的SCPI命令，不使用多重尝试
-            print(f"设置波长: {wavelength} nm")
-            
-            # 基于用户的反馈，尝试使用最简单的命令格式
             self.write(f':WAV {wavelength}')
-            
-            # 查询当前波长并返回
-            result = self.query(':WAV?')
-            print(f"波长设置响应: {result}")
-            
-            # 尝试解析返回的波长
-            try:
-                return float(result)
-            except:
-                return wavelength  # 如果解析失败，返回设定值
-                
         except Exception as e:
             print(f"设置波长出错: {str(e)}")
-            return wavelength  # 出错时返回设定值
+        return wavelength
         
     def get_wavelength(self) -> float:
         """获取当前波长"""
@@ -93,6 +97,49 @@ class TSLController(GPIBDevice):
             # 如果出错，返回一个默认值或上次设置的值
             return self.start_wl or self.min_wavelength
         
+    def wait_settled(self, target: float, tolerance: Optional[float] = None,
+                     timeout: Optional[float] = None,
+                     power_tolerance: Optional[float] = None) -> Tuple[float, float, bool]:
+        """
+        轮询波长(可选功率)直到稳定
+        :param target: 目标波长(nm)
+        :param tolerance: 波长容差(nm), None表示使用settle_tolerance
+        :param timeout: 超时(秒), None表示使用settle_timeout
+        :param power_tolerance: 相邻两次功率读数的最大差值(dBm), None表示使用settle_power_tolerance
+        :return: (最后读取的波长, 耗时秒, 是否稳定)
+        """
+        tolerance = self.settle_tolerance if tolerance is None else tolerance
+        timeout = self.settle_timeout if timeout is None else timeout
+        if power_tolerance is None:
+            power_tolerance = self.settle_power_tolerance
+            
+        t0 = time.perf_counter()
+        deadline = t0 + timeout
+        wavelength = target
+        last_power = None
+        hits = 0
+        while True:
+            # 任何读取错误(包括VISA超时)都只判为未稳定, 不中断扫描
+            try:
+                wavelength = float(self.query(':WAV?').lower().replace('nm', '').strip())
+                stable = abs(wavelength - target) <= tolerance
+                if stable and power_tolerance is not None:
+                    power = self.get_power()
+                    stable = last_power is not None and abs(power - last_power) <= power_tolerance
+                    last_power = power
+            except Exception as e:
+                print(f"稳定检测读取失败: {str(e)}")
+                return wavelength, time.perf_counter() - t0, False
+            hits = hits + 1 if stable else 0
+            
+            elapsed = time.perf_counter() - t0
+            if hits >= self.settle_count:
+                return wavelength, elapsed, True
+            if time.perf_counter() >= deadline:
+                print(f"波长稳定超时: 目标={target:.4f}nm, 读取={wavelength:.4f}nm")
+                return wavelength, elapsed, False
+            time.sleep(self.settle_poll_interval)
+        
     def set_scan_parameters(self, start: float, stop: float, step: float, dwell: float):
         """设置扫描参数 - 只存储参数，不实际发送到设备"""
         # 验证参数有效性
@@ -116,14 +163,51 @@ class TSLController(GPIBDevice):
         print(f"已存储扫描参数: 起始={start}nm, 终止={stop}nm, 步长={step}nm, 停留时间={dwell}s")
         return True
         
-    def start_scan(self):
-        """启动扫描 - 保留接口但实际不使用，现在使用手动波长控制"""
-        print("激光器扫描逻辑已改为手动控制波长")
-        return True
+    def start_scan(self, dwell: Optional[float] = None) -> bool:
+        """
+        启动激光器内部单向步进扫描, 每到达一个波长点输出一个触发脉冲
+        第i个触发对应波长 start_wl + i*step (见get_scan_wavelengths)
+        :param dwell: 每点停留时间(秒), None表示使用扫描参数中的停留时间
+        """
+        if self.start_wl is None or self.stop_wl is None or self.step is None:
+            print("启动扫描失败: 未设置扫描参数")
+            return False
+        dwell = self.dwell if dwell is None else dwell
+        # 命令发送到一半出错时触发输出可能已打开, 同样需要stop_scan
+        self.sweep_started = True
+        try:
+            self.write(f":WAV:SWE:STAR {self.start_wl:.4f}")
+            self.write(f":WAV:SWE:STOP {self.stop_wl:.4f}")
+            self.write(":WAV:SWE:MOD 0")  # 0: 单向步进扫描
+            self.write(f":WAV:SWE:STEP {self.step:.4f}")
+            self.write(f":WAV:SWE:DWEL {dwell:.3f}")
+            self.write(":TRIG:OUTP 3")  # 3: 每步输出触发
+            self.write(":WAV:SWE:STAT 1")
+            print(f"激光器步进扫描已启动: {self.start_wl}-{self.stop_wl}nm, 步长 {self.step}nm, 停留 {dwell:.3f}s")
+            return True
+        except Exception as e:
+            print(f"启动扫描错误: {str(e)}")
+            return False
         
-    def stop_scan(self):
-        """停止扫描 - 保留接口但实际不使用"""
-        return True
+    def stop_scan(self) -> bool:
+        """停止激光器内部扫描并关闭触发输出, 未启动内部扫描时不发送命令"""
+        if not self.sweep_started:
+            return True
+        try:
+            self.write(":WAV:SWE:STAT 0")
+            self.write(":TRIG:OUTP 0")
+            self.sweep_started = False
+            return True
+        except Exception as e:
+            print(f"停止扫描错误: {str(e)}")
+            return False
+            
+    def is_sweeping(self) -> bool:
+        """激光器内部扫描是否仍在进行"""
+        try:
+            return self.query(":WAV:SWE:STAT?").strip() not in ("0", "")
+        except Exception:
+            return False
         
     def get_status(self) -> str:
         """获取设备状态"""
@@ -141,8 +225,6 @@ class TSLController(GPIBDevice):
             else:
                 print("禁用激光器输出")
                 self.write("LF")
-                
-            time.sleep(0.2)  # 添加延时确保执行完成
             return True
         except Exception as e:
             print(f"设置激光输出错误: {str(e)}")
@@ -172,16 +254,12 @@ class TSLController(GPIBDevice):
             # 确保输出已启用（仅当功率非0时）
             if abs(power) > 0.001 and not self.is_output_enabled():
                 self.enable_output(True)
-                time.sleep(0.1)  # 缩短等待时间
             
             # 使用官方命令格式
             cmd = f":POWer:LEVel {power:.2f}"
             print(f"设置功率: {cmd}")
             self.write(cmd)
             
-            # 适当等待确保执行完成（根据经验调整为较短时间）
-            time.sleep(0.3)
-            
             # 仅简单日志记录，不进行严格验证以提高响应速度
             print(f"功率设置命令已发送: {power:.2f} dBm")
             
@@ -212,7 +290,6 @@ class TSLController(GPIBDevice):
         try:
             cmd = "APC" if enable else "ACC"
             self.write(cmd)
-            time.sleep(0.1)  # 添加延时确保执行完成
             return True
         except Exception as e:
             print(f"设置功率控制模式错误: {str(e)}")
@@ -230,22 +307,24 @@ class TSLController(GPIBDevice):
             
     def get_scan_points(self) -> int:
         """计算并返回扫描点数"""
+        return len(self.get_scan_wavelengths())
+        
+    def get_scan_wavelengths(self) -> List[float]:
+        """按扫描参数生成各点的设定波长(不超过终止波长)"""
         if self.start_wl is None or self.stop_wl is None or self.step is None:
-            return 0
+            return []
             
         if self.step <= 0:
-            return 0
+            return []
             
-        # 计算扫描点数并确保至少为1
-        import math
-        scan_points = math.ceil((self.stop_wl - self.start_wl) / self.step) + 1
-        return max(1, scan_points)
+        # 用索引计算避免累加误差, 容差防止浮点除法少算最后一点
+        count = int(math.floor((self.stop_wl - self.start_wl) / self.step + 1e-9)) + 1
+        return [self.start_wl + i * self.step for i in range(max(1, count))]
         
     def reset(self):
         """复位设备到默认状态"""
         try:
             self.write("*RST")
-            time.sleep(1.0)  # 复位后等待1秒
             return True
         except:
             return False
\ No newline at end of file
@@ -0,0 +1,542 @@
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _short_node(node: str) -> str:
+    """SCPI节点转为短格式: SENSe -> SENS, MARKer1 -> MARK1, 全大写节点保持不变"""
+    if node.upper() == node:
+        return node
+    return "".join(c for c in node if c.isupper() or c.isdigit())
+
+
+def parse_scpi(command: str) -> Tuple[str, str]:
+    """
+    解析单条SCPI命令
+    :return: (规范化命令头, 参数字符串), 命令头去掉可选的SENS根节点
+    """
+    command = command.strip()
+    header, _, arg = command.partition(" ")
+    if header.startswith("*"):
+        return header.upper(), arg.strip()
+    nodes = [_short_node(n) for n in header.strip(":").split(":") if n]
+    if nodes and nodes[0] == "SENS":
+        nodes = nodes[1:]
+    return ":".join(nodes).upper(), arg.strip()
+
+
+def _parse_bool(arg: str) -> bool:
+    return arg.strip().upper() in ("ON", "1", "TRUE")
+
+
+class SimulatedInstrument:
+    """仿真仪器基类: 解析命令并模拟命令延时"""
+    idn = "SIMULATED,INSTRUMENT,0,0"
+
+    def __init__(self, bench: "SimulatedBench"):
+        self.bench = bench
+        self.lock = threading.RLock()
+        self.command_latency = 0.002  # 每条命令的总线开销(秒)
+        self.bus_rate = 1.0e6  # GPIB传输速率(字节/秒)
+
+    def sleep(self, seconds: float):
+        """按仿真时间比例休眠"""
+        scaled = seconds * self.bench.time_scale
+        if scaled > 0:
+            time.sleep(scaled)
+
+    def handle(self, header: str, arg: str) -> Optional[str]:
+        """处理一条命令, 查询命令返回响应字符串"""
+        if header == "*IDN?":
+            return self.idn
+        if header in ("*CLS", "*ESE", "*WAI", "*OPC"):
+            return None
+        if header == "*OPC?":
+            return "1"
+        if header == "*ESR?":
+            return "0"
+        if header == "*RST":
+            self.reset()
+            return None
+        raise ValueError(f"仿真仪器不支持的命令: {header}")
+
+    def reset(self):
+        pass
+
+    def read_stb(self) -> int:
+        return 0
+
+    def binary_payload(self, header: str, arg: str) -> Optional[bytes]:
+        """二进制查询的数据块, 不支持时返回None"""
+        return None
+
+
+class SimulatedTSL(SimulatedInstrument):
+    """仿真可调谐激光器(Santec TSL系列命令子集)"""
+    idn = "SANTEC,TSL-550,SIM00001,0001.0000"
+
+    def __init__(self, bench: "SimulatedBench"):
+        super().__init__(bench)
+        self.tune_tau = 0.03  # 波长调谐时间常数(秒)
+        self.settle_tolerance = 0.0005  # nm
+        self.reset()
+
+    def reset(self):
+        self.target_wl = 1550.0
+        self.start_wl = 1550.0
+        self.tune_start = 0.0
+        self.power = 0.0
+        self.output = False
+        self.apc = True
+        # 内部步进扫描参数
+        self.sweep_start = 1550.0
+        self.sweep_stop = 1560.0
+        self.sweep_step = 0.1
+        self.sweep_dwell = 0.1
+        self.trigger_output = 0
+        self.sweep_t0 = None  # 扫描开始时刻, None表示未扫描
+        self.sweep_id = 0
+
+    def sweep_points(self) -> int:
+        return int(math.floor((self.sweep_stop - self.sweep_start) / self.sweep_step + 1e-9)) + 1
+
+    def sweep_wavelength(self, index: int) -> float:
+        return self.sweep_start + index * self.sweep_step
+
+    def sweep_index(self, at: float) -> Optional[int]:
+        """时刻at所处的扫描点序号, 未扫描或已结束时返回None"""
+        if self.sweep_t0 is None:
+            return None
+        dwell = self.sweep_dwell * self.bench.time_scale
+        if dwell <= 0:
+            return None
+        index = int((at - self.sweep_t0) // dwell)
+        return index if 0 <= index < self.sweep_points() else None
+
+    def next_trigger(self, after: float, min_index: int) -> Optional[Tuple[int, float]]:
+        """
+        时刻after之后的第一个步进触发(序号不小于min_index)
+        不模拟延时时触发按序号依次到达
+        :return: (触发序号, 触发时刻), 无后续触发时返回None
+        """
+        if self.sweep_t0 is None or self.trigger_output != 3:
+            return None
+        dwell = self.sweep_dwell * self.bench.time_scale
+        index = min_index
+        if dwell > 0:
+            index = max(index, int(math.ceil((after - self.sweep_t0) / dwell)))
+        if index >= self.sweep_points():
+            return None
+        return index, self.sweep_t0 + index * dwell
+
+    def wavelength(self, at: Optional[float] = None) -> float:
+        """时刻at的实际波长: 扫描中为当前步进点, 否则以指数方式趋近设定值"""
+        at = time.perf_counter() if at is None else at
+        if self.sweep_t0 is not None and at >= self.sweep_t0:
+            index = self.sweep_index(at)
+            if index is None:
+                # 扫描结束后停在终止波长
+                index = self.sweep_points() - 1
+            return self.sweep_wavelength(index)
+        tau = self.tune_tau * self.bench.time_scale
+        elapsed = at - self.tune_start
+        if tau <= 0:
+            return self.target_wl
+        return self.target_wl + (self.start_wl - self.target_wl) * math.exp(-elapsed / tau)
+
+    def is_settled(self) -> bool:
+        return abs(self.wavelength() - self.target_wl) < self.settle_tolerance
+
+    def handle(self, header: str, arg: str) -> Optional[str]:
+        with self.lock:
+            if header == "WAV":
+                self.start_wl = self.wavelength()
+                self.sweep_t0 = None
+                self.target_wl = float(arg)
+                self.tune_start = time.perf_counter()
+                return None
+            if header == "WAV?":
+                return f"{self.wavelength():.4f}"
+            if header in ("POW:LEV", "POW"):
+                self.power = float(arg)
+                return None
+            if header in ("POW:LEV?", "POW?", "OP?"):
+                return f"{self.power:.2f}"
+            if header == "LO":
+                self.output = True
+                return None
+            if header == "LF":
+                self.output = False
+                return None
+            if header == "LO?":
+                return "1" if self.output else "0"
+            if header == "APC":
+                self.apc = True
+                return None
+            if header == "ACC":
+                self.apc = False
+                return None
+            if header == "APC?":
+                return "1" if self.apc else "0"
+            if header == "WAV:SWE:STAR":
+                self.sweep_start = float(arg)
+                return None
+            if header == "WAV:SWE:STOP":
+                self.sweep_stop = float(arg)
+                return None
+            if header == "WAV:SWE:STEP":
+                self.sweep_step = float(arg)
+                return None
+            if header == "WAV:SWE:DWEL":
+                self.sweep_dwell = float(arg)
+                return None
+            if header == "WAV:SWE:MOD":
+                if int(float(arg)) != 0:
+                    raise ValueError("仿真激光器仅支持单向步进扫描")
+                return None
+            if header == "TRIG:OUTP":
+                self.trigger_output = int(float(arg))
+                return None
+            if header in ("WAV:SWE:STAT", "WAV:SWE"):
+                if _parse_bool(arg):
+                    self.sweep_t0 = time.perf_counter()
+                    self.sweep_id += 1
+                else:
+                    self.start_wl = self.target_wl = self.wavelength()
+                    self.sweep_t0 = None
+                return None
+            if header in ("WAV:SWE:STAT?", "WAV:SWE?"):
+                running = self.sweep_index(time.perf_counter()) is not None
+                return "1" if running else "0"
+            if header == "SU?":
+                return "0" if self.is_settled() else "1"
+            if header == "*OPC?":
+                # TSL的*OPC?立即返回忙闲状态
+                return "1" if self.is_settled() else "0"
+            return super().handle(header, arg)
+
+
+class SimulatedAnalyzer(SimulatedInstrument):
+    """仿真频谱分析仪(N9010B/CEYEAR4037共用的SCPI子集)"""
+
+    def __init__(self, bench: "SimulatedBench", idn: str, max_points: int, max_freq: float):
+        super().__init__(bench)
+        self.idn = idn
+        self.max_points = max_points
+        self.max_freq = max_freq
+        self.rng = np.random.default_rng()
+        self.reset()
+
+    def reset(self):
+        self.start = 1.0e6
+        self.stop = 10.0e6
+        self.rbw = 100.0e3
+        self.points = 1001
+        self.continuous = True
+        self.trigger_source = "IMM"
+        self.ref_level = 0.0
+        self.data_format = "ASCII"
+        self.byte_order = "NORM"
+        self.sweep_end = 0.0
+        self.ese = 0
+        self.opc_pending = False
+        self.trace = None
+        self.marker_y = -100.0
+        self.trigger_sweep_id = 0
+        self.trigger_count = 0  # 本次激光器扫描中已使用的触发数
+        self.armed_at = None  # 外部触发已准备的时刻
+
+    def sweep_time(self) -> float:
+        """自动扫描时间: 约2.5*span/RBW², 最短1ms"""
+        return max(1e-3, 2.5 * (self.stop - self.start) / (self.rbw ** 2))
+
+    def wait_sweep(self):
+        """阻塞直到当前扫描完成"""
+        self.resolve_trigger()
+        if self.armed_at is not None:
+            raise TimeoutError("仿真频谱仪等待触发超时")
+        remaining = self.sweep_end - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def start_sweep(self):
+        """开始单次扫描并生成迹线, 外部触发时等待下一个激光器触发"""
+        if self.trigger_source.startswith("EXT"):
+            self.armed_at = time.perf_counter()
+            self.trace = None
+            self.sweep_end = math.inf
+            self.resolve_trigger()
+            return
+        self.trace = self.generate_trace()
+        self.sweep_end = time.perf_counter() + self.sweep_time() * self.bench.time_scale
+
+    def resolve_trigger(self):
+        """已准备触发时, 若准备之后激光器已输出触发则开始扫描"""
+        if self.armed_at is None:
+            return
+        laser = self.bench.laser
+        if laser.sweep_id != self.trigger_sweep_id:
+            self.trigger_sweep_id = laser.sweep_id
+            self.trigger_count = 0
+        trigger = laser.next_trigger(self.armed_at, self.trigger_count)
+        if trigger is None or trigger[1] > time.perf_counter():
+            return
+        index, at = trigger
+        self.armed_at = None
+        self.trigger_count = index + 1
+        self.trace = self.generate_trace(laser.sweep_wavelength(index))
+        self.sweep_end = at + self.sweep_time() * self.bench.time_scale
+
+    def generate_trace(self, wavelength: Optional[float] = None) -> np.ndarray:
+        """按当前span/RBW/点数生成迹线: 噪声底 + 随激光波长移动的谱线"""
+        freqs = np.linspace(self.start, self.stop, self.points)
+        # 显示平均噪声电平随RBW变化
+        noise_floor = -150.0 + 10 * math.log10(self.rbw)
+        trace = noise_floor + self.rng.normal(0.0, 1.0, self.points)
+
+        laser = self.bench.laser
+        if laser is not None and laser.output:
+            wl = laser.wavelength() if wavelength is None else wavelength
+            span = self.stop - self.start
+            center = (self.start + self.stop) / 2
+            peak_freq = center + 0.4 * span * math.sin(2 * math.pi * (wl - 1500.0) / 20.0)
+            peak_power = laser.power - 20.0
+            sigma = self.rbw / 2.355  # RBW滤波器近似为高斯形状
+            line = peak_power - 10 * np.log10(np.e) * ((freqs - peak_freq) ** 2) / (2 * sigma ** 2)
+            trace = 10 * np.log10(10 ** (trace / 10) + 10 ** (np.maximum(line, -300) / 10))
+        return trace
+
+    def current_trace(self) -> np.ndarray:
+        self.resolve_trigger()
+        if self.armed_at is None and (self.continuous or self.trace is None
+                                      or len(self.trace) != self.points):
+            self.start_sweep()
+        self.wait_sweep()
+        return self.trace
+
+    def read_stb(self) -> int:
+        with self.lock:
+            self.resolve_trigger()
+            if self.opc_pending and self.ese & 1 and time.perf_counter() >= self.sweep_end:
+                return 0x20
+            return 0
+
+    def handle(self, header: str, arg: str) -> Optional[str]:
+        with self.lock:
+            if header == "FREQ:CENT":
+                span = self.stop - self.start
+                center = float(arg)
+                self.start, self.stop = center - span / 2, center + span / 2
+                return None
+            if header == "FREQ:SPAN":
+                center = (self.start + self.stop) / 2
+                span = float(arg)
+                self.start, self.stop = center - span / 2, center + span / 2
+                return None
+            if header == "FREQ:STAR":
+                self.start = float(arg)
+                return None
+            if header == "FREQ:STOP":
+                self.stop = float(arg)
+                return None
+            if header == "FREQ:STAR?":
+                return f"{self.start:.6e}"
+            if header == "FREQ:STOP?":
+                return f"{self.stop:.6e}"
+            if header == "BAND:RES":
+                self.rbw = float(arg)
+                return None
+            if header == "BAND:RES?":
+                return f"{self.rbw:.6e}"
+            if header in ("BAND:VID:AUTO", "FREQ:CENT:STEP:AUTO", "FREQ:TUNE:IMM"):
+                return None
+            if header == "SWE:POIN":
+                self.points = min(int(float(arg)), self.max_points)
+                return None
+            if header == "SWE:POIN?":
+                return str(self.points)
+            if header == "SWE:TIME?":
+                return f"{self.sweep_time():.6e}"
+            if header == "INIT:CONT":
+                self.continuous = _parse_bool(arg)
+                return None
+            if header == "INIT:CONT?":
+                return "1" if self.continuous else "0"
+            if header == "INIT:IMM":
+                self.start_sweep()
+                return None
+            if header == "TRIG:SOUR":
+                self.trigger_source = arg.upper()
+                self.armed_at = None
+                return None
+            if header == "DISP:WIND:TRAC:Y:RLEV":
+                self.ref_level = float(arg)
+                return None
+            if header == "CALC:MARK1:MAX":
+                trace = self.current_trace()
+                self.marker_y = float(np.max(trace))
+                return None
+            if header == "CALC:MARK1:Y?":
+                return f"{self.marker_y:.3f}"
+            if header in ("FORM:DATA", "FORM"):
+                fmt = arg.upper().replace(" ", "")
+                self.data_format = "ASCII" if fmt.startswith("ASC") else fmt
+                return None
+            if header in ("FORM:DATA?", "FORM?"):
+                return self.data_format
+            if header == "FORM:BORD":
+                self.byte_order = "SWAP" if arg.upper().startswith("SWAP") else "NORM"
+                return None
+            if header == "FORM:BORD?":
+                return self.byte_order
+            if header in ("TRAC?", "TRAC:DATA?"):
+                trace = self.current_trace()
+                return ",".join(f"{v:.6e}" for v in trace)
+            if header == "*WAI":
+                # 依赖扫描结果的命令(迹线/标记/*OPC?)会自行等待扫描完成
+                return None
+            if header == "*OPC?":
+                self.wait_sweep()
+                return "1"
+            if header == "*ESE":
+                self.ese = int(float(arg))
+                return None
+            if header == "*OPC":
+                self.opc_pending = True
+                return None
+            if header == "*CLS":
+                self.opc_pending = False
+                return None
+            if header == "*ESR?":
+                self.resolve_trigger()
+                done = self.opc_pending and time.perf_counter() >= self.sweep_end
+                if done:
+                    self.opc_pending = False
+                return "1" if done else "0"
+            return super().handle(header, arg)
+
+    def binary_payload(self, header: str, arg: str) -> Optional[bytes]:
+        if header not in ("TRAC?", "TRAC:DATA?") or not self.data_format.startswith("REAL"):
+            return None
+        with self.lock:
+            trace = self.current_trace()
+            bits = 64 if self.data_format.endswith("64") else 32
+            order = "<" if self.byte_order == "SWAP" else ">"
+            return trace.astype(f"{order}f{bits // 8}").tobytes()
+
+
+class SimulatedResource:
+    """仿真VISA会话, 提供GPIBDevice用到的pyvisa MessageBasedResource接口"""
+
+    def __init__(self, address: str, instrument: SimulatedInstrument):
+        self.resource_name = address
+        self.instrument = instrument
+        self.timeout = 5000
+        self._output: List[str] = []
+
+    def _execute(self, message: str) -> Optional[str]:
+        """执行以分号分隔的命令序列, 返回最后一个查询的响应"""
+        self.instrument.sleep(self.instrument.command_latency)
+        response = None
+        for part in message.split(";"):
+            if not part.strip():
+                continue
+            header, arg = parse_scpi(part)
+            result = self.instrument.handle(header, arg)
+            if result is not None:
+                response = result
+        return response
+
+    def write(self, message: str):
+        response = self._execute(message)
+        if response is not None:
+            self._output.append(response)
+
+    def read(self) -> str:
+        if not self._output:
+            raise TimeoutError(f"仿真设备{self.resource_name}无可读数据")
+        response = self._output.pop(0) + "\n"
+        self.instrument.sleep(len(response) / self.instrument.bus_rate)
+        return response
+
+    def query(self, message: str) -> str:
+        self.write(message)
+        return self.read()
+
+    def query_ascii_values(self, message: str, converter='f', separator=',',
+                           container=list, delay=None):
+        text = self.query(message)
+        return container([float(v) for v in text.strip().split(separator) if v])
+
+    def query_binary_values(self, message: str, datatype='f', is_big_endian=False,
+                            container=list, delay=None, header_fmt='ieee',
+                            expect_termination=True, data_points=0, chunk_size=None):
+        header, arg = parse_scpi(message.split(";")[-1])
+        self.instrument.sleep(self.instrument.command_latency)
+        payload = self.instrument.binary_payload(header, arg)
+        if payload is None:
+            raise ValueError(f"仿真设备{self.resource_name}未处于二进制格式")
+        # IEEE 488.2定长块头 #<n><长度>
+        length = str(len(payload))
+        block = f"#{len(length)}{length}".encode() + payload
+        self.instrument.sleep(len(block) / self.instrument.bus_rate)
+        order = ">" if is_big_endian else "<"
+        values = np.frombuffer(block[2 + len(length):], dtype=f"{order}{datatype}")
+        return container(values)
+
+    def read_stb(self) -> int:
+        return self.instrument.read_stb()
+
+    def clear(self):
+        self._output.clear()
+
+    def close(self):
+        pass
+
+
+class SimulatedBench:
+    """仿真测试台: 地址到仿真仪器的映射, 分析仪谱线跟随激光器波长
+
+    time_scale只缩放仿真的仪器延时(调谐、扫描、停留时间), 不缩放主机侧读取迹线和处理数据的时间。
+    扫频模式下激光器按缩短后的停留时间自行步进, time_scale小于1时频谱仪重新准备触发前
+    激光器已越过后续的波长点, 触发会丢失(如0.01时11个点只采到1个, 并报告等待第2个触发超时)。
+    扫频模式请使用time_scale=1; 步进模式由程序逐点控制, 不受影响。
+    """
+
+    def __init__(self, time_scale: float = 1.0):
+        self.time_scale = time_scale  # 延时比例, 0表示不模拟延时
+        self.laser = SimulatedTSL(self)
+        self.instruments: Dict[str, SimulatedInstrument] = {
+            "GPIB0::1::INSTR": self.laser,
+            "GPIB0::2::INSTR": SimulatedAnalyzer(
+                self, "Keysight Technologies,N9010B,SIM00002,A.25.05", 40001, 26.5e9),
+            "GPIB0::3::INSTR": SimulatedAnalyzer(
+                self, "CEYEAR,4037,SIM00003,1.0.0", 10001, 7.5e9),
+        }
+
+
+class SimulatedResourceManager:
+    """仿真资源管理器, 接口与pyvisa.ResourceManager一致"""
+    _bench: Optional[SimulatedBench] = None
+
+    def __init__(self, time_scale: Optional[float] = None):
+        # 所有资源管理器共享同一测试台, 使仪器状态在重连之间保持
+        if SimulatedResourceManager._bench is None:
+            SimulatedResourceManager._bench = SimulatedBench()
+        self.bench = SimulatedResourceManager._bench
+        if time_scale is not None:
+            self.bench.time_scale = time_scale
+
+    def list_resources(self, query: str = "?*::INSTR") -> Tuple[str, ...]:
+        return tuple(self.bench.instruments.keys())
+
+    def open_resource(self, address: str, **kwargs) -> SimulatedResource:
+        if address not in self.bench.instruments:
+            raise ValueError(f"仿真测试台上没有设备: {address}")
+        return SimulatedResource(address, self.bench.instruments[address])
+
+    def close(self):
+        pass
@@ -1,7 +1,8 @@
 from devices.gpib_device import GPIBDevice
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple
 import math
 import time
+import numpy as np
 
 class BaseSpectrumAnalyzer(GPIBDevice):
     """基础频谱分析仪抽象类"""
@@ -23,21 +24,51 @@ class BaseSpectrumAnalyzer(GPIBDevice):
         # 设置较长的超时时间，频谱仪扫描可能需要时间
         self.timeout = 30000  # 30秒
         
+        # 迹线传输格式 - 命令由子类设置
+        self.format_cmd = ":FORM:DATA"
+        self.byte_order_cmd = ":FORM:BORD"
+        self.preferred_byte_order = "SWAP"  # SWAP: 小端, NORM: 大端
+        self.trace_cmd = ":TRAC? TRACE1"
+        self.trace_format = None  # 协商后的格式: "REAL,32"/"REAL,64"/"ASCII"
+        self.trace_big_endian = False
+        self.bus_rate = 1.0e6  # 迹线传输速率估计(字节/秒)
+        self.command_overhead = 0.02  # 单次触发-读取的命令开销估计(秒)
+        
+        # 设置类命令按顺序执行, 无需等待; 复位等重叠命令需等待完成
+        self.sync_policy = {"*RST": "opc"}
+        
+        # 已写入仪器的设置影子: 相同设置不再发送, 查询直接由缓存返回
+        self._state: Dict[str, Any] = {}
+        self.acquiring = False  # 扫描采集期间保持单次扫描模式
+        self.trace_timeout = 60000  # 读取迹线时的超时(ms)
+        self._saved_timeout = None
+        
     def connect(self, address: Optional[str] = None) -> bool:
         """连接设备并设置长超时"""
         result = super().connect(address)
         if result:
+            # 仪器可能在断开期间被面板修改过
+            self.invalidate_state()
             # 设置通信超时
             self.set_timeout(self.timeout)
             # 等待设备初始化
             time.sleep(0.5)
         return result
         
+    @classmethod
+    def matches_idn(cls, idn: str) -> bool:
+        """判断设备标识是否属于该型号 - 由子类实现"""
+        return False
+        
     @classmethod
     def find_analyzer(cls) -> Optional[str]:
-        """自动寻找频谱仪设备"""
-        # 具体实现由子类提供
-        pass
+        """自动寻找该型号的频谱仪设备"""
+        from devices.discovery import probe_all
+        idns = probe_all(list(cls.list_available_devices()))
+        for addr, idn in idns.items():
+            if idn and cls.matches_idn(idn):
+                return addr
+        return None
         
     def calculate_sweep_points(self, start_freq: float, stop_freq: float, rbw: float) -> Tuple[int, str]:
         """
@@ -75,6 +106,113 @@ class BaseSpectrumAnalyzer(GPIBDevice):
         message = f"已设置扫描点数为: {points}"
         return points, message
         
+    def invalidate_state(self, *keys: str):
+        """
+        使设置影子失效(复位或外部修改仪器后调用)
+        :param keys: 需要失效的设置项, 为空时全部失效
+        """
+        if keys:
+            for key in keys:
+                self._state.pop(key, None)
+        else:
+            self._state.clear()
+            
+    def _state_matches(self, key: str, value: Any) -> bool:
+        """设置是否与影子一致"""
+        return key in self._state and self._state[key] == value
+        
+    def _update_state(self, **values):
+        """记录已写入的设置, 影响扫描时间的设置会使缓存的扫描时间失效"""
+        self._state.update(values)
+        if any(k in values for k in ("freq_range", "rbw", "points")):
+            self._state.pop("sweep_time", None)
+            
+    def get_frequency_range(self) -> Tuple[float, float]:
+        """获取频率范围 (Hz), 优先由影子缓存返回"""
+        if "freq_range" not in self._state:
+            self._state["freq_range"] = self._query_frequency_range()
+        return self._state["freq_range"]
+        
+    def _query_frequency_range(self) -> Tuple[float, float]:
+        """从仪器查询频率范围 - 通用SCPI命令, 子类可按型号覆盖"""
+        return (float(self.query(":SENS:FREQ:STAR?")),
+                float(self.query(":SENS:FREQ:STOP?")))
+        
+    def begin_acquisition(self):
+        """开始连续采集: 进入单次扫描模式并保持到end_acquisition"""
+        self._saved_timeout = self.timeout
+        self.set_timeout(max(self.timeout, self.trace_timeout))
+        self.set_sweep_mode(False)
+        self.acquiring = True
+        
+    def end_acquisition(self):
+        """结束采集: 恢复连续扫描和原超时设置"""
+        self.acquiring = False
+        try:
+            self.set_sweep_mode(True)
+            if self._saved_timeout is not None:
+                self.set_timeout(self._saved_timeout)
+                self._saved_timeout = None
+        except Exception as e:
+            print(f"恢复频谱仪设置失败: {str(e)}")
+            
+    def negotiate_trace_format(self, preferred: str = "REAL,32") -> str:
+        """
+        协商迹线传输格式
+        :param preferred: 首选格式 "REAL,32" / "REAL,64" / "ASCII"
+        :return: 实际采用的格式, 二进制不可用时回退为ASCII
+        """
+        candidates = [preferred] + [f for f in ("REAL,32", "REAL,64") if f != preferred]
+        for fmt in candidates:
+            if fmt == "ASCII":
+                break
+            try:
+                self.write(f"{self.format_cmd} {fmt}")
+                response = self.query(f"{self.format_cmd}?").strip().upper()
+                bits = fmt.split(",")[1]
+                if not response.startswith("REAL") or bits not in response:
+                    print(f"设备不支持迹线格式 {fmt}: {response}")
+                    continue
+                
+                # 协商字节序并以设备回读为准
+                self.write(f"{self.byte_order_cmd} {self.preferred_byte_order}")
+                order = self.query(f"{self.byte_order_cmd}?").strip().upper()
+                self.trace_big_endian = not order.startswith("SWAP")
+                self.trace_format = fmt
+                print(f"迹线传输格式: {fmt}, 字节序: {'大端' if self.trace_big_endian else '小端'}")
+                return self.trace_format
+            except Exception as e:
+                print(f"协商迹线格式 {fmt} 失败: {str(e)}")
+                
+        self._fallback_to_ascii()
+        return self.trace_format
+        
+    def _fallback_to_ascii(self):
+        """回退到ASCII迹线传输"""
+        try:
+            self.write(f"{self.format_cmd} ASCii")
+        except Exception as e:
+            print(f"设置ASCII格式失败: {str(e)}")
+        self.trace_format = "ASCII"
+        print("迹线传输格式: ASCII")
+        
+    def read_trace(self) -> np.ndarray:
+        """按协商格式读取迹线, 二进制读取失败时回退为ASCII重试一次"""
+        if self.trace_format is None:
+            self.negotiate_trace_format()
+            
+        if self.trace_format != "ASCII":
+            datatype = 'd' if self.trace_format.endswith("64") else 'f'
+            try:
+                return self.query_binary_values(self.trace_cmd, datatype=datatype,
+                                                is_big_endian=self.trace_big_endian)
+            except Exception as e:
+                print(f"二进制迹线读取失败, 回退ASCII: {str(e)}")
+                self.clear()
+                self._fallback_to_ascii()
+                
+        return self.query_ascii_values(self.trace_cmd)
+        
     def set_sweep_points(self, points: int):
         """设置扫描点数 - 由子类实现具体命令"""
         pass
@@ -99,10 +237,51 @@ class BaseSpectrumAnalyzer(GPIBDevice):
         """获取峰值功率 - 由子类实现具体命令"""
         pass
         
-    def get_spectrum_data(self) -> List[float]:
+    def get_spectrum_data(self) -> np.ndarray:
         """获取频谱数据 - 由子类实现具体命令"""
         pass
         
+    def trigger_sweep(self):
+        """
+        启动单次扫描并等待完成 - 由子类实现具体命令
+        :raises TimeoutError: 扫描未在同步超时内完成, 此时不应读取迹线
+        """
+        pass
+        
+    def arm_sweep(self):
+        """启动单次扫描但不等待(外部触发时扫描在触发到来后开始) - 由子类实现具体命令"""
+        pass
+        
+    def wait_sweep(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待arm_sweep启动的扫描完成
+        :param timeout: 超时(秒), None表示使用sync_timeout
+        """
+        return self.poll_stb(timeout=timeout)
+        
+    def estimate_fetch_time(self, points: Optional[int] = None) -> float:
+        """估算读取一条迹线的总线时间(秒), 用于确定外部触发间隔"""
+        points = points or self.get_sweep_points() or self.current_points
+        bytes_per_point = {"REAL,32": 4, "REAL,64": 8}.get(self.trace_format, 15)
+        return points * bytes_per_point / self.bus_rate + self.command_overhead
+        
+    def fetch_trace(self) -> np.ndarray:
+        """
+        读取已完成扫描的迹线(不触发新扫描)
+        与trigger_sweep分开调用时, 迹线传输可与激光器调谐并行进行
+        """
+        # 增加超时时间，确保大迹线能传输完成
+        old_timeout = self.timeout
+        self.set_timeout(max(old_timeout, self.trace_timeout))
+        
+        data = self.read_trace()
+        
+        # 采集期间保持单次模式, 由end_acquisition统一恢复
+        if not self.acquiring:
+            self.set_timeout(old_timeout)
+            self.set_sweep_mode(True)  # 恢复连续扫描
+        return data
+        
     def set_sweep_mode(self, continuous: bool = True):
         """设置扫描模式 - 由子类实现具体命令"""
         pass
@@ -112,7 +291,7 @@ class BaseSpectrumAnalyzer(GPIBDevice):
         pass
         
     def auto_tune(self):
-        """自动调谐 - 由子类实现具体命令"""
+        """自动调谐 - 由子类实现具体命令, 调谐会修改仪器设置, 完成后需调用invalidate_state"""
         pass
         
     def auto_scale(self):
@@ -137,31 +316,41 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
         super().__init__(address)
         self.model = "N9010B"
         self.max_points = 40001  # N9010B最大支持40001点
+        # Keysight X系列: SWAP为小端字节序, 与PC一致
+        self.format_cmd = ":FORM:DATA"
+        self.byte_order_cmd = ":FORM:BORD"
+        self.preferred_byte_order = "SWAP"
+        self.trace_cmd = ":TRAC? TRACE1"
+        # 单次扫描通过状态字节轮询等待, 扫描期间不占用总线
+        self.sync_policy = {
+            "*RST": "opc",
+            ":INIT:IMM": "stb",
+            ":SENS:FREQ:TUNE:IMM": "opc",
+        }
         
     @classmethod
-    def find_analyzer(cls) -> Optional[str]:
-        """自动寻找N9010B频谱仪设备"""
-        devices = cls.list_available_devices()
-        for addr in devices:
-            dev = cls(addr)
-            if dev.connect():
-                idn = dev.identify_device()
-                dev.disconnect()
-                if idn and "N9010B" in idn:
-                    return addr
-        return None
+    def matches_idn(cls, idn: str) -> bool:
+        """判断设备标识是否为N9010B"""
+        return "N9010B" in idn
         
     def set_sweep_points(self, points: int):
         """设置扫描点数"""
         if not (self.min_points <= points <= self.max_points):
             raise ValueError(f"扫描点数必须在{self.min_points}-{self.max_points}之间")
+        if self._state_matches("points", points):
+            return
         self.write(":SWE:POIN {}".format(points))
         self.current_points = points
+        self._update_state(points=points)
         
     def get_sweep_points(self) -> int:
         """获取当前扫描点数"""
+        if "points" in self._state:
+            return self._state["points"]
         try:
-            return int(self.query(":SWE:POIN?"))
+            points = int(self.query(":SWE:POIN?"))
+            self._update_state(points=points)
+            return points
         except:
             return self.current_points
         
@@ -174,69 +363,71 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
         if stop <= start:
             raise ValueError("终止频率必须大于起始频率")
             
+        if self._state_matches("freq_range", (start, stop)):
+            return
+            
         center = (start + stop) / 2
         span = stop - start
         
         self.write(":SENS:FREQ:CENT {:.1f}".format(center))
-        time.sleep(0.1)
         self.write(":SENS:FREQ:SPAN {:.1f}".format(span))
-        time.sleep(0.1)
+        self._update_state(freq_range=(start, stop))
         
     def set_rbw(self, rbw: float):
         """设置分辨率带宽 (Hz)"""
         if not (self.min_rbw <= rbw <= self.max_rbw):
             raise ValueError(f"分辨率带宽必须在{self.min_rbw/1e3:.3f}kHz - {self.max_rbw/1e3:.0f}kHz之间")
             
+        if self._state_matches("rbw", rbw):
+            return
         self.write(":SENS:BAND:RES {:.1f}".format(rbw))
-        time.sleep(0.1)
         self.write(":SENS:BAND:VID:AUTO ON")  # 自动设置视频带宽
-        time.sleep(0.1)
+        self._update_state(rbw=rbw)
         
     def set_reference_level(self, level: float):
         """设置参考电平 (dBm)"""
         if not (-170 <= level <= 30):
             raise ValueError("参考电平必须在-170dBm到30dBm之间")
+        if self._state_matches("ref_level", level):
+            return
         self.write(":DISP:WIND:TRAC:Y:RLEV {:.1f}".format(level))
-        time.sleep(0.1)
+        self._update_state(ref_level=level)
         
     def get_peak_power(self) -> float:
         """获取峰值功率"""
         try:
             self.write(":CALC:MARK1:MAX")  # 将标记移动到峰值
-            time.sleep(0.1)
             return float(self.query(":CALC:MARK1:Y?"))
         except Exception as e:
             print(f"获取峰值功率失败: {str(e)}")
             return -100  # 返回一个默认的低功率值
         
-    def get_spectrum_data(self) -> List[float]:
+    def get_spectrum_data(self) -> np.ndarray:
         """获取频谱数据"""
         try:
-            self.write(":INIT:CONT OFF")  # 关闭连续扫描
-            time.sleep(0.1)
-            self.write(":INIT:IMM;*WAI")  # 开始单次扫描并等待完成
-            # 增加超时时间，确保大扫描能完成
-            old_timeout = self.timeout
-            self.set_timeout(60000)  # 设置为60秒
-            
-            data_str = self.query(":TRAC? TRACE1")
-            # 恢复原超时
-            self.set_timeout(old_timeout)
-            
-            data = data_str.split(',')
-            self.write(":INIT:CONT ON")  # 恢复连续扫描
-            time.sleep(0.1)
-            
-            # 转换数据
-            return [float(x) for x in data]
+            self.trigger_sweep()
+            return self.fetch_trace()
         except Exception as e:
             print(f"获取频谱数据失败: {str(e)}")
-            return []  # 返回空列表
+            return np.empty(0)  # 返回空数组
+            
+    def trigger_sweep(self):
+        """启动单次扫描并等待完成"""
+        self.set_sweep_mode(False)  # 关闭连续扫描(已关闭时不再发送)
+        self.write(":INIT:IMM;*WAI")  # 开始单次扫描并等待完成
+        
+    def arm_sweep(self):
+        """启动单次扫描但不等待完成"""
+        self.set_sweep_mode(False)
+        self.write(":INIT:IMM", sync=False)
+        self.arm_stb()
         
     def set_sweep_mode(self, continuous: bool = True):
         """设置扫描模式"""
+        if self._state_matches("continuous", continuous):
+            return
         self.write(":INIT:CONT {}".format("ON" if continuous else "OFF"))
-        time.sleep(0.1)
+        self._update_state(continuous=continuous)
         
     def set_trigger_source(self, source: str = "IMM"):
         """设置触发源
@@ -246,16 +437,20 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
         """
         if source.upper() not in ["IMM", "EXT", "VID"]:
             raise ValueError("无效的触发源")
+        if self._state_matches("trigger", source.upper()):
+            return
         self.write(":TRIG:SOUR {}".format(source))
-        time.sleep(0.1)
+        self._update_state(trigger=source.upper())
         
     def auto_tune(self):
         """自动调谐"""
         try:
             self.write(":SENS:FREQ:TUNE:IMM")
-            time.sleep(2.0)  # 自动调谐需要较长时间
         except Exception as e:
             print(f"自动调谐失败: {str(e)}")
+        finally:
+            # 自动调谐会改变中心频率、带宽和参考电平, 失败时也可能已部分执行
+            self.invalidate_state()
         
     def auto_scale(self):
         """
@@ -264,7 +459,6 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
         try:
             # 获取当前最大功率
             self.write(":CALC:MARK1:MAX")
-            time.sleep(0.1)
             peak_power = float(self.query(":CALC:MARK1:Y?"))
             
             # 设置参考电平为峰值功率+10dB
@@ -275,9 +469,10 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
                 ref_level = 30
                 
             self.write(f":DISP:WIND:TRAC:Y:RLEV {ref_level:.1f}")
-            time.sleep(0.1)
+            self._update_state(ref_level=ref_level)
         except Exception as e:
             print(f"自动调整幅度刻度失败: {str(e)}")
+            self.invalidate_state("ref_level")
             # 异常时设置一个默认参考电平
             try:
                 self.write(":DISP:WIND:TRAC:Y:RLEV 0")
@@ -293,8 +488,12 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
         
     def get_sweep_time(self) -> float:
         """获取当前扫描时间(秒)"""
+        if "sweep_time" in self._state:
+            return self._state["sweep_time"]
         try:
-            return float(self.query(":SENS:SWE:TIME?"))
+            sweep_time = float(self.query(":SENS:SWE:TIME?"))
+            self._update_state(sweep_time=sweep_time)
+            return sweep_time
         except Exception as e:
             print(f"获取扫描时间失败: {str(e)}")
             return 1.0  # 默认返回1秒
@@ -303,9 +502,12 @@ class N9010BAnalyzer(BaseSpectrumAnalyzer):
         """重置设备到默认状态"""
         try:
             self.write("*RST")
-            time.sleep(1.0)  # 复位后等待
         except Exception as e:
             print(f"重置设备失败: {str(e)}")
+        finally:
+            # 复位后仪器回到默认设置
+            self.invalidate_state()
+            self.trace_format = None
 
 class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
     """中科思仪4037频谱分析仪"""
@@ -314,34 +516,41 @@ class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
         self.model = "CEYEAR4037"
         self.max_freq = 7.5e9  # 4037频率上限为7.5GHz
         self.max_points = 10001  # 最大支持10001点
+        # 中科思仪默认NORMal(大端)字节序, 以回读结果为准
+        self.format_cmd = ":FORMat:DATA"
+        self.byte_order_cmd = ":FORMat:BORDer"
+        self.preferred_byte_order = "NORMal"
+        self.trace_cmd = ":TRACe:DATA? TRACE1"
+        self.sync_policy = {
+            "*RST": "opc",
+            ":INITIATE:IMMEDIATE": "stb",
+        }
         
     @classmethod
-    def find_analyzer(cls) -> Optional[str]:
-        """自动寻找中科思仪4037频谱仪设备"""
-        devices = cls.list_available_devices()
-        for addr in devices:
-            dev = cls(addr)
-            if dev.connect():
-                idn = dev.identify_device()
-                dev.disconnect()
-                # 中科思仪设备标识包含"4037"
-                if idn and "4037" in idn:
-                    return addr
-        return None
+    def matches_idn(cls, idn: str) -> bool:
+        """判断设备标识是否为中科思仪4037"""
+        # 中科思仪设备标识包含"4037"
+        return "4037" in idn
         
     def set_sweep_points(self, points: int):
         """设置扫描点数"""
         if not (self.min_points <= points <= self.max_points):
             raise ValueError(f"扫描点数必须在{self.min_points}-{self.max_points}之间")
+        if self._state_matches("points", points):
+            return
         # 中科思仪使用不同的SCPI命令
         self.write(":SENSe:SWEep:POINts {}".format(points))
-        time.sleep(0.1)
         self.current_points = points
+        self._update_state(points=points)
         
     def get_sweep_points(self) -> int:
         """获取当前扫描点数"""
+        if "points" in self._state:
+            return self._state["points"]
         try:
-            return int(self.query(":SENSe:SWEep:POINts?"))
+            points = int(self.query(":SENSe:SWEep:POINts?"))
+            self._update_state(points=points)
+            return points
         except:
             return self.current_points
         
@@ -354,84 +563,93 @@ class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
         if stop <= start:
             raise ValueError("终止频率必须大于起始频率")
             
+        if self._state_matches("freq_range", (start, stop)):
+            return
+            
         # 中科思仪使用起始/终止频率命令
         self.write(":SENSe:FREQuency:STARt {:.1f}".format(start))
-        time.sleep(0.1)
         self.write(":SENSe:FREQuency:STOP {:.1f}".format(stop))
-        time.sleep(0.1)
+        self._update_state(freq_range=(start, stop))
+        
+    def _query_frequency_range(self) -> Tuple[float, float]:
+        """从仪器查询频率范围"""
+        return (float(self.query(":SENSe:FREQuency:STARt?")),
+                float(self.query(":SENSe:FREQuency:STOP?")))
         
     def set_rbw(self, rbw: float):
         """设置分辨率带宽 (Hz)"""
         if not (self.min_rbw <= rbw <= self.max_rbw):
             raise ValueError(f"分辨率带宽必须在{self.min_rbw/1e3:.3f}kHz - {self.max_rbw/1e3:.0f}kHz之间")
             
+        if self._state_matches("rbw", rbw):
+            return
         self.write(":SENSe:BANDwidth:RESolution {:.1f}".format(rbw))
-        time.sleep(0.1)
         self.write(":SENSe:BANDwidth:VIDeo:AUTO ON")
-        time.sleep(0.1)
+        self._update_state(rbw=rbw)
         
     def set_reference_level(self, level: float):
         """设置参考电平 (dBm)"""
         if not (-170 <= level <= 30):
             raise ValueError("参考电平必须在-170dBm到30dBm之间")
+        if self._state_matches("ref_level", level):
+            return
         self.write(":DISPlay:WINDow:TRACe:Y:RLEVel {:.1f}".format(level))
-        time.sleep(0.1)
+        self._update_state(ref_level=level)
         
     def get_peak_power(self) -> float:
         """获取峰值功率"""
         try:
             self.write(":CALCulate:MARKer1:MAXimum")
-            time.sleep(0.1)
             return float(self.query(":CALCulate:MARKer1:Y?"))
         except Exception as e:
             print(f"获取峰值功率失败: {str(e)}")
             return -100  # 返回一个默认的低功率值
         
-    def get_spectrum_data(self) -> List[float]:
+    def get_spectrum_data(self) -> np.ndarray:
         """获取频谱数据"""
         try:
-            self.write(":INITiate:CONTinuous OFF")
-            time.sleep(0.1)
-            self.write(":INITiate:IMMediate;*WAI")
-            
-            # 增加超时时间，确保大扫描能完成
-            old_timeout = self.timeout
-            self.set_timeout(60000)  # 设置为60秒
-            
-            data_str = self.query(":TRACe:DATA? TRACE1")
-            
-            # 恢复原超时
-            self.set_timeout(old_timeout)
-            
-            data = data_str.split(',')
-            self.write(":INITiate:CONTinuous ON")
-            time.sleep(0.1)
-            
-            return [float(x) for x in data]
+            self.trigger_sweep()
+            return self.fetch_trace()
         except Exception as e:
             print(f"获取频谱数据失败: {str(e)}")
-            return []  # 返回空列表
+            return np.empty(0)  # 返回空数组
+            
+    def trigger_sweep(self):
+        """启动单次扫描并等待完成"""
+        self.set_sweep_mode(False)  # 已关闭时不再发送
+        self.write(":INITiate:IMMediate;*WAI")
+        
+    def arm_sweep(self):
+        """启动单次扫描但不等待完成"""
+        self.set_sweep_mode(False)
+        self.write(":INITiate:IMMediate", sync=False)
+        self.arm_stb()
         
     def set_sweep_mode(self, continuous: bool = True):
         """设置扫描模式"""
+        if self._state_matches("continuous", continuous):
+            return
         self.write(":INITiate:CONTinuous {}".format("ON" if continuous else "OFF"))
-        time.sleep(0.1)
+        self._update_state(continuous=continuous)
         
     def set_trigger_source(self, source: str = "IMM"):
         """设置触发源"""
         if source.upper() not in ["IMM", "EXT", "VID"]:
             raise ValueError("无效的触发源")
+        if self._state_matches("trigger", source.upper()):
+            return
         self.write(":TRIGger:SOURce {}".format(source))
-        time.sleep(0.1)
+        self._update_state(trigger=source.upper())
         
     def auto_tune(self):
         """自动调谐"""
         try:
             # 中科思仪可能使用不同命令，这里使用通用方法
             self.write(":SENSe:FREQuency:CENTer:STEP:AUTO ON")
-            time.sleep(2.0)  # 自动调谐需要较长时间
         except Exception as e:
             print(f"自动调谐失败: {str(e)}")
+        finally:
+            self.invalidate_state()
         
     def auto_scale(self):
         """
@@ -440,7 +658,6 @@ class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
         try:
             # 获取当前最大功率
             self.write(":CALCulate:MARKer1:MAXimum")
-            time.sleep(0.1)
             peak_power = float(self.query(":CALCulate:MARKer1:Y?"))
             
             # 设置参考电平为峰值功率+10dB
@@ -451,9 +668,10 @@ class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
                 ref_level = 30
                 
             self.write(f":DISPlay:WINDow:TRACe:Y:RLEVel {ref_level:.1f}")
-            time.sleep(0.1)
+            self._update_state(ref_level=ref_level)
         except Exception as e:
             print(f"自动调整幅度刻度失败: {str(e)}")
+            self.invalidate_state("ref_level")
             # 异常时设置一个默认参考电平
             try:
                 self.write(":DISPlay:WINDow:TRACe:Y:RLEVel 0")
@@ -469,8 +687,12 @@ class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
         
     def get_sweep_time(self) -> float:
         """获取当前扫描时间(秒)"""
+        if "sweep_time" in self._state:
+            return self._state["sweep_time"]
         try:
-            return float(self.query(":SENSe:SWEep:TIME?"))
+            sweep_time = float(self.query(":SENSe:SWEep:TIME?"))
+            self._update_state(sweep_time=sweep_time)
+            return sweep_time
         except Exception as e:
             print(f"获取扫描时间失败: {str(e)}")
             return 1.0  # 默认返回1秒
@@ -479,9 +701,12 @@ class CEYEAR4037Analyzer(BaseSpectrumAnalyzer):
         """重置设备到默认状态"""
         try:
             self.write("*RST")
-            time.sleep(1.0)  # 复位后等待
         except Exception as e:
             print(f"重置设备失败: {str(e)}")
+        finally:
+            # 复位后仪器回到默认设置
+            self.invalidate_state()
+            self.trace_format = None
 
 def create_analyzer(model: str, address: Optional[str] = None) -> BaseSpectrumAnalyzer:
     """创建适合的频谱仪对象"""
@@ -493,17 +718,11 @@ def create_analyzer(model: str, address: Optional[str] = None) -> BaseSpectrumAn
         raise ValueError(f"不支持的频谱仪型号: {model}")
 
 def find_any_analyzer() -> Tuple[Optional[str], Optional[str]]:
-    """寻找任何可用的频谱仪
+    """寻找任何可用的频谱仪(单次并发探测, N9010B优先)
     返回: (型号, 地址) 或 (None, None)
     """
-    # 先尝试找N9010B
-    addr = N9010BAnalyzer.find_analyzer()
-    if addr:
-        return "N9010B", addr
-    
-    # 再尝试找中科思仪4037
-    addr = CEYEAR4037Analyzer.find_analyzer()
-    if addr:
-        return "CEYEAR4037", addr
-    
+    from devices.discovery import discover_instruments
+    found = discover_instruments().get("Analyzer")
+    if found:
+        return found[0], found[1]
     return None, None
\ No newline at end of file
@@ -0,0 +1,125 @@
+from PyQt5.QtWidgets import (QGroupBox, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QComboBox, QDoubleSpinBox, QLineEdit, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtGui import QDesktopServices
+import os
+from typing import Any, Dict, List
+
+# 结果表格的列: 表头, 字段, 格式化函数
+RESULT_COLUMNS = [
+    ("时间", "created", lambda v: v.replace("T", " ")),
+    ("型号", "analyzer_model", str),
+    ("波长范围(nm)", None, None),
+    ("步长(nm)", "wavelength_step", lambda v: f"{v:g}"),
+    ("波长点", "wavelength_points", str),
+    ("跨度(kHz)", "span", lambda v: f"{v / 1e3:g}"),
+    ("RBW(kHz)", "rbw", lambda v: f"{v / 1e3:g}"),
+    ("采样点", "sweep_points", str),
+    ("功率(dBm)", "laser_power", lambda v: f"{v:g}"),
+    ("峰值(dBm)", "peak_power", lambda v: f"{v:.2f}"),
+    ("耗时(s)", "duration", lambda v: f"{v:.1f}"),
+    ("大小(MB)", "file_size", lambda v: f"{v / 1048576:.1f}"),
+    ("格式", "file_format", str),
+    ("文件", "file_path", os.path.basename),
+]
+
+
+class CatalogPanel(QGroupBox):
+    """已保存扫描的查询面板: 按型号、波长范围、RBW、格式和文件名查询扫描目录"""
+
+    def __init__(self, parent=None):
+        super().__init__("扫描记录查询", parent)
+        layout = QVBoxLayout()
+
+        filter_layout = QHBoxLayout()
+        self.model_filter = QComboBox()
+        self.model_filter.addItem("全部型号", None)
+        self.model_filter.addItem("N9010B", "N9010B")
+        self.model_filter.addItem("CEYEAR4037", "CEYEAR4037")
+        filter_layout.addWidget(self.model_filter)
+
+        # 波长范围和RBW为0时不限制
+        self.wl_from = QDoubleSpinBox()
+        self.wl_to = QDoubleSpinBox()
+        for spin in (self.wl_from, self.wl_to):
+            spin.setRange(0, 2000)
+            spin.setDecimals(3)
+            spin.setSpecialValueText("不限")
+        filter_layout.addWidget(QLabel("波长(nm):"))
+        filter_layout.addWidget(self.wl_from)
+        filter_layout.addWidget(QLabel("-"))
+        filter_layout.addWidget(self.wl_to)
+
+        self.rbw_filter = QDoubleSpinBox()
+        self.rbw_filter.setRange(0, 10000)
+        self.rbw_filter.setDecimals(3)
+        self.rbw_filter.setSpecialValueText("不限")
+        filter_layout.addWidget(QLabel("RBW(kHz):"))
+        filter_layout.addWidget(self.rbw_filter)
+
+        self.format_filter = QComboBox()
+        self.format_filter.addItem("全部格式", None)
+        for ext in ("csv", "xlsx", "txt", "h5"):
+            self.format_filter.addItem(ext.upper(), ext)
+        filter_layout.addWidget(self.format_filter)
+
+        self.text_filter = QLineEdit()
+        self.text_filter.setPlaceholderText("文件名包含")
+        filter_layout.addWidget(self.text_filter)
+
+        self.search_btn = QPushButton("查询")
+        filter_layout.addWidget(self.search_btn)
+        layout.addLayout(filter_layout)
+
+        self.result_table = QTableWidget(0, len(RESULT_COLUMNS))
+        self.result_table.setHorizontalHeaderLabels([title for title, _, _ in RESULT_COLUMNS])
+        self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.result_table.horizontalHeader().setStretchLastSection(True)
+        self.result_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.result_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # 双击打开文件所在目录
+        self.result_table.cellDoubleClicked.connect(self.open_file_location)
+        layout.addWidget(self.result_table)
+
+        self.result_label = QLabel("")
+        layout.addWidget(self.result_label)
+        self.setLayout(layout)
+
+    def filters(self) -> Dict[str, Any]:
+        """当前的查询条件(ScanCatalog.query的参数)"""
+        filters = {"model": self.model_filter.currentData(),
+                   "file_format": self.format_filter.currentData(),
+                   "text": self.text_filter.text().strip() or None}
+        if self.wl_from.value() > 0 or self.wl_to.value() > 0:
+            low = self.wl_from.value()
+            high = self.wl_to.value() if self.wl_to.value() > 0 else self.wl_to.maximum()
+            filters["wavelength_range"] = (low, high)
+        if self.rbw_filter.value() > 0:
+            filters["rbw"] = self.rbw_filter.value() * 1e3  # kHz转Hz
+        return filters
+
+    def show_results(self, entries: List[Dict[str, Any]]):
+        """显示查询结果"""
+        self.result_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            for column, (_, field, fmt) in enumerate(RESULT_COLUMNS):
+                if field is None:
+                    start, stop = entry.get("start_wavelength"), entry.get("stop_wavelength")
+                    text = f"{start:g} - {stop:g}" if start is not None and stop is not None else ""
+                else:
+                    value = entry.get(field)
+                    text = "" if value is None else fmt(value)
+                item = QTableWidgetItem(text)
+                if field == "file_path":
+                    item.setToolTip(entry["file_path"])
+                    item.setData(Qt.UserRole, entry["file_path"])
+                self.result_table.setItem(row, column, item)
+        self.result_label.setText(f"共{len(entries)}条记录")
+
+    def open_file_location(self, row: int, column: int):
+        """打开结果文件所在的目录"""
+        item = self.result_table.item(row, len(RESULT_COLUMNS) - 1)
+        path = item.data(Qt.UserRole) if item is not None else None
+        if path:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(path)))
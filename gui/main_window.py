@@ -2,16 +2,21 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QGroupBox, QPushButton, QLabel, QLineEdit,
                              QDoubleSpinBox, QComboBox, QTabWidget, QStatusBar,
                              QFileDialog, QProgressBar, QCheckBox, QSizePolicy,
-                             QSplitter, QScrollArea)
+                             QSplitter, QScrollArea, QSpinBox)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QResizeEvent
 import pyqtgraph as pg
+from gui.catalog_panel import CatalogPanel
+from gui.plot_scheduler import PlotScheduler
 from pyqtgraph import exporters  # 添加导入exporters模块
 import numpy as np
 import os
 import time
 from datetime import datetime
 
+# 坐标轴范围变化小于跨度的该比例时不重新设置(功率轴)
+PLOT_RANGE_TOLERANCE = 0.05
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -240,6 +245,48 @@ class MainWindow(QMainWindow):
         auto_save_layout.addWidget(self.auto_save)
         save_layout.addLayout(auto_save_layout)
         
+        self.data_precision = QComboBox()
+        self.data_precision.addItem("float64(双精度)", "float64")
+        self.data_precision.addItem("float32(单精度)", "float32")
+        self.data_precision.addItem("int16(0.01dB量化)", "int16")
+        self.data_precision.setToolTip("扫描数据的存储精度, 同时用于内存占用估计和所有保存格式")
+        precision_layout = QHBoxLayout()
+        precision_layout.addWidget(QLabel("存储精度:"))
+        precision_layout.addWidget(self.data_precision)
+        save_layout.addLayout(precision_layout)
+        
+        self.writer_policy = QComboBox()
+        self.writer_policy.addItem("等待写入", "block")
+        self.writer_policy.addItem("暂存到本地文件", "spill")
+        self.writer_policy.setToolTip("数据由单独的线程写入存储; 写入队列已满(磁盘或网络较慢)时, "
+                                      "等待写入会暂停采集, 暂存到本地文件则继续采集")
+        writer_layout = QHBoxLayout()
+        writer_layout.addWidget(QLabel("写入队列满时:"))
+        writer_layout.addWidget(self.writer_policy)
+        save_layout.addLayout(writer_layout)
+        
+        self.h5_stream = QCheckBox("扫描时实时写入HDF5")
+        self.h5_stream.setToolTip("扫描开始时创建HDF5文件并逐列写入, 扫描中断后已采集的数据仍可读取")
+        self.h5_compression = QComboBox()
+        self.h5_compression.addItem("gzip压缩", "gzip")
+        self.h5_compression.addItem("lzf压缩(更快)", "lzf")
+        self.h5_compression.addItem("不压缩", None)
+        h5_layout = QHBoxLayout()
+        h5_layout.addWidget(self.h5_stream)
+        h5_layout.addWidget(self.h5_compression)
+        save_layout.addLayout(h5_layout)
+        
+        # 后台保存进度
+        self.export_progress = QProgressBar()
+        self.export_progress.setFormat("保存 %p%")
+        self.cancel_export_btn = QPushButton("取消保存")
+        export_layout = QHBoxLayout()
+        export_layout.addWidget(self.export_progress)
+        export_layout.addWidget(self.cancel_export_btn)
+        self.export_progress.hide()
+        self.cancel_export_btn.hide()
+        save_layout.addLayout(export_layout)
+        
         save_group.setLayout(save_layout)
         control_layout.addWidget(save_group)
         
@@ -255,8 +302,47 @@ class MainWindow(QMainWindow):
         self.save_btn = QPushButton("保存数据")
         self.save_btn.setEnabled(False)
         self.save_btn.setEnabled(False)
-        
+        self.pipeline_mode = QCheckBox("流水线采集")
+        self.pipeline_mode.setChecked(True)
+        self.pipeline_mode.setToolTip("读取迹线的同时步进激光器到下一波长")
+        
+        self.swept_mode = QCheckBox("扫频模式(硬件触发)")
+        self.swept_mode.setToolTip("激光器内部步进扫描并输出触发, 频谱仪外部触发采集")
+        
+        self.checkpoint_mode = QCheckBox("断点续扫")
+        self.checkpoint_mode.setToolTip("数据写入磁盘并定期保存检查点, 扫描中止后可从下一个波长点继续")
+        self.resume_checkpoint_btn = QPushButton("继续上次扫描")
+        self.resume_checkpoint_btn.setEnabled(False)
+        
+        # 每个波长点迹线的缩减(存储和显示前)
+        self.reduction_mode = QComboBox()
+        self.reduction_mode.addItem("不缩减", "none")
+        self.reduction_mode.addItem("峰值保持", "peak")
+        self.reduction_mode.addItem("最小/最大值", "minmax")
+        self.reduction_mode.addItem("功率平均", "mean")
+        self.reduction_mode.addItem("抽取", "decimate")
+        self.reduction_width = QSpinBox()
+        self.reduction_width.setRange(2, 1000000)
+        self.reduction_width.setValue(1001)
+        self.reduction_width.setToolTip("缩减后每个波长点的点数")
+        self.keep_full_every = QSpinBox()
+        self.keep_full_every.setRange(0, 100000)
+        self.keep_full_every.setToolTip("每隔多少个波长点保留一次完整分辨率迹线, 0为不保留")
+        reduction_layout = QHBoxLayout()
+        reduction_layout.addWidget(QLabel("数据缩减:"))
+        reduction_layout.addWidget(self.reduction_mode)
+        reduction_layout.addWidget(self.reduction_width)
+        keep_full_layout = QHBoxLayout()
+        keep_full_layout.addWidget(QLabel("完整迹线间隔:"))
+        keep_full_layout.addWidget(self.keep_full_every)
+        
+        buttons_layout.addWidget(self.pipeline_mode)
+        buttons_layout.addWidget(self.swept_mode)
+        buttons_layout.addLayout(reduction_layout)
+        buttons_layout.addLayout(keep_full_layout)
+        buttons_layout.addWidget(self.checkpoint_mode)
         buttons_layout.addWidget(self.start_btn)
+        buttons_layout.addWidget(self.resume_checkpoint_btn)
         buttons_layout.addWidget(self.stop_btn)
         buttons_layout.addWidget(self.pause_btn) # 添加暂停按钮到这一栏
         buttons_layout.addWidget(self.save_btn)
@@ -296,6 +382,11 @@ class MainWindow(QMainWindow):
         # 使用蓝色线条绘制频谱
         self.plot_curve = self.plot_widget.plot(pen=pg.mkPen('b', width=2))
         
+        # 限速刷新: 只绘制最新的一帧, 当前坐标轴范围用于判断是否需要重新设置
+        self.plot_scheduler = PlotScheduler(self.render_plot, 20, self)
+        self._plot_x_range = None
+        self._plot_y_range = None
+        
         # 频率信息标签
         self.freq_label = QLabel("频率范围: 0 - 0 Hz")
         self.freq_label.setAlignment(Qt.AlignCenter)
@@ -326,13 +417,30 @@ class MainWindow(QMainWindow):
         status_layout.addWidget(self.wavelength_label)
         status_layout.addWidget(self.scan_time_label)
         
+        self.plot_rate_label = QLabel("刷新: -- fps")
+        self.plot_rate_label.setAlignment(Qt.AlignCenter)
+        status_layout.addWidget(self.plot_rate_label)
+        
         # 创建按钮布局
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.save_image_btn)
         
+        self.max_plot_fps = QSpinBox()
+        self.max_plot_fps.setRange(1, 60)
+        self.max_plot_fps.setValue(20)
+        self.max_plot_fps.setSuffix(" fps")
+        self.max_plot_fps.setToolTip("频谱图的最大刷新率, 数据更快时只显示最新的频谱")
+        self.max_plot_fps.valueChanged.connect(lambda fps: setattr(self.plot_scheduler, 'max_fps', fps))
+        btn_layout.addWidget(QLabel("最大刷新率:"))
+        btn_layout.addWidget(self.max_plot_fps)
+        
         display_layout.addLayout(status_layout)
         display_layout.addLayout(btn_layout)
         
+        # 已保存扫描的查询
+        self.catalog_panel = CatalogPanel()
+        display_layout.addWidget(self.catalog_panel, stretch=1)
+        
         main_splitter.addWidget(display_scroll)
         
         # 设置默认拆分比例 (1:3)
@@ -439,18 +547,43 @@ class MainWindow(QMainWindow):
         
         return os.path.join(save_dir, f"{prefix}_{timestamp}{ext}")
         
+    def get_stream_filename(self) -> str:
+        """生成扫描期间实时写入的HDF5文件名"""
+        return os.path.splitext(self.get_save_filename())[0] + "_stream.h5"
+        
     def update_plot(self, frequencies, powers):
-        """更新图表 - 增强版本"""
+        """接收新的频谱数据, 按最大刷新率绘制最新的一帧"""
         self.frequencies = frequencies
         self.powers = powers
+        self.plot_scheduler.submit(frequencies, powers)
         
+    def reset_plot(self):
+        """清除图表和未绘制的帧(开始新的扫描时调用)"""
+        self.plot_scheduler.reset()
+        self.frequencies = []
+        self.powers = []
+        self.plot_curve.setData([], [])
+        self._plot_x_range = None
+        self._plot_y_range = None
+        self.plot_rate_label.setText("刷新: -- fps")
+        
+    @staticmethod
+    def _range_moved(old, new, tolerance: float) -> bool:
+        """坐标轴范围的变化是否超过跨度的tolerance比例"""
+        if old is None:
+            return True
+        span = max(new[1] - new[0], 1e-12)
+        return abs(new[0] - old[0]) > tolerance * span or abs(new[1] - old[1]) > tolerance * span
+        
+    def render_plot(self, frequencies, powers):
+        """绘制一帧频谱, 坐标轴范围变化明显时才重新设置"""
         # 基本数据检查
-        if not frequencies or not powers:
+        if len(frequencies) == 0 or len(powers) == 0:
             return
             
         # 转换数据为numpy数组便于处理
-        freqs = np.array(frequencies)
-        pows = np.array(powers)
+        freqs = np.asarray(frequencies, dtype=np.float64)
+        pows = np.asarray(powers, dtype=np.float64)
         
         # 处理异常值
         valid_mask = (pows > -100) & (pows < 50)  # 过滤明显不合理的数据
@@ -476,14 +609,22 @@ class MainWindow(QMainWindow):
         
         # 更新图表
         self.plot_curve.setData(valid_freqs, valid_pows)
-        self.freq_label.setText(f"频率范围: {min_freq/1e6:.3f} - {max_freq/1e6:.3f} MHz")
         
-        # 设置坐标轴范围
-        self.plot_widget.setXRange(min_freq, max_freq)
-        self.plot_widget.setYRange(*y_range)
-        
-        # 恢复原有代码，禁用对数模式以确保正确显示
-        self.plot_widget.setLogMode(x=False, y=False)
+        # 设置坐标轴范围: 频率范围变化时, 或功率范围变化超过跨度的PLOT_RANGE_TOLERANCE时
+        if self._plot_x_range is None:
+            # 恢复原有代码，禁用对数模式以确保正确显示(每次扫描第一帧设置一次)
+            self.plot_widget.setLogMode(x=False, y=False)
+        x_range = (min_freq, max_freq)
+        if self._range_moved(self._plot_x_range, x_range, 1e-9):
+            self.plot_widget.setXRange(*x_range)
+            self.freq_label.setText(f"频率范围: {min_freq/1e6:.3f} - {max_freq/1e6:.3f} MHz")
+            self._plot_x_range = x_range
+        if self._range_moved(self._plot_y_range, y_range, PLOT_RANGE_TOLERANCE):
+            self.plot_widget.setYRange(*y_range)
+            self._plot_y_range = y_range
+        
+        self.plot_rate_label.setText(f"刷新: {self.plot_scheduler.fps:.0f} fps, "
+                                     f"丢弃 {self.plot_scheduler.dropped_frames}帧")
             
     def update_wavelength(self, wavelength: float):
         """更新当前波长显示"""
@@ -513,6 +654,23 @@ class MainWindow(QMainWindow):
             eta = time.strftime("%H:%M:%S", time.localtime(time.time() + remaining))
             self.eta_label.setText(f"预计完成: {eta}")
             
+    def update_export_progress(self, percent: int, filename: str):
+        """更新后台保存进度"""
+        self.export_progress.show()
+        self.cancel_export_btn.show()
+        self.export_progress.setValue(percent)
+        self.export_progress.setToolTip(filename)
+        
+    def on_export_finished(self, success: bool, filename: str):
+        """后台保存结束, 隐藏保存进度"""
+        self.export_progress.hide()
+        self.cancel_export_btn.hide()
+        self.export_progress.setValue(0)
+        if success:
+            self.status_bar.showMessage(f"数据已保存到: {filename}", 3000)
+        else:
+            self.status_bar.showMessage(f"数据未保存: {os.path.basename(filename)}", 3000)
+            
     def save_plot_image(self):
         """保存当前图表为图片"""
         path, _ = QFileDialog.getSaveFileName(
@@ -0,0 +1,75 @@
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class PlotScheduler(QObject):
+    """限速的图表刷新: 只保留最新的一帧, 按最大帧率绘制
+
+    扫描线程每个波长点都会发送数据, 步进较快时事件队列中会积压过时的帧;
+    submit只记录最新数据, 由定时器按帧率调用render, 其间被覆盖的帧计为丢弃。
+    """
+
+    def __init__(self, render: Callable[[Any, Any], None], max_fps: float = 20.0, parent=None):
+        """
+        :param render: 绘制函数, 参数为(频率, 功率)
+        :param max_fps: 最大帧率
+        """
+        super().__init__(parent)
+        self._render = render
+        self.max_fps = max_fps
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._draw)
+        self._latest: Optional[Tuple[Any, Any]] = None
+        self._last_draw = 0.0
+        self.rendered_frames = 0
+        self.dropped_frames = 0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self.fps = 0.0  # 最近一秒左右的实际帧率
+
+    @property
+    def interval(self) -> float:
+        """两帧之间的最短间隔(s)"""
+        return 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+
+    def submit(self, frequencies, powers):
+        """提交一帧, 覆盖尚未绘制的帧"""
+        if self._latest is not None:
+            self.dropped_frames += 1
+        self._latest = (frequencies, powers)
+        if not self._timer.isActive():
+            wait = self._last_draw + self.interval - time.monotonic()
+            self._timer.start(max(0, int(wait * 1000)))
+
+    def _draw(self):
+        """绘制最新的一帧"""
+        if self._latest is None:
+            return
+        frame, self._latest = self._latest, None
+        self._last_draw = time.monotonic()
+        self._render(*frame)
+        self.rendered_frames += 1
+        self._window_frames += 1
+        elapsed = self._last_draw - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = self._last_draw
+            self._window_frames = 0
+
+    def flush(self):
+        """立即绘制尚未绘制的帧"""
+        self._timer.stop()
+        self._draw()
+
+    def reset(self):
+        """丢弃尚未绘制的帧并清零计数(开始新的扫描时调用)"""
+        self._timer.stop()
+        self._latest = None
+        self.rendered_frames = 0
+        self.dropped_frames = 0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self.fps = 0.0
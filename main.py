@@ -4,10 +4,22 @@ import os
 from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
 from gui.main_window import MainWindow
 from core.controller import LaserSystemController
+from devices.gpib_device import enable_simulation, session_pool
+from devices import io_trace
+from devices.io_trace import tracer
 
 def main():
+    # 使用仿真仪器运行(无需GPIB硬件)
+    if "--sim" in sys.argv:
+        enable_simulation()
+    # 记录全部VISA I/O事务(默认只记录失败的事务)
+    if "--debug" in sys.argv:
+        tracer.set_level(io_trace.INFO)
+        
     # 创建应用实例
     app = QApplication(sys.argv)
+    # 退出时关闭会话池中的所有VISA会话
+    app.aboutToQuit.connect(session_pool.close_all)
     
     # 创建主窗口和控制器
     window = MainWindow()
@@ -43,6 +55,17 @@ def main():
     window.output_enable.toggled.connect(
         lambda checked: controller.set_laser_output(checked) if controller.laser else None
     )
+    window.pipeline_mode.toggled.connect(
+        lambda checked: setattr(controller, 'pipeline_enabled', checked)
+    )
+    window.swept_mode.toggled.connect(
+        lambda checked: setattr(controller, 'swept_enabled', checked)
+    )
+    window.checkpoint_mode.toggled.connect(
+        lambda checked: setattr(controller, 'checkpoint_enabled', checked)
+    )
+    window.resume_checkpoint_btn.clicked.connect(lambda: resume_checkpoint(window, controller))
+    window.resume_checkpoint_btn.setEnabled(controller.has_checkpoint())
     
     # 连接参数更新信号
     window.start_freq.valueChanged.connect(
@@ -91,6 +114,15 @@ def main():
     
     # 连接数据保存信号
     window.save_btn.clicked.connect(lambda: save_data(window, controller))
+    controller.export_progress.connect(window.update_export_progress)
+    controller.export_finished.connect(window.on_export_finished)
+    window.cancel_export_btn.clicked.connect(controller.cancel_exports)
+    # 退出前等待后台保存完成
+    app.aboutToQuit.connect(controller.wait_exports)
+    
+    # 扫描记录查询, 保存完成后刷新结果
+    window.catalog_panel.search_btn.clicked.connect(lambda: search_catalog(window, controller))
+    controller.export_finished.connect(lambda: search_catalog(window, controller))
     
     # 显示窗口
     window.show()
@@ -179,6 +211,12 @@ def start_scan(window, controller):
         # 获取手动设置的采样点数
         manual_points = window.points_combo.currentData()
         
+        # 存储精度和数据缩减(影响内存估计, 需在设置扫描参数前设置)
+        controller.set_data_precision(window.data_precision.currentData())
+        controller.set_reduction(window.reduction_mode.currentData(),
+                                 window.reduction_width.value(),
+                                 window.keep_full_every.value())
+        
         # 设置扫描参数
         controller.set_scan_parameters(
             window.start_wl.value(),
@@ -191,21 +229,13 @@ def start_scan(window, controller):
             manual_points                        # 手动设置的采样点数，-1表示自动计算
         )
         
-        # 更新按钮状态
-        window.start_btn.setEnabled(False)
-        window.stop_btn.setEnabled(True)
-        window.pause_btn.setEnabled(True)
-        window.save_btn.setEnabled(False)
-        window.auto_scale_btn.setEnabled(False)
-        window.auto_tune_btn.setEnabled(False)
+        # 实时写入HDF5设置
+        controller.h5_stream_enabled = window.h5_stream.isChecked()
+        controller.h5_compression = window.h5_compression.currentData()
+        controller.h5_stream_path = window.get_stream_filename()
+        controller.writer_policy = window.writer_policy.currentData()
         
-        # 清除旧数据
-        window.frequencies = []
-        window.powers = []
-        window.plot_curve.setData([], [])
-        window.progress_bar.setValue(0)
-        window.alarm_label.setText("状态: 扫描中")
-        window.alarm_label.setStyleSheet("background-color: blue; color: white;")
+        set_scanning_state(window)
         
         # 开始扫描
         controller.start_scan()
@@ -217,9 +247,48 @@ def start_scan(window, controller):
     except Exception as e:
         QMessageBox.critical(window, "错误", f"扫描启动失败: {str(e)}")
 
+def set_scanning_state(window):
+    """扫描开始时更新按钮状态并清除旧数据"""
+    # 更新按钮状态
+    window.start_btn.setEnabled(False)
+    window.resume_checkpoint_btn.setEnabled(False)
+    window.stop_btn.setEnabled(True)
+    window.pause_btn.setEnabled(True)
+    window.save_btn.setEnabled(False)
+    window.auto_scale_btn.setEnabled(False)
+    window.auto_tune_btn.setEnabled(False)
+    
+    # 清除旧数据
+    window.reset_plot()
+    window.progress_bar.setValue(0)
+    window.alarm_label.setText("状态: 扫描中")
+    window.alarm_label.setStyleSheet("background-color: blue; color: white;")
+
+def resume_checkpoint(window, controller):
+    """从检查点继续上次中止的扫描"""
+    if not controller.analyzer or not controller.laser:
+        QMessageBox.warning(
+            window,
+            "设备错误",
+            "请确保激光器和频谱仪都已连接"
+        )
+        return
+        
+    try:
+        set_scanning_state(window)
+        if controller.resume_from_checkpoint():
+            window.status_bar.showMessage("已从检查点继续扫描")
+        else:
+            stop_scan(window, controller)
+            window.status_bar.showMessage("无法继续上次扫描", 3000)
+    except Exception as e:
+        stop_scan(window, controller)
+        QMessageBox.critical(window, "错误", f"继续扫描失败: {str(e)}")
+
 def stop_scan(window, controller):
     """停止扫描"""
     controller.stop_scan()
+    window.resume_checkpoint_btn.setEnabled(controller.has_checkpoint())
     window.stop_btn.setEnabled(False)
     window.pause_btn.setEnabled(False)
     window.pause_btn.setChecked(False)
@@ -234,6 +303,7 @@ def stop_scan(window, controller):
 def scan_complete(window, controller):
     """扫描完成处理"""
     window.start_btn.setEnabled(True)
+    window.resume_checkpoint_btn.setEnabled(controller.has_checkpoint())
     window.stop_btn.setEnabled(False)
     window.pause_btn.setEnabled(False)
     window.pause_btn.setChecked(False)
@@ -260,11 +330,12 @@ def scan_complete(window, controller):
         window.status_bar.showMessage("扫描完成", 3000)
 
 def save_data(window, controller):
-    """保存数据(统一使用simple_save_data)"""
+    """在后台保存数据, 完成后由export_finished信号通知"""
     try:
         filename = window.get_save_filename()
-        if controller.simple_save_data(filename):
-            window.status_bar.showMessage(f"数据已保存到: {filename}", 3000)
+        if controller.export_data(filename):
+            window.update_export_progress(0, filename)
+            window.status_bar.showMessage(f"正在后台保存: {os.path.basename(filename)}")
             return True
         return False
     except Exception as e:
@@ -275,6 +346,11 @@ def save_data(window, controller):
         )
         return False
 
+def search_catalog(window, controller):
+    """按查询面板的条件查询已保存的扫描"""
+    entries = controller.search_catalog(**window.catalog_panel.filters())
+    window.catalog_panel.show_results(entries)
+
 def toggle_pause_scan(window, controller, checked):
     """切换暂停/继续扫描"""
     if checked:
@@ -5,6 +5,7 @@ import sys
 # 确定特定版本和安装选项的依赖列表
 install_requires = [
     'pyvisa',
+    'numpy',
     'pyqt5',
     'pyqtgraph',
     'openpyxl'
@@ -0,0 +1,123 @@
+"""仿真仪器上的端到端步进扫描: 数据形状、波长和保存后读回"""
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from devices.gpib_device import enable_simulation, session_pool
+
+START_WL, STOP_WL, STEP = 1550.0, 1551.0, 0.1
+POINTS = 11
+SWEEP_POINTS = 1001
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    """连接仿真仪器(time_scale=1)的控制器, 临时文件和设备缓存都写入tmp_path"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    enable_simulation(time_scale=1.0)
+    app = QCoreApplication.instance() or QCoreApplication([])
+    from core.controller import LaserSystemController
+
+    c = LaserSystemController()
+    c.messages = []
+    c.alarm_triggered.connect(c.messages.append)
+    assert c.auto_connect_devices()
+    c.laser.enable_output(True)
+    c.set_scan_parameters(START_WL, STOP_WL, STEP, 0.01, 1e6, 10e6, 100e3, -1)
+    yield c
+    if getattr(c, "scan_thread", None) is not None:
+        c.scan_thread.wait()
+    c.finish_store()
+    c.wait_exports()
+    app.processEvents()
+    session_pool.close_all()
+    enable_simulation(False)
+
+
+def run_scan(c, timeout_ms: int = 60000):
+    """开始扫描并处理事件直到扫描结束"""
+    loop = QEventLoop()
+    c.scan_complete.connect(loop.quit)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    c.start_scan()
+    loop.exec_()
+    c.scan_thread.wait()
+    QCoreApplication.processEvents()
+
+
+def test_stepped_scan_shape_and_wavelengths(controller):
+    run_scan(controller)
+    assert controller.power_matrix.shape == (SWEEP_POINTS, POINTS)
+    assert controller.recorded_columns == POINTS
+    expected = START_WL + STEP * np.arange(POINTS)
+    np.testing.assert_allclose(controller.column_wavelengths, expected, atol=1e-9)
+    # 谱线位置随波长移动, 每列都有高于噪底的峰值
+    peaks = controller.power_matrix.max(axis=0)
+    assert (peaks > -40).all()
+    assert not any("错误" in m for m in controller.messages)
+
+
+@pytest.mark.parametrize("ext", ["csv", "txt", "h5"])
+def test_export_round_trip(controller, tmp_path, ext):
+    if ext == "h5":
+        pytest.importorskip("h5py")
+    from core.reader import open_scan
+
+    run_scan(controller)
+    path = str(tmp_path / f"scan.{ext}")
+    assert controller.simple_save_data(path)
+    matrix = np.asarray(controller.power_matrix, dtype=np.float64)
+    with open_scan(path, wavelengths=controller.column_wavelengths,
+                   freq_range=controller.frequency_range) as scan:
+        assert scan.shape == matrix.shape
+        np.testing.assert_allclose(np.asarray(scan, dtype=np.float64), matrix, atol=1e-5)
+        np.testing.assert_allclose(scan.wavelengths, controller.column_wavelengths, atol=1e-9)
+        assert scan.select(wavelength_range=(1550.25, 1550.55)).shape == (SWEEP_POINTS, 3)
+
+
+def test_resume_after_skipped_point(controller):
+    """空迹线跳过的波长点不影响续扫位置: 不重复测量已有的波长点"""
+    controller.checkpoint_enabled = True
+    controller.checkpoint_columns = 1
+    analyzer = controller.analyzer
+    fetch_trace = analyzer.fetch_trace
+    calls = []
+
+    def skip_third():
+        calls.append(1)
+        data = fetch_trace()
+        return np.empty(0) if len(calls) == 3 else data
+
+    analyzer.fetch_trace = skip_third
+    record_column = controller.record_column
+
+    def stop_after_sixth(*args, **kwargs):
+        index = record_column(*args, **kwargs)
+        if index == 5:
+            controller.scan_thread.stop()
+        return index
+
+    controller.record_column = stop_after_sixth
+    run_scan(controller)
+    assert controller.column_points == [0, 1, 3, 4, 5, 6]
+    analyzer.fetch_trace = fetch_trace
+    controller.record_column = record_column
+
+    loop = QEventLoop()
+    controller.scan_complete.connect(loop.quit)
+    QTimer.singleShot(60000, loop.quit)
+    assert controller.resume_from_checkpoint()
+    loop.exec_()
+    controller.scan_thread.wait()
+    QCoreApplication.processEvents()
+
+    assert controller.power_matrix.shape == (SWEEP_POINTS, POINTS - 1)
+    assert controller.column_points == [0, 1] + list(range(3, POINTS))
+    expected = START_WL + STEP * np.array(controller.column_points)
+    np.testing.assert_allclose(controller.column_wavelengths, expected, atol=1e-9)
+    assert not controller.has_checkpoint()
+    assert any("1550.2000nm" in m and "没有数据" in m for m in controller.messages)
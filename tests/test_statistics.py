@@ -0,0 +1,43 @@
+"""逐列统计: 积分功率按RBW等效噪声带宽归一化"""
+import numpy as np
+
+from core.reduction import TraceReducer
+from core.statistics import ScanStatistics, column_statistics
+
+FREQS = np.linspace(1e6, 11e6, 40001)
+RBW = 100e3
+
+
+def tone(power: float, center: float = 6e6) -> np.ndarray:
+    """RBW滤波器(高斯形状)下单频信号的迹线, 噪底很低"""
+    sigma = RBW / 2.355
+    line = power - 10 * np.log10(np.e) * (FREQS - center) ** 2 / (2 * sigma ** 2)
+    return 10 * np.log10(10 ** (line / 10) + 1e-15)
+
+
+def test_flat_noise_integrates_over_span():
+    stats = column_statistics(np.full(len(FREQS), -100.0), FREQS, rbw=RBW)
+    # -100dBm/RBW 的功率谱密度在10MHz内积分
+    expected = -100 + 10 * np.log10(10e6 / (RBW * 1.056))
+    np.testing.assert_allclose(stats["integrated_power"], expected, atol=0.01)
+    np.testing.assert_allclose(stats["noise_floor"], -100.0)
+
+
+def test_tone_counted_once():
+    stats = column_statistics(tone(-20.0), FREQS, rbw=RBW)
+    np.testing.assert_allclose(stats["integrated_power"], -20.0, atol=0.1)
+    np.testing.assert_allclose(stats["peak_power"], -20.0, atol=1e-6)
+
+
+def test_integrated_power_needs_rbw():
+    assert np.isnan(column_statistics(tone(-20.0), FREQS)["integrated_power"]).all()
+
+
+def test_peak_reduction_marks_noise_unavailable():
+    reducer = TraceReducer("peak", 1001)
+    assert not reducer.preserves_noise(len(FREQS))
+    assert TraceReducer("mean", 1001).preserves_noise(len(FREQS))
+    statistics = ScanStatistics(rbw=RBW, noise_valid=reducer.preserves_noise(len(FREQS)))
+    stats = statistics.add(reducer.reduce(tone(-20.0)), reducer.reduce_axis(FREQS))
+    assert np.isnan([stats["noise_floor"], stats["integrated_power"], stats["snr"]]).all()
+    np.testing.assert_allclose(stats["peak_power"], -20.0, atol=0.01)